@@ -0,0 +1,59 @@
+# analyzer/quality.py
+
+import re
+import unicodedata
+from typing import Dict
+
+# Glyphs a parser could not map to Unicode
+GARBAGE_PATTERN = re.compile(r"\(cid:\d+\)|�")
+TOKEN_SPLIT_PATTERN = re.compile(r"[\s/\-–—]+")
+WORD_PATTERN = re.compile(r"^[^\W\d_]+$")
+NUMBER_PATTERN = re.compile(r"^[-+$€£]?\d[\d.,:%]*$")
+EDGE_PUNCTUATION = "\"'()[]{}<>.,;:!?*•·«»“”‘’"
+VOWELS = set("aeiouyAEIOUY")
+
+def _plausible_token(token: str) -> bool:
+    """Whether a token looks like a real word or number rather than OCR noise."""
+    if NUMBER_PATTERN.match(token):
+        return True
+    if not WORD_PATTERN.match(token):
+        return False
+    if token.isascii():
+        # Latin words have vowels and a sane length; short ones are often abbreviations
+        return len(token) <= 3 or (len(token) <= 20 and any(c in VOWELS for c in token))
+    return True
+
+def score_text(text: str, min_chars: int = 200) -> float:
+    """
+    Estimate how usable a page's extracted text is, without any model.
+
+    The score multiplies three signals: the share of characters that are not
+    unmapped glyphs or control characters, the share of tokens that look like
+    words or numbers, and how close the page comes to ``min_chars`` characters
+    (empty pages of scans score 0).
+
+    Args:
+        text (str): Extracted text of one page
+        min_chars (int): Character count at which a page counts as fully populated
+
+    Returns:
+        float: Quality between 0 (unusable) and 1
+    """
+    stripped = text.strip() if text else ""
+    if not stripped:
+        return 0.0
+
+    garbage = sum(len(m) for m in GARBAGE_PATTERN.findall(stripped))
+    control = sum(1 for c in stripped if unicodedata.category(c)[0] == "C" and not c.isspace())
+    clean_ratio = max(0.0, 1 - (garbage + control) / len(stripped))
+
+    tokens = [t.strip(EDGE_PUNCTUATION) for t in TOKEN_SPLIT_PATTERN.split(GARBAGE_PATTERN.sub(" ", stripped))]
+    tokens = [t for t in tokens if t]
+    token_ratio = sum(map(_plausible_token, tokens)) / len(tokens) if tokens else 0.0
+
+    density = min(1.0, len(stripped) / min_chars) ** 0.5
+    return round(clean_ratio * token_ratio * density, 4)
+
+def score_pages(page_texts: Dict[int, str], min_chars: int = 200) -> Dict[int, float]:
+    """Score each page of a document; see score_text."""
+    return {page: score_text(text, min_chars) for page, text in page_texts.items()}
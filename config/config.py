@@ -2,6 +2,8 @@
 
 import os
 
+from config.vector_store_config import CHUNK_CONFIG
+
 # Vector store settings
 VECTOR_STORE_CONFIG = {
     "type": os.getenv("VECTOR_STORE_TYPE", "faiss"),
@@ -10,11 +12,11 @@ VECTOR_STORE_CONFIG = {
     "index_path": os.getenv("FAISS_INDEX_PATH", "./faiss_index")
 }
 
-# PDF processing settings
+# PDF processing settings (token counts, shared with the chunker's CHUNK_CONFIG)
 PDF_PROCESSING_CONFIG = {
-    "chunk_size": 512,
-    "chunk_overlap": 50,
-    "min_chunk_size": 100
+    "chunk_size": CHUNK_CONFIG["max_tokens"],
+    "chunk_overlap": CHUNK_CONFIG["overlap"],
+    "min_chunk_size": CHUNK_CONFIG["min_chunk_size"]
 }
 
 # File storage settings
@@ -52,7 +52,10 @@ FAISS_CONFIG: Dict[str, Any] = {
 # Chunk configuration
 CHUNK_CONFIG = {
     "max_tokens": 512,  # Maximum tokens per chunk
-    "overlap": 50  # Number of overlapping tokens between chunks
+    "overlap": 50,  # Number of overlapping tokens between chunks
+    "min_chunk_size": 20,  # Text chunks with fewer tokens, after packing, are dropped
+    "batch_size": 64,  # Chunks embedded and stored per vector store call
+    "layout_aware": True  # Chunk outputs with coordinates by page region (see database/layout_chunker.py)
 }
 
 # Pinecone configuration
@@ -0,0 +1,207 @@
+# database/benchmark_chunking.py
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(seconds, "transformers" in sys.modules)
+"""
+
+def load_text(input_path: str = None) -> str:
+    """Text of a parser output, or the bundled Docling sample when no path is given."""
+    if input_path:
+        from parsers.document_io import read_output
+        from .text_chunker import extract_text_from_json
+        return extract_text_from_json(read_output(input_path))
+    from .test_recrussive_split import input_text
+    return input_text
+
+def measure_import(module: str, runs: int = 5):
+    """Import a module in fresh interpreters and report the median wall time.
+
+    Args:
+        module: Dotted module name, imported from the repository root
+        runs: Number of fresh processes
+
+    Returns:
+        dict: Median and per-run seconds, and whether transformers got imported
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    timings, loads_transformers = [], False
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+        seconds, transformers_loaded = completed.stdout.split()
+        timings.append(float(seconds))
+        loads_transformers = loads_transformers or transformers_loaded == "True"
+    return {
+        "module": module,
+        "median_seconds": statistics.median(timings),
+        "runs": timings,
+        "imports_transformers": loads_transformers,
+    }
+
+class _OneByOneTokenizer:
+    """Tokenizer proxy without batching or offsets, for the per-text encode/decode path."""
+
+    is_fast = False
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def encode(self, text, add_special_tokens=True):
+        return self.tokenizer.encode(text, add_special_tokens=add_special_tokens)
+
+    def decode(self, ids):
+        return self.tokenizer.decode(ids)
+
+def measure_throughput(text: str, repeat: int = 20, max_tokens: int = None, overlap: int = None,
+                       model_name: str = None):
+    """Time hybrid chunking with batched fast-tokenizer encoding and with per-text encoding.
+
+    Args:
+        text: Document to chunk
+        repeat: Times the text is chunked per measurement
+        max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
+        overlap: Overlap tokens between chunks (defaults to CHUNK_CONFIG["overlap"])
+        model_name: Embedding model whose tokenizer counts tokens
+
+    Returns:
+        dict: Seconds, characters per second and chunk count for each path
+    """
+    from .text_chunker import CHUNK_CONFIG, _hybrid_chunks, get_tokenizer
+
+    max_tokens = max_tokens or CHUNK_CONFIG["max_tokens"]
+    overlap = CHUNK_CONFIG["overlap"] if overlap is None else overlap
+    tokenizer = get_tokenizer(model_name)
+    results = {}
+    for label, chunk_tokenizer in (("batched", tokenizer), ("one-by-one", _OneByOneTokenizer(tokenizer))):
+        _hybrid_chunks(text, max_tokens, overlap, chunk_tokenizer)  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            chunks = _hybrid_chunks(text, max_tokens, overlap, chunk_tokenizer)
+        seconds = time.perf_counter() - start
+        results[label] = {
+            "seconds": seconds,
+            "chars_per_sec": len(text) * repeat / seconds if seconds else 0.0,
+            "chunks": len(chunks),
+            "chunk_tokens": [len(tokenizer.encode(c["content"], add_special_tokens=False)) for c in chunks],
+        }
+    return results
+
+def measure_semantic(text: str, repeat: int = 3, max_tokens: int = None, model_name: str = None,
+                     cache_dir: str = None):
+    """Compare semantic chunking with hybrid chunking on one document.
+
+    The first semantic run starts from an empty embedding cache (cold); the
+    timed repeats reuse the cached sentence embeddings (warm).
+
+    Args:
+        text: Document to chunk
+        repeat: Timed runs of each strategy
+        max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
+        model_name: Embedding model (defaults to the configured one)
+        cache_dir: Embedding cache directory (default: a temporary one)
+
+    Returns:
+        dict: Seconds, chunks/sec and chunk count per strategy, and the chunk-count reduction
+    """
+    import tempfile
+    from .semantic_chunker import EmbeddingCache, semantic_chunk_text
+    from .text_chunker import hybrid_chunk_text
+
+    def timed(function):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            chunks = function()
+        seconds = (time.perf_counter() - start) / repeat
+        return {"seconds": seconds, "chunks": len(chunks), "chunks_per_sec": len(chunks) / seconds if seconds else 0.0}
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        cache = EmbeddingCache(cache_dir or temporary_dir)
+        hybrid_chunk_text(text, max_tokens, model_name=model_name)  # warm-up: tokenizer load
+        start = time.perf_counter()
+        semantic_chunk_text(text, max_tokens, model_name, cache=cache)
+        cold_seconds = time.perf_counter() - start
+        results = {
+            "hybrid": timed(lambda: hybrid_chunk_text(text, max_tokens, model_name=model_name)),
+            "semantic": timed(lambda: semantic_chunk_text(text, max_tokens, model_name, cache=cache)),
+        }
+    results["semantic"]["cold_seconds"] = cold_seconds
+    hybrid_chunks = results["hybrid"]["chunks"]
+    results["chunk_reduction"] = 1 - results["semantic"]["chunks"] / hybrid_chunks if hybrid_chunks else 0.0
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chunking pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import-time", help="Time importing the chunker in a fresh process")
+    import_parser.add_argument("--modules", nargs="+", default=["database.text_chunker", "database.run_pipeline"])
+    import_parser.add_argument("--runs", type=int, default=5)
+    import_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    throughput_parser = subparsers.add_parser("throughput", help="Time hybrid chunking of a document")
+    throughput_parser.add_argument("--input", default=None,
+                                   help="Parser output to chunk (default: the Docling sample in database/test_recrussive_split.py)")
+    throughput_parser.add_argument("--repeat", type=int, default=20)
+    throughput_parser.add_argument("--max-tokens", type=int, default=None)
+    throughput_parser.add_argument("--model", default=None, help="Tokenizer model (default: the configured embedding model)")
+
+    semantic_parser = subparsers.add_parser("semantic", help="Compare semantic and hybrid chunking of a document")
+    semantic_parser.add_argument("--input", default=None,
+                                 help="Parser output to chunk (default: the Docling sample in database/test_recrussive_split.py)")
+    semantic_parser.add_argument("--repeat", type=int, default=3)
+    semantic_parser.add_argument("--max-tokens", type=int, default=None)
+    semantic_parser.add_argument("--model", default=None, help="Embedding model (default: the configured one)")
+    semantic_parser.add_argument("--cache-dir", default=None, help="Embedding cache directory (default: a temporary one)")
+
+    args = parser.parse_args()
+
+    if args.command == "import-time":
+        results = [measure_import(module, args.runs) for module in args.modules]
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        print("\n⏱️ Import time (median of fresh processes)")
+        for result in results:
+            note = " (loads transformers)" if result["imports_transformers"] else ""
+            print(f"   {result['module']}: {result['median_seconds'] * 1000:.1f} ms{note}")
+
+    elif args.command == "throughput":
+        text = load_text(args.input)
+        results = measure_throughput(text, args.repeat, args.max_tokens, model_name=args.model)
+        print(f"\n⚡ Hybrid chunking of {len(text)} characters x {args.repeat}")
+        for label, result in results.items():
+            print(f"   {label}: {result['seconds']:.3f}s, {result['chars_per_sec'] / 1e6:.2f} M chars/s, {result['chunks']} chunks")
+        batched, one_by_one = results["batched"], results["one-by-one"]
+        print(f"   Speed-up: {one_by_one['seconds'] / batched['seconds']:.1f}x")
+        same = batched["chunk_tokens"] == one_by_one["chunk_tokens"]
+        print(f"   {'✅' if same else '⚠️'} Chunk boundaries {'match' if same else 'differ'}")
+
+    elif args.command == "semantic":
+        text = load_text(args.input)
+        results = measure_semantic(text, args.repeat, args.max_tokens, args.model, args.cache_dir)
+        print(f"\n🧠 Semantic vs hybrid chunking of {len(text)} characters")
+        for label in ("hybrid", "semantic"):
+            result = results[label]
+            print(f"   {label}: {result['chunks']} chunks, {result['seconds']:.3f}s, {result['chunks_per_sec']:.1f} chunks/s")
+        print(f"   Semantic with a cold embedding cache: {results['semantic']['cold_seconds']:.3f}s")
+        print(f"   Chunk count reduction vs hybrid: {results['chunk_reduction'] * 100:.0f}%")
+
+if __name__ == "__main__":
+    main()
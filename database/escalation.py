@@ -0,0 +1,237 @@
+# database/escalation.py
+
+import os
+import json
+import time
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+from analyzer.quality import score_text
+
+# Cheapest first. Each later parser only sees the pages still below the threshold.
+DEFAULT_LADDER = ["mupdf", "docling", "paddleocr", "llamaparse"]
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_DEADLINE = 300.0  # seconds per document
+
+# Parsers that only run as scripts: name -> (conda environment, script)
+SCRIPT_PARSERS = {
+    "llamaparse": ("llama_parse_env", "llama_parser.py"),
+}
+
+# Registered parsers that can spend minutes on a single page. In-process steps
+# stop only between pages, so these always run as scripts, killed at the deadline.
+DEADLINE_SCRIPT_PARSERS = {"docling"}
+
+def _item_text(item: Any) -> str:
+    """Text of one page entry of a parser output, whatever its layout."""
+    if isinstance(item, str):
+        return item
+    if not isinstance(item, dict):
+        return ""
+    if isinstance(item.get("text"), str):
+        return item["text"]
+    if isinstance(item.get("texts"), list):  # pdfminer
+        return "\n".join(t["text"] for t in item["texts"] if isinstance(t, dict) and "text" in t)
+    if isinstance(item.get("results"), list):  # PaddleOCR
+        return "\n".join(str(r["text"]) for r in item["results"] if isinstance(r, dict) and "text" in r)
+    content = item.get("content")
+    if content is None:
+        return ""
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+def page_texts_from_output(data: Any) -> Dict[int, str]:
+    """
+    Split a parser's output into the text of each page.
+
+    Args:
+        data: Output of any parser (BaseParser pages, pdfminer, PyMuPDF, Docling,
+            PaddleOCR or LlamaParse layouts)
+
+    Returns:
+        Dict[int, str]: Text by 1-based page number
+    """
+    if isinstance(data, dict) and isinstance(data.get("text_by_page"), dict):  # PyMuPDF, 0-based keys
+        return {int(page) + 1: text for page, text in data["text_by_page"].items()}
+
+    if isinstance(data, dict) and isinstance(data.get("texts"), list) and not isinstance(data.get("pages"), list):  # Docling
+        pages: Dict[int, List[str]] = {}
+        for entry in data.get("texts", []):
+            prov = entry.get("prov") or [{}]
+            if "text" in entry and prov[0].get("page_no"):
+                pages.setdefault(prov[0]["page_no"], []).append(entry["text"])
+        return {page: "\n".join(texts) for page, texts in pages.items()}
+
+    items = data.get("pages", []) if isinstance(data, dict) else data
+    pages_text: Dict[int, str] = {}
+    for index, item in enumerate(items if isinstance(items, list) else []):
+        page = (item.get("page_number") or item.get("page")) if isinstance(item, dict) else None
+        page = page or index + 1
+        pages_text[page] = "\n".join(filter(None, (pages_text.get(page), _item_text(item))))
+    return pages_text
+
+def _page_count(input_pdf: str) -> int:
+    """Pages of the PDF, or 0 when it cannot be read (only the parsers' pages are kept then)."""
+    from parsers.cache_utils import count_pdf_pages
+    try:
+        return count_pdf_pages(input_pdf)
+    except (OSError, RuntimeError, ValueError):
+        return 0
+
+class EscalationRouter:
+    """
+    Parse a PDF with the cheapest parser first and escalate only what scores badly.
+
+    Every page of the first parser's output is scored with analyzer.quality; the
+    pages below ``threshold`` are handed to the next parser of the ladder, and so
+    on, each page keeping its best-scoring text. Once the document's ``deadline``
+    has passed no further step starts and the best result so far is kept.
+    Parsers run in-process where their dependencies are installed and as
+    scripts in their conda environments otherwise (always as scripts for
+    DEADLINE_SCRIPT_PARSERS). Pages no parser returns stay in the output, empty
+    and below the threshold.
+    """
+
+    def __init__(self, ladder: Optional[List[str]] = None, threshold: float = DEFAULT_THRESHOLD,
+                 deadline: float = DEFAULT_DEADLINE, in_process: bool = True):
+        """
+        Args:
+            ladder (List[str], optional): Parser names, cheapest first (default: DEFAULT_LADDER)
+            threshold (float): Page quality below which a page is escalated
+            deadline (float): Seconds allowed per document
+            in_process (bool): Run registered parsers in this process when possible
+        """
+        self.ladder = ladder or DEFAULT_LADDER
+        self.threshold = threshold
+        self.deadline = deadline
+        self.in_process = in_process
+
+    def run(self, input_pdf: str, output_path: str) -> Dict[str, Any]:
+        """
+        Route one document through the ladder and write the merged result.
+
+        Args:
+            input_pdf (str): Path to the PDF
+            output_path (str): Output path; the extension selects JSON or a binary format
+
+        Returns:
+            Dict[str, Any]: The written result: pages with the parser and quality of
+            each, plus the escalation path and the time spent at each step
+        """
+        from parsers.document_io import write_output
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        start = time.monotonic()
+        # Every page starts empty, so pages a parser leaves out are escalated and reported
+        best: Dict[int, Dict[str, Any]] = {
+            page: {"page_number": page, "text": "", "parser": None, "quality": 0.0}
+            for page in range(1, _page_count(input_pdf) + 1)
+        }
+        steps = []
+        deadline_hit = False
+
+        for name in self.ladder:
+            remaining = self.deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                deadline_hit = True
+                print("⏱️ Deadline reached; keeping the best result so far")
+                break
+            # The first step (or any step after nothing usable came back) parses the whole document
+            parsed = any(page["parser"] for page in best.values())
+            pending = sorted(p for p, page in best.items() if page["quality"] < self.threshold) if parsed else None
+            if pending == []:
+                break
+
+            print(f"🪜 Escalating to {name} for {'all pages' if pending is None else f'pages {pending}'}")
+            step_start = time.monotonic()
+            status, texts = self._run_step(name, input_pdf, output_path, pending, remaining)
+            improved = []
+            for page, text in texts.items():
+                if pending is not None and page not in pending:
+                    continue
+                quality = score_text(text)
+                if page not in best or not best[page]["parser"] or quality > best[page]["quality"]:
+                    best[page] = {"page_number": page, "text": text, "parser": name, "quality": quality}
+                    improved.append(page)
+            steps.append({
+                "parser": name,
+                "pages": pending if pending is not None else sorted(texts),
+                "status": status,
+                "improved": improved,
+                "seconds": round(time.monotonic() - step_start, 3),
+            })
+            if status == "timeout":
+                deadline_hit = True
+                break
+
+        pages = [best[page] for page in sorted(best)]
+        result = {
+            "parser": "escalation",
+            "pages": pages,
+            "escalation": {
+                "ladder": self.ladder,
+                "threshold": self.threshold,
+                "deadline": self.deadline,
+                "deadline_hit": deadline_hit,
+                "below_threshold": [p["page_number"] for p in pages if p["quality"] < self.threshold],
+                "total_seconds": round(time.monotonic() - start, 3),
+                "steps": steps,
+            },
+        }
+        write_output(result, output_path)
+        return result
+
+    def _run_step(self, name: str, input_pdf: str, output_path: str, pages: Optional[List[int]],
+                  remaining: float) -> Tuple[str, Dict[int, str]]:
+        """Run one parser on the given pages; returns its status and the page texts it produced."""
+        from parsers import PARSERS, ParserUnavailable, get_parser
+
+        if self.in_process and name in PARSERS and name not in DEADLINE_SCRIPT_PARSERS:
+            try:
+                parser = get_parser(name)
+            except ParserUnavailable:
+                parser = None
+            if parser is not None:
+                texts = {}
+                step_deadline = time.monotonic() + remaining
+                try:
+                    for page in parser.parse(input_pdf, pages=pages):
+                        texts[page["page_number"]] = page.get("text") or ""
+                        # A page cannot be interrupted, but no new one starts after the deadline
+                        if time.monotonic() > step_deadline:
+                            return "timeout", texts
+                except Exception as e:
+                    print(f"❌ {name} failed: {e}")
+                    return "failed", texts
+                return "ok", texts
+
+        if name in PARSERS:
+            env, script = PARSERS[name].env, PARSERS[name].script
+        elif name in SCRIPT_PARSERS:
+            env, script = SCRIPT_PARSERS[name]
+        else:
+            print(f"⚠️ Unknown parser in escalation ladder: {name}")
+            return "unavailable", {}
+        if env is None:
+            print(f"⚠️ {name} is not installed here and has no conda environment")
+            return "unavailable", {}
+
+        # Scripts parse the whole document; only the pending pages are kept from their output
+        from parsers.document_io import read_output
+        from .run_pipeline import run_parser
+        step_output = f"{os.path.splitext(output_path)[0]}.{name}.json"
+        try:
+            exit_code = run_parser(env, script, input_pdf, step_output, timeout=remaining)
+        except subprocess.TimeoutExpired:
+            print(f"⏱️ {name} did not finish before the deadline")
+            return "timeout", {}
+        if exit_code:
+            print(f"❌ {name} exited with status {exit_code}")
+            return "failed", {}
+        try:
+            return "ok", page_texts_from_output(read_output(step_output))
+        except (OSError, ValueError) as e:
+            print(f"❌ {name} produced no readable output: {e}")
+            return "failed", {}
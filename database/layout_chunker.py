@@ -0,0 +1,214 @@
+"""Layout-aware chunking: page regions in reading order, with their pages and boxes."""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.vector_store_config import CHUNK_CONFIG
+from parsers.document_model import COMPACT_FORMAT, Document
+from .text_chunker import (RecursiveTokenSplitter, TokenCounter, _table_chunks, _table_count_texts,
+                           find_table_regions, get_tokenizer)
+
+# A vertical gap wider than this many line heights starts a new region
+DEFAULT_GAP_FACTOR = 1.2
+# A horizontal gap wider than this many line heights between spans on one line
+# is a column break, written as a tab so table detection sees the columns
+COLUMN_GAP_FACTOR = 1.0
+
+def layout_document(data: Any) -> Optional[Document]:
+    """
+    Document with span coordinates from parser output that has them.
+
+    Recognises the compact document format, MuPDF (text_with_coordinates),
+    PDFMiner (pages of texts with a bbox) and PaddleOCR (pages of results with
+    a box, as a list or under "pages").
+
+    Returns:
+        Document, or None when the output carries no coordinates
+    """
+    if isinstance(data, dict):
+        if data.get("format") == COMPACT_FORMAT:
+            return Document.from_compact_dict(data)
+        if isinstance(data.get("text_with_coordinates"), dict):
+            return Document.from_mupdf_json(data)
+        pages = data.get("pages")
+    else:
+        pages = data
+    if not isinstance(pages, list) or not pages or not all(isinstance(page, dict) for page in pages):
+        return None
+    if all(isinstance(page.get("texts"), list) for page in pages):
+        if all(isinstance(item, dict) and isinstance(item.get("bbox"), dict) for page in pages for item in page["texts"]):
+            return Document.from_pdfminer_json(data if isinstance(data, dict) else {"pages": pages})
+        return None
+    if all(isinstance(page.get("results"), list) for page in pages):
+        if all(isinstance(result, dict) and "box" in result for page in pages for result in page["results"]):
+            return Document.from_paddleocr_json(pages, data.get("filename", "") if isinstance(data, dict) else "")
+    return None
+
+def _vertical_gap(a: Sequence[float], b: Sequence[float]) -> float:
+    """Distance between the vertical extents of two boxes (negative when they overlap)."""
+    return max(a[1], b[1]) - min(a[3], b[3])
+
+def iter_regions(document: Document, gap_factor: float = DEFAULT_GAP_FACTOR) -> Iterator[Tuple[int, List[int]]]:
+    """
+    Group each page's spans, in the parser's reading order, into regions.
+
+    A span starts a new region when the vertical gap to the previous span is
+    wider than ``gap_factor`` line heights: a paragraph break, a jump to the
+    next column, or a table or figure in between.
+
+    Yields:
+        (page number, indexes of the region's spans)
+    """
+    for page in document.pages:
+        region: List[int] = []
+        previous = None
+        for index in page.span_range:
+            span_start, span_end = document.offsets[index], document.offsets[index + 1]
+            if not document.text[span_start:span_end].strip():
+                continue
+            box = document.bboxes[4 * index:4 * index + 4]
+            if previous is not None:
+                height = max(previous[3] - previous[1], box[3] - box[1], 1.0)
+                if _vertical_gap(previous, box) > gap_factor * height:
+                    yield page.number, region
+                    region = []
+            region.append(index)
+            previous = box
+        if region:
+            yield page.number, region
+
+def region_lines(document: Document, spans: List[int]) -> List[List[int]]:
+    """Spans of a region grouped into lines (spans whose vertical extents overlap)."""
+    lines: List[List[int]] = []
+    for index in spans:
+        if lines:
+            previous = document.bboxes[4 * lines[-1][-1]:4 * lines[-1][-1] + 4]
+            if _vertical_gap(previous, document.bboxes[4 * index:4 * index + 4]) < 0:
+                lines[-1].append(index)
+                continue
+        lines.append([index])
+    return lines
+
+def line_text(document: Document, line: List[int]) -> str:
+    """Span texts of one line, joined by a space, or by a tab across a column gap."""
+    parts = []
+    for position, index in enumerate(line):
+        if position:
+            previous = document.bboxes[4 * line[position - 1]:4 * line[position - 1] + 4]
+            box = document.bboxes[4 * index:4 * index + 4]
+            height = max(previous[3] - previous[1], box[3] - box[1], 1.0)
+            parts.append("\t" if box[0] - previous[2] > COLUMN_GAP_FACTOR * height else " ")
+        parts.append(document.text[document.offsets[index]:document.offsets[index + 1]].strip())
+    return "".join(parts)
+
+def region_text(document: Document, spans: List[int]) -> str:
+    """Span texts of a region, joined by spaces within a line and newlines between lines."""
+    return "\n".join(line_text(document, line) for line in region_lines(document, spans))
+
+def region_bbox(document: Document, spans: List[int]) -> Tuple[float, float, float, float]:
+    boxes = [document.bboxes[4 * index:4 * index + 4] for index in spans]
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+def _number(value: float) -> str:
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+def format_bboxes(boxes: List[Tuple[int, Sequence[float]]]) -> str:
+    """Compact form of page boxes for chunk metadata: "1:72,90.5,540,300;2:72,60,540,120"."""
+    return ";".join(f"{page}:" + ",".join(_number(v) for v in box) for page, box in boxes)
+
+def parse_bboxes(value: str) -> List[Tuple[int, Tuple[float, ...]]]:
+    """Inverse of format_bboxes: [(page, (x0, y0, x1, y1)), ...]."""
+    boxes = []
+    for item in filter(None, value.split(";")):
+        page, coordinates = item.split(":")
+        boxes.append((int(page), tuple(float(v) for v in coordinates.split(","))))
+    return boxes
+
+def iter_region_parts(document: Document, gap_factor: float = DEFAULT_GAP_FACTOR) -> Iterator[Tuple[str, int, List[str], Tuple[float, ...]]]:
+    """
+    Regions in reading order, with the tables inside them split off.
+
+    Yields:
+        ("text"|"table", page number, lines, box of the lines' spans)
+    """
+    for page, spans in iter_regions(document, gap_factor):
+        lines = region_lines(document, spans)
+        texts = [line_text(document, line) for line in lines]
+        position = 0
+        for start, end in find_table_regions(texts) + [(len(lines), len(lines))]:
+            if start > position:
+                yield "text", page, texts[position:start], region_bbox(document, [i for line in lines[position:start] for i in line])
+            if end > start:
+                yield "table", page, texts[start:end], region_bbox(document, [i for line in lines[start:end] for i in line])
+            position = end
+
+def layout_chunks(document: Document, max_tokens: int = None, tokenizer=None, model_name: str = None,
+                  gap_factor: float = DEFAULT_GAP_FACTOR) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk a Document region by region in reading order, up to the token budget.
+
+    Whole regions are packed into a chunk until the next one would exceed
+    ``max_tokens``; a region longer than the budget is split with the recursive
+    token splitter and each piece keeps the region's box. Tables found in a
+    region (see find_table_regions) become table chunks of their own, split
+    between rows when they are over the budget.
+
+    Args:
+        document: Spans with page numbers and coordinates
+        max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
+        tokenizer: Tokenizer that counts tokens (defaults to get_tokenizer(model_name))
+        model_name: Embedding model whose tokenizer counts tokens
+        gap_factor: Line heights of vertical gap that separate regions
+
+    Yields:
+        {"type": "text"|"table", "content", "page_start", "page_end", "bboxes"},
+        with bboxes in the format_bboxes form: PDF points with a top-left origin,
+        unless the chunk has a "bbox_origin" key copied from the document metadata
+    """
+    max_tokens = max_tokens or CHUNK_CONFIG["max_tokens"]
+    tokenizer = tokenizer or get_tokenizer(model_name)
+    parts = list(iter_region_parts(document, gap_factor))
+    counter = TokenCounter(tokenizer)
+    regions = [(page, "\n".join(lines), box) for kind, page, lines, box in parts if kind == "text"]
+    tables = [lines for kind, _, lines, _ in parts if kind == "table"]
+    # Count every text region and every table row in one batch
+    texts = [text for _, text, _ in regions]
+    token_counts = iter(counter.count_many(texts + [piece for lines in tables for piece in _table_count_texts(lines)])[:len(texts)])
+    regions = iter(regions)
+
+    origin = document.metadata.get("bbox_origin")
+
+    def chunk(parts, kind="text"):
+        result = {
+            "type": kind,
+            "content": "\n\n".join(text for _, text, _ in parts),
+            "page_start": parts[0][0],
+            "page_end": parts[-1][0],
+            "bboxes": format_bboxes([(page, box) for page, _, box in parts]),
+        }
+        if origin:
+            result["bbox_origin"] = origin
+        return result
+
+    current, current_tokens = [], 0
+    for kind, page, lines, box in parts:
+        if kind == "table":
+            if current:
+                yield chunk(current)
+                current, current_tokens = [], 0
+            for piece in _table_chunks(lines, max_tokens, counter):
+                yield chunk([(page, piece, box)], "table")
+            continue
+        region, tokens = next(regions), next(token_counts)
+        if current and current_tokens + tokens > max_tokens:
+            yield chunk(current)
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            page, text, box = region
+            splitter = RecursiveTokenSplitter(max_tokens, min(CHUNK_CONFIG["overlap"], max_tokens // 2), tokenizer)
+            for piece in splitter.split_text(text):
+                yield chunk([(page, piece, box)])
+            continue
+        current.append(region)
+        current_tokens += tokens
+    if current:
+        yield chunk(current)
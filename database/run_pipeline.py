@@ -1,6 +1,7 @@
 # database/run_pipeline.py
 
 import sys
+import signal
 import subprocess
 import os
 import glob
@@ -37,11 +38,77 @@ def get_vector_store_config(store_type: str) -> Dict[str, Any]:
         raise ValueError(f"Unsupported vector store type: {store_type}. Available types: {available_stores}")
     return VECTOR_STORE_CONFIGS[store_type]
 
-def run_parser(env_name, script, input_pdf, output_json):
-    subprocess.run([
+def run_parser(env_name, script, input_pdf, output_json, extra_args=None, timeout=None):
+    """Run a parser script in its conda environment.
+
+    Args:
+        env_name: Conda environment with the parser's dependencies
+        script: Script in parsers/
+        input_pdf: Path to the PDF
+        output_json: Path for the parsed output
+        extra_args: Further command-line arguments for the script
+        timeout: Seconds after which `conda run` and the parser it started are killed
+
+    Returns:
+        int: The script's exit code
+
+    Raises:
+        subprocess.TimeoutExpired: If the timeout passed (the processes are gone by then)
+    """
+    # A session of its own, so a timeout can kill conda's child python too
+    process = subprocess.Popen([
         "conda", "run", "-n", env_name, "python",
-        f"parsers/{script}", input_pdf, output_json
-    ])
+        f"parsers/{script}", input_pdf, output_json,
+        *(extra_args or [])
+    ], start_new_session=True)
+    try:
+        return process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+        raise
+
+def parse_in_process(parser_name, input_pdf, output_json, **options):
+    """Run a registered parser inside this process and write its page list.
+
+    Args:
+        parser_name: Name in parsers.registry.PARSERS
+        input_pdf: Path to the PDF
+        output_json: Path for the parsed output; the extension selects JSON or a binary format
+        **options: Keyword arguments for the parser's constructor
+
+    Returns:
+        bool: False if the parser's dependencies are not installed in this environment
+    """
+    from parsers import ParserUnavailable, get_parser
+    from parsers.document_io import write_output
+    try:
+        parser = get_parser(parser_name, **options)
+    except ParserUnavailable as e:
+        print(f"⚠️ {e}. Falling back to a subprocess.")
+        return False
+    print(f"⚡ Parsing in-process with {parser_name}")
+    result = parser.parse_all(input_pdf)
+    output_dir = os.path.dirname(output_json)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_output(result, output_json)
+    return True
+
+def route_by_quality(args):
+    """Parse with the cheapest parser and escalate low-quality pages (see database.escalation)."""
+    from .escalation import DEFAULT_DEADLINE, DEFAULT_THRESHOLD, EscalationRouter
+    router = EscalationRouter(
+        ladder=args.ladder.split(",") if args.ladder else None,
+        threshold=args.quality_threshold if args.quality_threshold is not None else DEFAULT_THRESHOLD,
+        deadline=args.deadline if args.deadline is not None else DEFAULT_DEADLINE,
+        in_process=args.in_process,
+    )
+    summary = router.run(args.input_pdf, args.output_json)["escalation"]
+    path = " → ".join(f"{step['parser']} ({step['status']}, {step['seconds']}s)" for step in summary["steps"])
+    print(f"🪜 Escalation path: {path}")
+    if summary["below_threshold"]:
+        print(f"⚠️ Pages still below the quality threshold: {summary['below_threshold']}")
 
 def manage_docker_services(vector_store: str, action: str = "start") -> bool:
     """Start or stop Docker services for the specified vector store.
@@ -102,9 +169,15 @@ def manage_docker_services(vector_store: str, action: str = "start") -> bool:
 def main():
     parser = argparse.ArgumentParser(description="PDF Processing Pipeline")
     parser.add_argument("input_pdf", help="Path to input PDF file")
-    parser.add_argument("output_json", help="Path for output JSON file")
+    parser.add_argument("output_json", help="Path for output JSON file (.msgpack/.msgpack.zst also work; .arrow/.parquet only for outputs with a text per page, e.g. --in-process or quality routing)")
     parser.add_argument("--vector-store", choices=list(VECTOR_STORE_CONFIGS.keys()), default="milvus")
     parser.add_argument("--store-only", action="store_true", help="Only run the storage step (for internal use)")
+    parser.add_argument("--in-process", action="store_true", help="Run the parser in this process when its dependencies are installed here")
+    parser.add_argument("--route", choices=["analyzer", "quality"], default="analyzer",
+                        help="analyzer: pick one parser from the PDF's category; quality: start with the cheapest parser and escalate low-quality pages")
+    parser.add_argument("--ladder", default=None, help="Quality routing: comma-separated parsers, cheapest first (default: mupdf,docling,paddleocr,llamaparse)")
+    parser.add_argument("--quality-threshold", type=float, default=None, help="Quality routing: escalate pages scoring below this (default: 0.6)")
+    parser.add_argument("--deadline", type=float, default=None, help="Quality routing: seconds per document before the best result so far is kept (default: 300)")
     args = parser.parse_args()
 
     env_map = {
@@ -140,20 +213,26 @@ def main():
         return
 
     # PHASE 1: Analysis and parsing (in pipeline_env)
-    from analyzer.analyze_pdf import analyze_pdf
-    category = analyze_pdf(args.input_pdf)
-    print(f"📊 Detected category: {category}")
-
-    # Route to appropriate parser (still in pipeline_env)
-    if category == "scanned_pdf":
-        run_parser("llama_parse_env", "llama_parser.py", args.input_pdf, args.output_json)
-    elif category == "native_table":
-        run_parser("docling_env", "docling_parser.py", args.input_pdf, args.output_json)
-    elif category == "native_text":
-        run_parser("pdfminer_env", "pdfminer_parser.py", args.input_pdf, args.output_json)
+    if args.route == "quality":
+        route_by_quality(args)
     else:
-        print("❌ Unable to determine suitable parser for this PDF.")
-        return
+        from analyzer.analyze_pdf import analyze_pdf
+        category = analyze_pdf(args.input_pdf)
+        print(f"📊 Detected category: {category}")
+
+        # Route to appropriate parser (still in pipeline_env)
+        if category == "scanned_pdf":
+            run_parser("llama_parse_env", "llama_parser.py", args.input_pdf, args.output_json)
+        elif category == "native_table":
+            # Native PDFs already carry a text layer, so skip Docling's OCR stage
+            if not (args.in_process and parse_in_process("docling", args.input_pdf, args.output_json, profile="tables-only")):
+                run_parser("docling_env", "docling_parser.py", args.input_pdf, args.output_json, ["--profile", "tables-only"])
+        elif category == "native_text":
+            if not (args.in_process and parse_in_process("pdfminer", args.input_pdf, args.output_json)):
+                run_parser("pdfminer_env", "pdfminer_parser.py", args.input_pdf, args.output_json)
+        else:
+            print("❌ Unable to determine suitable parser for this PDF.")
+            return
 
     # PHASE 2: Switch to vector DB environment for storage
     if args.vector_store in env_map and current_env != env_map[args.vector_store]:
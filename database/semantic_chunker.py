@@ -0,0 +1,182 @@
+"""Semantic chunking: boundaries where neighbouring sentences change topic."""
+
+import os
+import re
+import hashlib
+from functools import lru_cache
+from typing import List, Optional
+
+from config.vector_store_config import CHUNK_CONFIG, COMMON_CONFIG
+from parsers.cache_utils import evict_lru
+from .text_chunker import RecursiveTokenSplitter, TokenCounter, get_tokenizer
+
+DEFAULT_CACHE_DIR = os.path.join("shared", "embedding_cache")
+DEFAULT_MAX_BYTES = 1024 ** 3
+DEFAULT_WINDOW = 3  # sentences compared on each side of a candidate boundary
+DEFAULT_PERCENTILE = 90  # gaps more dissimilar than this share of all gaps become boundaries
+DEFAULT_BATCH_SIZE = 256
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is not installed. Please install it with 'pip install numpy'")
+    return numpy
+
+@lru_cache(maxsize=None)
+def _load_model(model_name: str):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError("sentence-transformers is not installed. Please install it with 'pip install sentence-transformers'")
+    return SentenceTransformer(model_name)
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences and paragraph-level fragments of a text, stripped and non-empty."""
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence and sentence.strip()]
+
+class EmbeddingCache:
+    """
+    Sentence embeddings of whole documents on disk, keyed by model and sentences.
+
+    Re-chunking a document (another token budget or percentile) reuses its
+    embeddings instead of running the model again. Entries are .npy files,
+    evicted least recently used first past ``max_bytes``.
+
+    Setting EMBEDDING_CACHE=0 in the environment turns the cache off.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            cache_dir (str, optional): Cache directory
+                (default: $EMBEDDING_CACHE_DIR or shared/embedding_cache)
+            max_bytes (int, optional): Cache size budget (default: $EMBEDDING_CACHE_MAX_BYTES or 1 GiB)
+        """
+        self.cache_dir = cache_dir or os.environ.get("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.enabled = os.environ.get("EMBEDDING_CACHE", "1") != "0"
+        self.hits = self.misses = 0
+
+    def _entry_path(self, model_name: str, sentences: List[str]) -> str:
+        digest = hashlib.sha256(model_name.encode("utf-8"))
+        for sentence in sentences:
+            digest.update(b"\0" + sentence.encode("utf-8"))
+        return os.path.join(self.cache_dir, digest.hexdigest() + ".npy")
+
+    def get(self, model_name: str, sentences: List[str]):
+        """Cached embeddings of these sentences, or None."""
+        if not self.enabled:
+            return None
+        path = self._entry_path(model_name, sentences)
+        try:
+            embeddings = _import_numpy().load(path)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return embeddings
+
+    def put(self, model_name: str, sentences: List[str], embeddings) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(model_name, sentences)
+        partial_path = f"{path}.{os.getpid()}.tmp"
+        with open(partial_path, "wb") as f:
+            _import_numpy().save(f, embeddings)
+        os.replace(partial_path, path)
+        evict_lru(self.cache_dir, self.max_bytes - os.path.getsize(path), suffix=".npy", keep=(os.path.basename(path),))
+
+def embed_sentences(sentences: List[str], model_name: Optional[str] = None,
+                    cache: Optional[EmbeddingCache] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Unit-length embeddings of a document's sentences, as one (n, dim) float32 array.
+
+    The whole document is encoded in batches of ``batch_size`` sentences and the
+    result is stored in (and served from) the embedding cache.
+    """
+    np = _import_numpy()
+    model_name = model_name or COMMON_CONFIG["embedding_model"]
+    if cache is not None:
+        embeddings = cache.get(model_name, sentences)
+        if embeddings is not None:
+            return embeddings
+    embeddings = _load_model(model_name).encode(
+        sentences, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True,
+    ).astype(np.float32, copy=False)
+    if cache is not None:
+        cache.put(model_name, sentences, embeddings)
+    return embeddings
+
+def boundary_distances(embeddings, window: int = DEFAULT_WINDOW):
+    """
+    Cosine distance between the windows before and after each sentence gap.
+
+    Window sums come from one cumulative sum over the document, so every gap
+    costs O(dim) regardless of the window size.
+
+    Returns:
+        Array of n - 1 distances; entry i is the gap between sentences i and i + 1
+    """
+    np = _import_numpy()
+    n = len(embeddings)
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+    cumulative = np.vstack([np.zeros((1, embeddings.shape[1]), dtype=embeddings.dtype), np.cumsum(embeddings, axis=0)])
+    gaps = np.arange(1, n)
+    before = cumulative[gaps] - cumulative[np.maximum(gaps - window, 0)]
+    after = cumulative[np.minimum(gaps + window, n)] - cumulative[gaps]
+    norms = np.linalg.norm(before, axis=1) * np.linalg.norm(after, axis=1)
+    similarity = np.einsum("ij,ij->i", before, after) / np.maximum(norms, 1e-12)
+    return 1.0 - similarity
+
+def semantic_chunk_text(text: str, max_tokens: int = None, model_name: str = None,
+                        percentile: float = DEFAULT_PERCENTILE, window: int = DEFAULT_WINDOW,
+                        cache: Optional[EmbeddingCache] = None) -> List[str]:
+    """
+    Chunk text at the sentence gaps where the topic shifts most.
+
+    Gaps whose distance is above the given percentile of the document's gaps
+    become boundaries. A segment over the token budget is cut between sentences,
+    and a single sentence over it with the recursive splitter.
+    Args:
+        text: The text to chunk.
+        max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
+        model_name: Embedding model for sentences and tokens (defaults to the configured one)
+        percentile: Distance percentile above which a gap is a boundary
+        window: Sentences on each side of a gap that are compared
+        cache: Embedding cache (default: an EmbeddingCache with the environment's settings)
+    Returns:
+        List of text chunks
+    """
+    max_tokens = max_tokens or CHUNK_CONFIG["max_tokens"]
+    model_name = model_name or COMMON_CONFIG["embedding_model"]
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    np = _import_numpy()
+    embeddings = embed_sentences(sentences, model_name, cache if cache is not None else EmbeddingCache())
+    distances = boundary_distances(embeddings, window)
+    cuts = set()
+    if len(distances):
+        cuts = set((np.flatnonzero(distances > np.percentile(distances, percentile)) + 1).tolist())
+
+    tokenizer = get_tokenizer(model_name)
+    counter = TokenCounter(tokenizer)
+    chunks, current, current_tokens = [], [], 0
+    for i, (sentence, tokens) in enumerate(zip(sentences, counter.count_many(sentences))):
+        if current and (i in cuts or current_tokens + tokens > max_tokens):
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            chunks.extend(RecursiveTokenSplitter(max_tokens, min(CHUNK_CONFIG["overlap"], max_tokens // 2), tokenizer).split_text(sentence))
+            continue
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -2798,9 +2798,11 @@ Your long input text goes here.
 It can be multiple paragraphs, tables, or any content you want to test.
 """
 
-chunks = chunk_text_with_strategy(input_text, strategy="recursive")
+# Guarded so benchmark_chunking.py can import input_text as its sample document
+if __name__ == "__main__":
+    chunks = chunk_text_with_strategy(input_text, strategy="recursive")
 
-for i, chunk in enumerate(chunks, 1):
-    print(f"--- Chunk {i} ---")
-    print(chunk)
-    print()
+    for i, chunk in enumerate(chunks, 1):
+        print(f"--- Chunk {i} ---")
+        print(chunk)
+        print()
@@ -1,25 +1,35 @@
 """Utility module for text chunking."""
 
 import json
-from typing import List, Dict, Any, Union
-from transformers import AutoTokenizer
-from config.vector_store_config import CHUNK_CONFIG
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
+from config.vector_store_config import CHUNK_CONFIG, COMMON_CONFIG
 from .vector_store_factory import VectorStoreFactory
+from parsers.document_io import iter_page_texts, read_output
 import re
 
-# Initialize the HuggingFace tokenizer
-tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+@lru_cache(maxsize=None)
+def _load_tokenizer(model_name: str):
+    # transformers is imported here: it alone takes seconds to import
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name)
 
-# Add import for LangChain's RecursiveCharacterTextSplitter
-try:
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-    _HAS_LANGCHAIN = True
-except ImportError:
-    _HAS_LANGCHAIN = False
+def get_tokenizer(model_name: Optional[str] = None):
+    """Return the HuggingFace tokenizer of a model, loading it once per process.
+    
+    Args:
+        model_name: Model whose tokenizer to use (defaults to the configured embedding model)
+        
+    Returns:
+        The tokenizer, shared by every caller in this process
+    """
+    return _load_tokenizer(model_name or COMMON_CONFIG["embedding_model"])
 
 def chunk_text(text: str, max_tokens: int = None, overlap: int = None) -> list:
     """
-    Chunk text using LangChain's RecursiveCharacterTextSplitter by default.
+    Chunk text with the token-aware recursive splitter by default.
     Args:
         text: The text to chunk.
         max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
@@ -29,31 +39,82 @@ def chunk_text(text: str, max_tokens: int = None, overlap: int = None) -> list:
     """
     return recursive_chunk_text(text, max_tokens, overlap)
 
-def resolve_references(data: Dict[str, Any], ref_path: str) -> Any:
-    """Resolve JSON references in Docling format.
+# Chunk keys copied into the stored metadata: spreadsheet rows, Docling page and
+# label, and the page range, boxes and (when not top-left) box origin of layout chunks
+CHUNK_METADATA_KEYS = ("sheet", "first_row", "last_row", "page", "page_start", "page_end", "label", "bboxes", "bbox_origin")
+
+# Docling collections that body/group children refer to with "#/<collection>/<index>"
+DOCLING_COLLECTIONS = ("texts", "tables", "groups", "pictures", "key_value_items", "form_items")
+
+def is_docling_document(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("body"), dict) and isinstance(data.get("texts"), list)
+
+def docling_table_rows(table: Dict[str, Any]) -> List[List[str]]:
+    """Cell texts of a Docling table, row by row.
+    
+    Uses the serialized grid when present, otherwise places table_cells by
+    their row/column offsets (spanning cells fill every position they cover).
+    """
+    table_data = table.get("data") or {}
+    grid = table_data.get("grid")
+    if grid:
+        return [[(cell or {}).get("text", "") for cell in row] for row in grid]
+    rows = [[""] * table_data.get("num_cols", 0) for _ in range(table_data.get("num_rows", 0))]
+    for cell in table_data.get("table_cells", []):
+        for r in range(cell["start_row_offset_idx"], cell["end_row_offset_idx"]):
+            for c in range(cell["start_col_offset_idx"], cell["end_col_offset_idx"]):
+                if r < len(rows) and c < len(rows[r]):
+                    rows[r][c] = cell.get("text", "")
+    return rows
+
+def table_to_markdown(rows: List[List[str]]) -> str:
+    """Pipe table with the first row as header."""
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        cells = [str(cell).replace("|", "\\|").replace("\n", " ").strip() for cell in row]
+        lines.append("| " + " | ".join(cells + [""] * (width - len(cells))) + " |")
+        if i == 0:
+            lines.append("| " + " | ".join(["---"] * width) + " |")
+    return "\n".join(lines)
+
+def iter_docling_elements(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk a Docling document's body tree once, in reading order.
+    
+    Every referenced item is looked up in an index built in one pass over the
+    collections, and each item is emitted at most once even if several nodes
+    refer to it. Groups and pictures are containers whose children are walked
+    in place; tables are emitted whole as Markdown pipe tables.
     
     Args:
-        data: Full JSON document
-        ref_path: Reference path (e.g., '#/texts/0')
+        data: DoclingDocument JSON
         
-    Returns:
-        Resolved content
+    Yields:
+        {"type": "text"|"table", "label", "page", "text"} for each element with content
     """
-    if not ref_path.startswith('#/'):
-        return None
-        
-    parts = ref_path[2:].split('/')  # Remove '#/' and split
-    current = data
-    
-    for part in parts:
-        if part.isdigit():
-            part = int(part)
-        if isinstance(current, (dict, list)) and part in current:
-            current = current[part]
+    items = {f"#/{name}/{i}": item
+             for name in DOCLING_COLLECTIONS
+             for i, item in enumerate(data.get(name) or [])}
+    seen = set()
+    stack = [child.get("$ref") for child in reversed(data["body"].get("children", []))]
+    while stack:
+        ref = stack.pop()
+        item = items.get(ref)
+        if item is None or ref in seen:
+            continue
+        seen.add(ref)
+        provenance = item.get("prov") or [{}]
+        page = provenance[0].get("page_no")
+        element_type = "table" if ref.startswith("#/tables/") else "text"
+        if element_type == "table":
+            text = table_to_markdown(docling_table_rows(item))
         else:
-            return None
-            
-    return current
+            text = item.get("text", "")
+        if text:
+            yield {"type": element_type, "label": item.get("label", ""), "page": page, "text": text}
+        stack.extend(child.get("$ref") for child in reversed(item.get("children") or []))
 
 def extract_text_from_json(data: Union[Dict, List, str]) -> str:
     """Extract text content from different JSON formats.
@@ -66,46 +127,54 @@ def extract_text_from_json(data: Union[Dict, List, str]) -> str:
     """
     if isinstance(data, str):
         return data
+    return "\n\n".join(filter(None, iter_text_parts(data)))
+
+def iter_text_parts(data: Union[Dict, List, str]) -> Iterator[str]:
+    """Yield the text entries, pages or results of parser output one at a time.
+    
+    Args:
+        data: JSON data in various formats
+        
+    Yields:
+        Text of each entry, in the order extract_text_from_json joins them
+    """
+    if isinstance(data, str):
+        yield data
+        return
     
     if isinstance(data, list):
         # Handle list format (e.g., from vision parser)
-        text_parts = []
         for item in data:
             if isinstance(item, str):
-                text_parts.append(item)
+                yield item
             elif isinstance(item, dict):
                 # Try different possible key names
                 for key in ['content', 'text', 'value', 'data']:
                     if key in item:
-                        text_parts.append(str(item[key]))
+                        yield str(item[key])
                         break
-        return "\n\n".join(text_parts)
+        return
     
     if isinstance(data, dict):
-        text_parts = []
-        
-        # Handle Docling format - direct text entries
-        if 'texts' in data and isinstance(data['texts'], list):
+        # Handle Docling format - body tree in reading order, each element once
+        if is_docling_document(data):
+            yield from (element['text'] for element in iter_docling_elements(data))
+        # Handle text entries without a body tree
+        elif 'texts' in data and isinstance(data['texts'], list):
             for text_entry in data['texts']:
                 if isinstance(text_entry, dict) and 'text' in text_entry:
-                    text_parts.append(text_entry['text'])
+                    yield text_entry['text']
         
-        # Handle Docling format - references
-        if 'body' in data and isinstance(data['body'], dict):
-            body = data['body']
-            if 'children' in body and isinstance(body['children'], list):
-                for child in body['children']:
-                    if isinstance(child, dict) and '$ref' in child:
-                        ref = child['$ref']
-                        if ref.startswith('#/texts/'):
-                            resolved = resolve_references(data, ref)
-                            if isinstance(resolved, dict) and 'text' in resolved:
-                                text_parts.append(resolved['text'])
+        # Handle MarkItDown format - whole document or streamed spreadsheet blocks
+        if isinstance(data.get('markdown'), str):
+            yield data['markdown']
+        if isinstance(data.get('markdown_blocks'), list):
+            yield from (block['markdown'] for block in data['markdown_blocks'] if isinstance(block, dict))
         
         # Handle direct text content
         for key in ['content', 'text', 'value', 'data']:
             if key in data:
-                text_parts.append(str(data[key]))
+                yield str(data[key])
         
         # Handle pages array (PDFMiner format)
         if 'pages' in data:
@@ -113,26 +182,25 @@ def extract_text_from_json(data: Union[Dict, List, str]) -> str:
             if isinstance(pages, list):
                 for page in pages:
                     if isinstance(page, str):
-                        text_parts.append(page)
+                        yield page
                     elif isinstance(page, dict):
                         # Handle PDFMiner format
                         if 'texts' in page:
-                            page_texts = [text['text'] for text in page['texts'] if isinstance(text, dict) and 'text' in text]
-                            text_parts.extend(page_texts)
+                            yield from (text['text'] for text in page['texts'] if isinstance(text, dict) and 'text' in text)
                         # Handle PaddleOCR format
                         elif 'results' in page:
                             results = page['results']
                             if isinstance(results, list):
                                 for result in results:
                                     if isinstance(result, dict) and 'text' in result:
-                                        text_parts.append(str(result['text']))
+                                        yield str(result['text'])
                         # Handle other page formats
                         else:
                             status = page.get('status', page.get('success', True))
                             if status:
                                 for key in ['content', 'text', 'value', 'data']:
                                     if key in page:
-                                        text_parts.append(str(page[key]))
+                                        yield str(page[key])
                                         break
         
         # Handle PaddleOCR format at root level
@@ -141,72 +209,163 @@ def extract_text_from_json(data: Union[Dict, List, str]) -> str:
             if isinstance(results, list):
                 for result in results:
                     if isinstance(result, dict) and 'text' in result:
-                        text_parts.append(str(result['text']))
-        
-        return "\n\n".join(filter(None, text_parts))
+                        yield str(result['text'])
+
+def iter_chunks(json_path: str, max_tokens: int = None, overlap: int = None,
+                model_name: str = None) -> Iterator[Dict[str, str]]:
+    """Hybrid-chunk a parser output page by page, yielding chunks as they are made.
     
-    return ""
+    Columnar outputs (.arrow/.parquet) are memory-mapped and only their text
+    column is read. Paragraphs never span pages, so this gives the same chunks
+    as chunking the joined text while holding a single page at a time.
+    
+    Args:
+        json_path: Path to the parser output
+        max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
+        overlap: Overlap tokens between chunks (defaults to CHUNK_CONFIG["overlap"])
+        model_name: Embedding model whose tokenizer counts tokens
+        
+    Yields:
+        Dicts of {"type": "text"|"table", "content": ...}, plus sheet/row keys for
+        spreadsheets, page/label keys for Docling documents, and page range and
+        boxes for outputs with coordinates (PDFMiner, MuPDF, PaddleOCR)
+    """
+    if max_tokens is None:
+        max_tokens = CHUNK_CONFIG["max_tokens"]
+    if overlap is None:
+        overlap = CHUNK_CONFIG["overlap"]
+    texts = iter_page_texts(json_path)
+    if texts is None:
+        # JSON, msgpack, or a layout without page texts; format chosen by extension
+        data = read_output(json_path)
+        if isinstance(data, dict) and isinstance(data.get("markdown_blocks"), list):
+            yield from _markdown_block_chunks(data["markdown_blocks"], max_tokens, model_name)
+            return
+        if is_docling_document(data):
+            yield from _docling_chunks(data, max_tokens, overlap, model_name)
+            return
+        if CHUNK_CONFIG.get("layout_aware", True):
+            # Imported here: layout_chunker builds on this module
+            from .layout_chunker import layout_chunks, layout_document
+            document = layout_document(data)
+            if document is not None and document.num_spans:
+                yield from layout_chunks(document, max_tokens, model_name=model_name)
+                return
+        texts = filter(None, iter_text_parts(data))
+
+    tokenizer = get_tokenizer(model_name)
+    for text in texts:
+        yield from _hybrid_chunks(text, max_tokens, overlap, tokenizer)
+
+def _docling_chunks(data: Dict[str, Any], max_tokens: int, overlap: int, model_name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk Docling elements one by one, tagging each chunk with its element's page and label.
+
+    Tables over the token budget are split between rows, with their header repeated.
+    """
+    tokenizer = get_tokenizer(model_name)
+    counter = TokenCounter(tokenizer)
+    for element in iter_docling_elements(data):
+        if element["type"] == "table":
+            chunks = [{"type": "table", "content": piece}
+                      for piece in _table_chunks(element["text"].split("\n"), max_tokens, counter)]
+        else:
+            chunks = _hybrid_chunks(element["text"], max_tokens, overlap, tokenizer)
+        for chunk in chunks:
+            yield {**chunk, "page": element["page"], "label": element["label"]}
+
+def _markdown_block_chunks(blocks: List[Dict[str, Any]], max_tokens: int, model_name: str,
+                           count_batch: int = 256) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk streamed spreadsheet blocks, one chunk per block that fits the token budget.
 
-def process_pdf_json(json_path: str, source_id: str, vector_store_config: Dict[str, Any]) -> bool:
+    Blocks are sized in characters by the parser, so dense tables can still run
+    over the budget; those are split between rows, each piece keeping the
+    sheet heading and the table header.
+    """
+    counter = TokenCounter(get_tokenizer(model_name))
+    for batch in iter_batches(blocks, count_batch):
+        for block, tokens in zip(batch, counter.count_many([block["markdown"] for block in batch])):
+            metadata = {key: block[key] for key in CHUNK_METADATA_KEYS if key in block}
+            lines = block["markdown"].split("\n")
+            # The parser writes "## <sheet>" and a blank line above the table
+            heading = lines[:2] if lines[0].startswith("#") else []
+            if tokens <= max_tokens or len(lines) <= len(heading):
+                yield {"type": "table", "content": block["markdown"], **metadata}
+                continue
+            table_budget = max(max_tokens - counter("\n".join(heading)), 1)
+            for piece in _table_chunks(lines[len(heading):], table_budget, counter):
+                yield {"type": "table", "content": "\n".join(heading + [piece]), **metadata}
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most batch_size items."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def process_pdf_json(json_path: str, source_id: str, vector_store_config: Dict[str, Any],
+                     batch_size: int = None) -> bool:
     """Process PDF JSON file and store chunks in vector database.
     
+    Chunks are produced page by page and embedded and stored batch_size at a
+    time, so memory use depends on the batch size rather than the document.
+    
     Args:
-        json_path: Path to JSON file containing parsed PDF content
+        json_path: Path to the parser output (.json, .msgpack, .msgpack.zst, .arrow, .parquet)
         source_id: Identifier for the source document
         vector_store_config: Configuration for the vector store
+        batch_size: Chunks per embedding/upsert call (defaults to CHUNK_CONFIG["batch_size"])
     
     Returns:
         bool: True if processing was successful
     """
-    print(f"✅ Loading JSON from: {json_path}")
+    print(f"✅ Loading parser output from: {json_path}")
+    batch_size = batch_size or CHUNK_CONFIG["batch_size"]
     
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        model_name = vector_store_config.get("embedding_model")
+        packer = ChunkPacker(model_name=model_name)
+        chunks = packer.pack(iter_chunks(json_path, model_name=model_name))
+        vector_store = None
+        stored = 0
+        type_counts: Dict[str, int] = {}
+        for batch in iter_batches(chunks, batch_size):
+            # Prepare metadata for each chunk (include chunk type)
+            metadata = []
+            for i, chunk in enumerate(batch, start=stored):
+                metadata.append({
+                    "source": source_id,
+                    "chunk_index": i,
+                    "file_path": json_path,
+                    "chunk_type": chunk["type"],
+                    **{key: chunk[key] for key in CHUNK_METADATA_KEYS if chunk.get(key) is not None}
+                })
+                type_counts[chunk["type"]] = type_counts.get(chunk["type"], 0) + 1
             
-        # Debug: Print JSON structure
-        print("📄 JSON structure:")
-        if "texts" in data:
-            print(f"Found {len(data['texts'])} text entries")
-            
-        # Extract text from any JSON format
-        full_text = extract_text_from_json(data)
-        print(f"📝 Extracted text length: {len(full_text)}")
-        if full_text:
-            print("📝 First 200 characters of extracted text:")
-            print(full_text[:200])
-        
-        # Hybrid chunking
-        hybrid_chunks = hybrid_chunk_text(full_text)
-        print(f"✅ Hybrid chunked into {len(hybrid_chunks)} segments.")
-        print(f"Chunk types: {[chunk['type'] for chunk in hybrid_chunks[:10]]} ...")
+            # Store the batch in the vector database
+            try:
+                if vector_store is None:
+                    vector_store = VectorStoreFactory.create(vector_store_config)
+                if vector_store.store_chunks(flatten_hybrid_chunks(batch), metadata) is False:
+                    print(f"❌ Vector store rejected chunks {stored}-{stored + len(batch) - 1}")
+                    return False
+            except Exception as e:
+                print(f"❌ Error storing chunks in vector database: {str(e)}")
+                return False
+            stored += len(batch)
         
-        # Flatten for embedding/storage
-        chunks = flatten_hybrid_chunks(hybrid_chunks)
-        
-        if not chunks:
+        if not stored:
             print("❌ No text chunks generated")
             return False
-        
-        # Prepare metadata for each chunk (include chunk type)
-        metadata = []
-        for i, chunk in enumerate(hybrid_chunks):
-            metadata.append({
-                "source": source_id,
-                "chunk_index": i,
-                "total_chunks": len(hybrid_chunks),
-                "file_path": json_path,
-                "chunk_type": chunk["type"]
-            })
-        
-        # Store chunks in vector database
-        try:
-            vector_store = VectorStoreFactory.create(vector_store_config)
-            vector_store.store_chunks(chunks, metadata)
-            return True
-        except Exception as e:
-            print(f"❌ Error storing chunks in vector database: {str(e)}")
-            return False
+        if packer.chunks_in:
+            reduction = 100 * (1 - packer.chunks_out / packer.chunks_in)
+            print(f"📦 Packed {packer.chunks_in} chunks into {packer.chunks_out} ({reduction:.0f}% fewer, "
+                  f"{packer.dropped} under {packer.min_tokens} tokens dropped)")
+        print(f"✅ Stored {stored} chunks in batches of {batch_size}. Chunk types: {type_counts}")
+        return True
             
     except json.JSONDecodeError as e:
         print(f"❌ Invalid JSON in {json_path}: {str(e)}")
@@ -216,76 +375,123 @@ def process_pdf_json(json_path: str, source_id: str, vector_store_config: Dict[s
         print(f"❌ Error processing JSON: {str(e)}")
         return False
 
-def is_table(element):
-    # If your element is a dict/object, check for a 'type' field or structure
-    if isinstance(element, dict) and element.get("type") == "table":
-        return True
-    # If it's a string, use heuristics
-    table_keywords = ['table', 'row', 'column', 'cell']
-    if isinstance(element, str) and any(word in element.lower() for word in table_keywords):
-        # You can improve this with regex or structure checks
-        return True
-    return False
+# Line patterns for table detection, compiled once
+PIPE_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+TABLE_RULE = re.compile(r'^\s*(\+[-=+]+\+|\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?)\s*$')
+SPACE_COLUMN_SPLIT = re.compile(r'\s{2,}')
 
-def table_aware_chunking(elements, max_tokens=512, overlap=50):
-    chunks = []
-    buffer = ""
-    for elem in elements:
-        if is_table(elem):
-            # Flush buffer as a chunk before adding the table
-            if buffer.strip():
-                chunks.extend(tokenizer_based_chunking(buffer, max_tokens, overlap))
-                buffer = ""
-            # Add the table as a single chunk (stringify if needed)
-            chunks.append({"type": "table", "content": str(elem)})
-        else:
-            buffer += elem if isinstance(elem, str) else str(elem)
-            buffer += "\n"
-    # Chunk any remaining buffer
-    if buffer.strip():
-        chunks.extend(tokenizer_based_chunking(buffer, max_tokens, overlap))
-    return chunks
+# Minimum consecutive lines, and share of rows with the most common column
+# count, for a run of candidate lines to count as a table
+MIN_TABLE_LINES = {"pipe": 2, "tab": 2, "space": 3}
+MIN_ALIGNED_SHARE = {"pipe": 0.6, "tab": 0.6, "space": 0.8}
+
+def _table_line(line: str):
+    """Family ("pipe", "tab", "space" or None) and column count of one line."""
+    stripped = line.strip()
+    if not stripped:
+        return None, 0
+    if TABLE_RULE.match(stripped) and ("|" in stripped or "+" in stripped):
+        return "pipe", 0
+    if stripped.count("|") >= 2:
+        return "pipe", len(PIPE_CELL_SPLIT.split(stripped.strip("|")))
+    if "\t" in stripped:
+        return "tab", stripped.count("\t") + 1
+    columns = len(SPACE_COLUMN_SPLIT.split(stripped))
+    return ("space", columns) if columns > 1 else (None, 0)
+
+def find_table_regions(lines: List[str]) -> List[tuple]:
+    """
+    Find runs of consecutive lines that form a table.
+
+    Each line is classified once (pipe-delimited or rule, tab-separated, or
+    columns separated by runs of spaces). A run of same-family lines is a table
+    when it is long enough and most of its rows have the same column count;
+    space-separated rows must also have a column starting at the same offset.
+    Args:
+        lines: Lines of a text block
+    Returns:
+        List of (start, end) line ranges, end exclusive
+    """
+    regions = []
+    run_family, run_start, counts = None, 0, []
 
-def tokenizer_based_chunking(text, max_tokens, overlap):
-    # Use your existing chunk_text logic here
-    return [{"type": "text", "content": chunk} for chunk in chunk_text(text)]
+    def close(end):
+        if run_family is None or end - run_start < MIN_TABLE_LINES[run_family]:
+            return
+        column_counts = [count for count in counts if count]
+        if not column_counts:
+            return
+        most_common, rows = Counter(column_counts).most_common(1)[0]
+        needed = MIN_ALIGNED_SHARE[run_family] * len(column_counts)
+        if most_common < 2 or rows < needed:
+            return
+        if run_family == "space":
+            # Prose with double spaces has no column edge shared by most lines
+            starts = Counter(match.end() for line in lines[run_start:end]
+                             for match in SPACE_COLUMN_SPLIT.finditer(line.rstrip()))
+            if not starts or starts.most_common(1)[0][1] < needed:
+                return
+        regions.append((run_start, end))
+
+    for i, line in enumerate(lines):
+        family, columns = _table_line(line)
+        if family != run_family:
+            close(i)
+            run_family, run_start, counts = family, i, []
+        counts.append(columns)
+    close(len(lines))
+    return regions
 
 def is_table_block(text_block):
-    # Heuristic 1: Table keywords
-    table_keywords = ['table', 'row', 'column', 'cell', 'header']
-    if any(word in text_block.lower() for word in table_keywords):
-        return True
+    """True when the non-blank lines of a block form a single table."""
+    lines = [line for line in text_block.strip().split('\n') if line.strip()]
+    return find_table_regions(lines) == [(0, len(lines))] if lines else False
 
-    # Heuristic 2: Delimiter-based (pipes or tabs)
-    lines = text_block.strip().split('\n')
-    if len(lines) > 1:
-        # Check for consistent number of pipes or tabs
-        pipe_counts = [line.count('|') for line in lines]
-        tab_counts = [line.count('\t') for line in lines]
-        if len(set(pipe_counts)) == 1 and pipe_counts[0] > 1:
-            return True
-        if len(set(tab_counts)) == 1 and tab_counts[0] > 1:
-            return True
-
-    # Heuristic 3: ASCII-art table
-    if re.search(r'^\s*\+-[-+]+\+\s*$', text_block, re.MULTILINE):
-        return True
+def _split_table_header(lines: List[str]) -> tuple:
+    """Header lines (the first row with the rule lines around it) and data rows of a table."""
+    header_end = 0
+    while header_end < len(lines) and TABLE_RULE.match(lines[header_end]):
+        header_end += 1
+    header_end += 1
+    while header_end < len(lines) and TABLE_RULE.match(lines[header_end]):
+        header_end += 1
+    return lines[:header_end], lines[header_end:]
 
-    # Heuristic 4: Multiple columns with spaces
-    if len(lines) > 1:
-        col_counts = [len(re.split(r'\s{2,}', line)) for line in lines]
-        if len(set(col_counts)) == 1 and col_counts[0] > 1:
-            return True
+def _table_count_texts(lines: List[str]) -> List[str]:
+    """Texts whose token counts _table_chunks needs: whole table, header, then each row."""
+    header, rows = _split_table_header(lines)
+    return ["\n".join(lines), "\n".join(header)] + rows
 
-        return False
+def _table_chunks(lines: List[str], max_tokens: int, counter: "TokenCounter") -> List[str]:
+    """
+    Split a table at the token budget, repeating its header in every piece.
+
+    Rows are never cut, so a row longer than the budget gets a piece of its own.
+    """
+    header, rows = _split_table_header(lines)
+    whole_tokens, header_tokens, *row_tokens = counter.count_many(_table_count_texts(lines))
+    if whole_tokens <= max_tokens or not rows:
+        return ["\n".join(lines)]
 
-def hybrid_chunk_text(text: str, max_tokens: int = None, overlap: int = None) -> List[Dict[str, str]]:
+    pieces, current, current_tokens = [], [], header_tokens
+    for row, tokens in zip(rows, row_tokens):
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("\n".join(header + current))
+            current, current_tokens = [], header_tokens
+        current.append(row)
+        current_tokens += tokens
+    pieces.append("\n".join(header + current))
+    return pieces
+
+def hybrid_chunk_text(text: str, max_tokens: int = None, overlap: int = None, model_name: str = None) -> List[Dict[str, str]]:
     """
     Hybrid chunking: splits text into tables and non-table blocks, preserves tables, splits long blocks recursively.
+    Small adjacent chunks are then packed up to max_tokens (see ChunkPacker).
     Args:
         text: The full text to chunk.
         max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
         overlap: Overlap tokens between chunks (defaults to CHUNK_CONFIG["overlap"])
+        model_name: Embedding model whose tokenizer counts tokens (defaults to the configured one)
     Returns:
         List of dicts: {"type": "text"|"table", "content": ...}
     """
@@ -293,55 +499,186 @@ def hybrid_chunk_text(text: str, max_tokens: int = None, overlap: int = None) ->
         max_tokens = CHUNK_CONFIG["max_tokens"]
     if overlap is None:
         overlap = CHUNK_CONFIG["overlap"]
+    tokenizer = get_tokenizer(model_name)
+    return list(ChunkPacker(max_tokens, tokenizer=tokenizer).pack(_hybrid_chunks(text, max_tokens, overlap, tokenizer)))
+
+# A single line that opens a section: Markdown heading, numbered heading or all-caps title
+HEADING_PATTERN = re.compile(
+    r'^(#{1,6}\s+\S.*|(\d+(\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^.!?\n]{0,80}|[A-Z][A-Z0-9 ,&:\-]{2,80})$'
+)
+HEADING_LABELS = {"title", "section_header"}
+
+def starts_section(chunk: Dict[str, Any]) -> bool:
+    """True when a chunk is a heading (by its Docling label, or by its text)."""
+    if "label" in chunk:
+        return chunk["label"] in HEADING_LABELS
+    return bool(HEADING_PATTERN.match(chunk["content"].strip()))
+
+class ChunkPacker:
+    """
+    Greedily merge adjacent small chunks up to the token budget.
+
+    Chunks are merged while they have the same type and the merged chunk stays
+    within ``max_tokens``. A heading starts a new chunk, so sections are not
+    merged into each other, unless the chunk so far is under ``min_tokens``
+    (a title followed by a subheading stays with it). Spreadsheet blocks and
+    layout chunks (already sized, with boxes of their own) are left as they are,
+    however short.
+
+    A text chunk still under ``min_tokens`` after merging is appended to the
+    chunk before it when that fits the budget. Otherwise it is dropped, but
+    only when the document has other chunks: a short document keeps its text.
+    Token counts are taken in batches.
+
+    After pack() is exhausted, ``chunks_in``, ``chunks_out`` and ``dropped``
+    tell how far the chunk count went down.
+    """
+
+    def __init__(self, max_tokens: int = None, min_tokens: int = None, tokenizer=None,
+                 model_name: str = None, count_batch: int = 256):
+        self.max_tokens = max_tokens or CHUNK_CONFIG["max_tokens"]
+        self.min_tokens = CHUNK_CONFIG["min_chunk_size"] if min_tokens is None else min_tokens
+        self.counter = TokenCounter(tokenizer or get_tokenizer(model_name))
+        self.count_batch = count_batch
+        self.chunks_in = self.chunks_out = self.dropped = 0
+
+    def pack(self, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # Each finished group is held back one step, so a short group after it can still be appended
+        held, held_tokens = None, 0
+        group, group_tokens = [], 0
+
+        def finish():
+            nonlocal held, held_tokens
+            # Layout chunks pass through whole: a short one is a caption, heading or signature with its own box
+            short = group[0]["type"] == "text" and "bboxes" not in group[0] and group_tokens < self.min_tokens
+            if short and held is not None:
+                if self._fits(held, held_tokens, group[0], group_tokens):
+                    held, held_tokens = held + group, held_tokens + group_tokens
+                else:
+                    self.dropped += 1
+                return None
+            previous = held
+            held, held_tokens = list(group), group_tokens
+            return previous
+
+        for batch in iter_batches(chunks, self.count_batch):
+            self.chunks_in += len(batch)
+            for chunk, tokens in zip(batch, self.counter.count_many([c["content"] for c in batch])):
+                if group and not self._joins(group, group_tokens, chunk, tokens):
+                    previous = finish()
+                    if previous is not None:
+                        yield self._merge(previous)
+                    group, group_tokens = [], 0
+                group.append(chunk)
+                group_tokens += tokens
+        if group:
+            previous = finish()
+            if previous is not None:
+                yield self._merge(previous)
+        if held is not None:
+            yield self._merge(held)
+
+    def _fits(self, group: List[Dict[str, Any]], group_tokens: int, chunk: Dict[str, Any], tokens: int) -> bool:
+        first = group[0]
+        return (chunk["type"] == first["type"]
+                and not any(key in chunk or key in first for key in ("sheet", "bboxes"))
+                and group_tokens + tokens <= self.max_tokens)
 
-    # Split text into blocks (tables vs. non-tables)
+    def _joins(self, group: List[Dict[str, Any]], group_tokens: int, chunk: Dict[str, Any], tokens: int) -> bool:
+        return (self._fits(group, group_tokens, chunk, tokens)
+                and (group_tokens < self.min_tokens or not starts_section(chunk)))
+
+    def _merge(self, group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        merged = dict(group[0])
+        if len(group) > 1:
+            merged["content"] = "\n\n".join(chunk["content"] for chunk in group)
+            last_page = group[-1].get("page")
+            if last_page is not None and last_page != merged.get("page"):
+                merged["page_end"] = last_page
+        self.chunks_out += 1
+        return merged
+
+def _encode_batch(tokenizer, texts: List[str]) -> List[tuple]:
+    """Token ids and character offsets of each text, in one call for fast tokenizers.
+    
+    Slow (pure Python) tokenizers have no offset mapping; their texts are
+    encoded one by one and the offsets are None.
+    """
+    if not texts:
+        return []
+    if getattr(tokenizer, "is_fast", False):
+        encoded = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True,
+                            return_attention_mask=False, return_token_type_ids=False)
+        return list(zip(encoded["input_ids"], encoded["offset_mapping"]))
+    return [(tokenizer.encode(text, add_special_tokens=False), None) for text in texts]
+
+def _token_windows(tokenizer, text: str, ids: list, offsets, max_tokens: int, overlap: int):
+    """Yield windows of max_tokens tokens, overlap tokens apart, as slices of the original text."""
+    start = 0
+    while start < len(ids):
+        end = min(start + max_tokens, len(ids))
+        if offsets is not None:
+            chunk = text[offsets[start][0]:offsets[end - 1][1]]
+        else:
+            chunk = tokenizer.decode(ids[start:end])
+        if chunk.strip():
+            yield chunk
+        start += max_tokens - overlap
+
+def _hybrid_chunks(text: str, max_tokens: int, overlap: int, tokenizer) -> List[Dict[str, str]]:
+    # Split text into blocks: table regions and the text between them
     blocks = []
-    current = []
     lines = text.splitlines()
-    for line in lines:
-        if is_table_block(line):
-            if current:
-                blocks.append(("text", "\n".join(current)))
-                current = []
-            blocks.append(("table", line))
-        else:
-            current.append(line)
-    if current:
-        blocks.append(("text", "\n".join(current)))
+    position = 0
+    for start, end in find_table_regions(lines):
+        if start > position:
+            blocks.append(("text", "\n".join(lines[position:start])))
+        blocks.append(("table", lines[start:end]))
+        position = end
+    if position < len(lines):
+        blocks.append(("text", "\n".join(lines[position:])))
 
-    # Now process each block
-    chunks = []
+    # Split text blocks by paragraphs (double newlines); tables are only split
+    # at the token budget, with their header repeated
+    items = []
+    counter = TokenCounter(tokenizer)
+    # Count the rows of every table in one batch
+    counter.count_many([piece for block_type, block_content in blocks if block_type == "table"
+                        for piece in _table_count_texts(block_content)])
     for block_type, block_content in blocks:
         if block_type == "table":
-            chunks.append({"type": "table", "content": block_content})
+            items.extend(("table", piece) for piece in _table_chunks(block_content, max_tokens, counter))
         else:
-            # Split by paragraphs (double newlines)
-            paragraphs = [p for p in re.split(r'\n\s*\n', block_content) if p.strip()]
-            for para in paragraphs:
-                # If paragraph is too long, split by sentences
-                if len(tokenizer.encode(para, add_special_tokens=False)) > max_tokens:
-                    # Split by sentences (simple split, can use nltk for better)
-                    sentences = re.split(r'(?<=[.!?])\s+', para)
-                    for sent in sentences:
-                        if not sent.strip():
-                            continue
-                        # Recursively split if still too long
-                        tokens = tokenizer.encode(sent, add_special_tokens=False)
-                        if len(tokens) > max_tokens:
-                            # Token-based split
-                            start = 0
-                            while start < len(tokens):
-                                end = min(start + max_tokens, len(tokens))
-                                chunk = tokenizer.decode(tokens[start:end])
-                                if chunk.strip():
-                                    chunks.append({"type": "text", "content": chunk})
-                                start += max_tokens - overlap
-                        else:
-                            chunks.append({"type": "text", "content": sent.strip()})
-                else:
-                    chunks.append({"type": "text", "content": para.strip()})
-    return chunks
+            items.extend(("text", p) for p in re.split(r'\n\s*\n', block_content) if p.strip())
 
+    # Encode every paragraph in one batch, then the sentences of the paragraphs
+    # that are too long (simple split, can use nltk for better) in a second one
+    paragraphs = [content for item_type, content in items if item_type == "text"]
+    sentences = {}
+    for i, (para, (ids, _)) in enumerate(zip(paragraphs, _encode_batch(tokenizer, paragraphs))):
+        if len(ids) > max_tokens:
+            sentences[i] = [sent for sent in re.split(r'(?<=[.!?])\s+', para) if sent.strip()]
+    sentence_encodings = iter(_encode_batch(tokenizer, [sent for group in sentences.values() for sent in group]))
+
+    chunks = []
+    paragraph_index = -1
+    for item_type, content in items:
+        if item_type == "table":
+            chunks.append({"type": "table", "content": content})
+            continue
+        paragraph_index += 1
+        if paragraph_index not in sentences:
+            chunks.append({"type": "text", "content": content.strip()})
+            continue
+        for sent in sentences[paragraph_index]:
+            ids, offsets = next(sentence_encodings)
+            if len(ids) > max_tokens:
+                # Token-based split, cut from the original text at token offsets
+                chunks.extend({"type": "text", "content": chunk}
+                              for chunk in _token_windows(tokenizer, sent, ids, offsets, max_tokens, overlap))
+            else:
+                chunks.append({"type": "text", "content": sent.strip()})
+    return chunks
 
 def flatten_hybrid_chunks(hybrid_chunks: List[Dict[str, str]]) -> List[str]:
     """
@@ -353,37 +690,129 @@ def flatten_hybrid_chunks(hybrid_chunks: List[Dict[str, str]]) -> List[str]:
     """
     return [chunk["content"] for chunk in hybrid_chunks]
 
-def recursive_chunk_text(text: str, max_tokens: int = None, overlap: int = None) -> list:
+# Separators tried in order: paragraphs, lines, sentences, words, then token windows
+RECURSIVE_SEPARATORS = ["\n\n", "\n", ".", "!", "?", " ", ""]
+
+class TokenCounter:
+    """Count tokens of many texts in one tokenizer call, remembering texts already counted."""
+
+    def __init__(self, tokenizer, cache_size: int = 65536):
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self._counts: Dict[str, int] = {}
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Token count of each text (without special tokens)."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self._counts]
+        if missing:
+            if len(self._counts) + len(missing) > self.cache_size:
+                self._counts.clear()
+            if getattr(self.tokenizer, "is_fast", False):
+                encoded = self.tokenizer(missing, add_special_tokens=False,
+                                         return_attention_mask=False, return_token_type_ids=False)
+                counts = [len(ids) for ids in encoded["input_ids"]]
+            else:
+                counts = [len(self.tokenizer.encode(text, add_special_tokens=False)) for text in missing]
+            self._counts.update(zip(missing, counts))
+        return [self._counts[text] for text in texts]
+
+    def __call__(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+class RecursiveTokenSplitter:
+    """
+    Recursive separator splitting, with chunk sizes measured in tokens.
+
+    Works like LangChain's RecursiveCharacterTextSplitter: the text is split on
+    the first separator it contains, pieces under the budget are merged back
+    into chunks with ``overlap`` tokens carried over, and pieces over it are
+    split again on the next separator. Separators stay at the start of the
+    piece that follows them. The last separator, "", cuts token windows.
+    """
+
+    def __init__(self, max_tokens: int, overlap: int, tokenizer, separators: Optional[List[str]] = None):
+        if overlap >= max_tokens:
+            raise ValueError(f"overlap ({overlap}) must be smaller than max_tokens ({max_tokens})")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.tokenizer = tokenizer
+        self.counter = TokenCounter(tokenizer)
+        self.separators = separators or RECURSIVE_SEPARATORS
+
+    def split_text(self, text: str) -> List[str]:
+        return self._split(text, self.separators)
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        separator, remaining = "", []
+        for i, candidate in enumerate(separators):
+            if candidate == "" or candidate in text:
+                separator, remaining = candidate, separators[i + 1:]
+                break
+        if separator == "":
+            ids, offsets = _encode_batch(self.tokenizer, [text])[0]
+            return [chunk.strip() for chunk in
+                    _token_windows(self.tokenizer, text, ids, offsets, self.max_tokens, self.overlap)]
+
+        parts = re.split(f"({re.escape(separator)})", text)
+        pieces = [parts[0]] + [parts[i] + parts[i + 1] for i in range(1, len(parts), 2)]
+        pieces = [piece for piece in pieces if piece]
+
+        chunks, fitting, fitting_lengths = [], [], []
+        for piece, length in zip(pieces, self.counter.count_many(pieces)):
+            if length < self.max_tokens:
+                fitting.append(piece)
+                fitting_lengths.append(length)
+                continue
+            if fitting:
+                chunks.extend(self._merge(fitting, fitting_lengths))
+                fitting, fitting_lengths = [], []
+            chunks.extend(self._split(piece, remaining or [""]))
+        if fitting:
+            chunks.extend(self._merge(fitting, fitting_lengths))
+        return chunks
+
+    def _merge(self, pieces: List[str], lengths: List[int]) -> List[str]:
+        chunks, window, total = [], [], 0
+        for piece, length in zip(pieces, lengths):
+            if window and total + length > self.max_tokens:
+                chunk = "".join(p for p, _ in window).strip()
+                if chunk:
+                    chunks.append(chunk)
+                # Keep up to `overlap` tokens of the tail, and room for the new piece
+                while total > self.overlap or (total > 0 and total + length > self.max_tokens):
+                    total -= window.pop(0)[1]
+            window.append((piece, length))
+            total += length
+        chunk = "".join(p for p, _ in window).strip()
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+def recursive_chunk_text(text: str, max_tokens: int = None, overlap: int = None, model_name: str = None) -> list:
     """
-    Chunk text using LangChain's RecursiveCharacterTextSplitter.
+    Chunk text recursively on paragraphs, lines, sentences and words, counting real tokens.
     Args:
         text: The text to chunk.
         max_tokens: Max tokens per chunk (defaults to CHUNK_CONFIG["max_tokens"])
         overlap: Overlap tokens between chunks (defaults to CHUNK_CONFIG["overlap"])
+        model_name: Embedding model whose tokenizer counts tokens (defaults to the configured one)
     Returns:
         List of text chunks
     """
-    if not _HAS_LANGCHAIN:
-        raise ImportError("LangChain is not installed. Please install langchain to use recursive chunking.")
     if max_tokens is None:
         max_tokens = CHUNK_CONFIG["max_tokens"]
     if overlap is None:
         overlap = CHUNK_CONFIG["overlap"]
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=max_tokens,
-        chunk_overlap=overlap,
-        separators=["\n\n", "\n", ".", "!", "?", " ", ""]
-    )
-    return splitter.split_text(text)
+    return RecursiveTokenSplitter(max_tokens, overlap, get_tokenizer(model_name)).split_text(text)
 
 def chunk_text_with_strategy(text: str, strategy: str = "tokenizer", max_tokens: int = None, overlap: int = None) -> list:
     """
     Chunk text using the selected strategy.
     Args:
         text: The text to chunk.
-        strategy: 'tokenizer', 'hybrid', or 'recursive'
+        strategy: 'tokenizer', 'hybrid', 'recursive' or 'semantic'
         max_tokens: Max tokens per chunk
-        overlap: Overlap tokens between chunks
+        overlap: Overlap tokens between chunks (not used by 'semantic', which cuts between sentences)
     Returns:
         List of text chunks
     """
@@ -393,5 +822,9 @@ def chunk_text_with_strategy(text: str, strategy: str = "tokenizer", max_tokens:
         return hybrid_chunk_text(text, max_tokens, overlap)
     elif strategy == "recursive":
         return recursive_chunk_text(text, max_tokens, overlap)
+    elif strategy == "semantic":
+        # Imported here: needs numpy and sentence-transformers
+        from .semantic_chunker import semantic_chunk_text
+        return semantic_chunk_text(text, max_tokens)
     else:
-        raise ValueError(f"Unknown chunking strategy: {strategy}") 
\ No newline at end of file
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
@@ -0,0 +1,3 @@
+"""PDF parsers. Each module also runs as a standalone script in its own environment."""
+
+from .registry import PARSERS, BaseParser, ParserUnavailable, available_parsers, get_parser, is_available
@@ -0,0 +1,170 @@
+"""Choose a render resolution per page from the size of its text."""
+
+import os
+import math
+import logging
+import statistics
+from typing import List, Optional
+
+from .page_cache import PageRasterCache
+
+DEFAULT_FLOOR = 150
+DEFAULT_CEILING = 400
+# OCR models read best with roughly this many pixels per em of body text
+DEFAULT_TARGET_PX = 30
+# Chosen values are rounded up to a multiple of this, so pages share page cache entries
+DPI_STEP = 25
+# Resolution of the grayscale preview used to measure text lines on scans (1 px = 1 pt)
+PROBE_DPI = 72
+
+# Bytes below this value count as ink in the preview
+_DARK = bytes(range(128))
+
+def dpi_for_text_height(height_pt: float, floor: int = DEFAULT_FLOOR, ceiling: int = DEFAULT_CEILING,
+                        target_px: int = DEFAULT_TARGET_PX) -> int:
+    """
+    Resolution at which text of the given height spans ``target_px`` pixels.
+
+    Args:
+        height_pt (float): Dominant text height in points
+        floor (int): Lowest resolution returned
+        ceiling (int): Highest resolution returned
+        target_px (int): Wanted text height in pixels
+
+    Returns:
+        int: Resolution in dpi, rounded up to a multiple of DPI_STEP and clamped
+    """
+    dpi = target_px * 72 / height_pt
+    dpi = math.ceil(dpi / DPI_STEP) * DPI_STEP
+    return max(floor, min(ceiling, dpi))
+
+def line_heights(samples: bytes, width: int, height: int, min_ink: float = 0.01) -> List[int]:
+    """
+    Heights in pixels of the text lines of a grayscale image, from its horizontal projection profile.
+
+    A row belongs to a text line when at least ``min_ink`` of its pixels are dark;
+    runs of such rows shorter than two pixels are treated as rules or noise.
+
+    Args:
+        samples (bytes): Row-major 8-bit grayscale pixels
+        width (int): Image width
+        height (int): Image height
+        min_ink (float): Fraction of dark pixels marking a text row
+
+    Returns:
+        List[int]: Height of each text line, top to bottom
+    """
+    threshold = max(1, int(width * min_ink))
+    heights, run = [], 0
+    for y in range(height):
+        row = samples[y * width:(y + 1) * width]
+        ink = width - len(row.translate(None, _DARK))
+        if ink >= threshold:
+            run += 1
+            continue
+        if run >= 2:
+            heights.append(run)
+        run = 0
+    if run >= 2:
+        heights.append(run)
+    return heights
+
+class DpiChooser:
+    """
+    Pick the render resolution of each page from its dominant text height.
+
+    Pages with a text layer are measured from their font sizes (weighted by
+    characters); scanned pages from the line heights of a low-resolution
+    grayscale preview. Scans are never rendered above the resolution of their
+    embedded image, and blank pages get the floor.
+
+    The floor and ceiling default to $OCR_DPI_FLOOR and $OCR_DPI_CEILING.
+    """
+
+    def __init__(self, floor: Optional[int] = None, ceiling: Optional[int] = None,
+                 target_px: int = DEFAULT_TARGET_PX, page_cache: Optional[PageRasterCache] = None):
+        """
+        Args:
+            floor (int, optional): Lowest resolution (default: $OCR_DPI_FLOOR or 150)
+            ceiling (int, optional): Highest resolution (default: $OCR_DPI_CEILING or 400)
+            target_px (int): Wanted pixels per em of the dominant text
+            page_cache (PageRasterCache, optional): Cache used for the previews of scanned pages
+        """
+        self.logger = logging.getLogger(__name__)
+        self.floor = floor or int(os.environ.get("OCR_DPI_FLOOR", DEFAULT_FLOOR))
+        self.ceiling = ceiling or int(os.environ.get("OCR_DPI_CEILING", DEFAULT_CEILING))
+        if self.floor > self.ceiling:
+            raise ValueError(f"DPI floor {self.floor} is above the ceiling {self.ceiling}")
+        self.target_px = target_px
+        self.page_cache = page_cache or PageRasterCache()
+
+    def choose(self, pdf_path: str, page_number: int) -> int:
+        """
+        Resolution to render one page at.
+
+        Args:
+            pdf_path (str): Path to the PDF
+            page_number (int): 1-based page number
+
+        Returns:
+            int: Resolution in dpi
+        """
+        text_height, native_dpi = self._inspect_text_layer(pdf_path, page_number)
+        if text_height is None:
+            text_height = self._measure_scan(pdf_path, page_number)
+        if text_height is None:
+            return self.floor
+
+        dpi = dpi_for_text_height(text_height, self.floor, self.ceiling, self.target_px)
+        if native_dpi:
+            # Rendering a scan above its own resolution only adds pixels
+            dpi = max(self.floor, min(dpi, math.ceil(native_dpi / DPI_STEP) * DPI_STEP))
+        self.logger.debug(f"Page {page_number}: text height {text_height:.1f}pt -> {dpi} dpi")
+        return dpi
+
+    def _inspect_text_layer(self, pdf_path: str, page_number: int):
+        """Dominant font size of the text layer, and the resolution of a full-page scan image."""
+        try:
+            import fitz
+        except ImportError:
+            return None, None
+
+        with fitz.open(pdf_path) as doc:
+            page = doc.load_page(page_number - 1)
+            sizes, weights = [], []
+            for block in page.get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    for span in line["spans"]:
+                        chars = len(span["text"].strip())
+                        if chars:
+                            sizes.append(span["size"])
+                            weights.append(chars)
+            if sizes:
+                return _weighted_median(sizes, weights), None
+
+            page_area = page.rect.width * page.rect.height
+            native = None
+            for info in page.get_image_info():
+                x0, y0, x1, y1 = info["bbox"]
+                if (x1 - x0) * (y1 - y0) >= page_area / 2 and x1 > x0:
+                    resolution = info["width"] / ((x1 - x0) / 72)
+                    native = max(native or 0, resolution)
+            return None, native
+
+    def _measure_scan(self, pdf_path: str, page_number: int) -> Optional[float]:
+        """Median text line height in points, measured on a grayscale preview."""
+        preview = self.page_cache.render(pdf_path, page_number, dpi=PROBE_DPI, colorspace="L")
+        heights = line_heights(bytes(preview.buffer), preview.width, preview.height)
+        if not heights:
+            return None
+        return statistics.median(heights) * 72 / PROBE_DPI
+
+def _weighted_median(values: List[float], weights: List[int]) -> float:
+    pairs = sorted(zip(values, weights))
+    half = sum(weights) / 2
+    seen = 0
+    for value, weight in pairs:
+        seen += weight
+        if seen >= half:
+            return value
+    return pairs[-1][0]
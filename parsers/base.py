@@ -0,0 +1,51 @@
+"""Common interface for parsers that can run inside the calling process."""
+
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+class BaseParser:
+    """
+    A PDF parser usable in-process through parsers.registry.
+
+    Subclasses implement parse(), which yields one dict per page as soon as the
+    page is done, with at least "page_number" (1-based) and "text". Models and
+    other heavy resources are created in load(), which runs on first use rather
+    than in the constructor, so building a parser is cheap.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._loaded = False
+
+    def load(self) -> None:
+        """Load models and other heavy resources. Called once, before the first page is parsed."""
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+            self._loaded = True
+
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parse a PDF lazily, page by page.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            pages (Iterable[int], optional): 1-based page numbers to parse (default: all)
+
+        Yields:
+            Dict[str, Any]: {"page_number": int, "text": str, ...parser-specific keys}
+        """
+        raise NotImplementedError
+
+    def parse_all(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """
+        Parse a PDF completely into the page-list JSON layout the chunker reads.
+
+        Returns:
+            Dict[str, Any]: {"parser": name, "pages": [page dicts]}
+        """
+        page_list: List[Dict[str, Any]] = list(self.parse(pdf_path, pages))
+        return {"parser": self.name, "pages": page_list}
@@ -0,0 +1,71 @@
+"""Helpers shared by the parser caches and checkpoints."""
+
+import os
+import re
+import hashlib
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file's content in fixed-size blocks.
+
+    Args:
+        path (str): Path to the file
+        block_size (int): Bytes read per iteration
+
+    Returns:
+        str: Hex SHA-256 digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def evict_lru(directory: str, max_bytes: int, suffix: str = ".json", keep: tuple = ()) -> int:
+    """
+    Delete the least recently used files until the directory fits in ``max_bytes``.
+
+    Recency is the file's modification time, so readers should touch a file on
+    every hit.
+
+    Args:
+        directory (str): Cache directory
+        max_bytes (int): Size budget for the matching files
+        suffix (str): Only files with this suffix are counted and evicted
+        keep (tuple): File names that are never evicted
+
+    Returns:
+        int: Number of files removed
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(suffix) and entry.name not in keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+def count_pdf_pages(path: str) -> int:
+    """
+    Number of pages in a PDF, used for cost estimates.
+
+    Uses PyMuPDF when the environment has it and otherwise counts page objects
+    in the raw file, which is close enough for reporting.
+    """
+    try:
+        import fitz
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except ImportError:
+        with open(path, "rb") as f:
+            return len(re.findall(rb"/Type\s*/Page\b", f.read()))
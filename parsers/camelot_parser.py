@@ -1,15 +1,21 @@
 import sys
-import json
 import logging
 import camelot
 import pandas as pd
 import pytesseract
-from pdf2image import convert_from_path
 from pathlib import Path
 import tempfile
 import os
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 import PyPDF2
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .base import BaseParser
+from .document_io import write_output
+from .page_cache import PageRasterCache
+from .adaptive_dpi import DpiChooser
 
 # Configure logging
 logging.basicConfig(
@@ -18,11 +24,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class CamelotParser:
-    def __init__(self):
-        """Initialize the Camelot parser."""
+class CamelotParser(BaseParser):
+    name = "camelot"
+
+    def __init__(self, flavor: str = 'lattice'):
+        """Initialize the Camelot parser.
+        
+        Args:
+            flavor: Table parsing method used by parse() ('lattice' or 'stream')
+        """
+        super().__init__()
+        self.flavor = flavor
         self.temp_dir = None
         self.needs_cleanup = False
+        self.page_cache = PageRasterCache()
+        self.dpi_chooser = DpiChooser(page_cache=self.page_cache)
 
     def cleanup(self):
         """Clean up temporary files."""
@@ -73,24 +89,14 @@ class CamelotParser:
             self.temp_dir = tempfile.mkdtemp()
             self.needs_cleanup = True
             
-            # Convert PDF to images
-            images = convert_from_path(pdf_path)
-            
-            # Process each page with OCR
+            # Render each page at a resolution suited to its text size (or reuse a
+            # render from the shared page cache) and OCR it
             ocr_texts = []
-            for i, image in enumerate(images):
-                logger.info(f"Processing page {i+1} with OCR...")
-                
-                # Save image temporarily
-                temp_img = os.path.join(self.temp_dir, f"page_{i}.png")
-                image.save(temp_img)
-                
-                # Perform OCR
-                text = pytesseract.image_to_string(temp_img)
-                ocr_texts.append(text)
-                
-                # Clean up page image
-                os.remove(temp_img)
+            for i in range(len(PyPDF2.PdfReader(str(pdf_path)).pages)):
+                dpi = self.dpi_chooser.choose(pdf_path, i + 1)
+                logger.info(f"Processing page {i+1} with OCR at {dpi} dpi...")
+                image = self.page_cache.render(pdf_path, i + 1, dpi=dpi).image()
+                ocr_texts.append(pytesseract.image_to_string(image))
             
             # Create a text file with OCR results
             ocr_text_path = os.path.join(self.temp_dir, "ocr_text.txt")
@@ -142,6 +148,28 @@ class CamelotParser:
         
         return extracted_tables
 
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the tables of each page, running Camelot one page at a time.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            pages: 1-based page numbers to parse (default: all)
+            
+        Yields:
+            Dictionary with page_number, the tables as pipe-separated rows in
+            text, and the table details under tables
+        """
+        if pages is None:
+            pages = range(1, len(PyPDF2.PdfReader(str(pdf_path)).pages) + 1)
+        for page_number in sorted(set(pages)):
+            tables = camelot.read_pdf(str(pdf_path), pages=str(page_number), flavor=self.flavor)
+            rows = [" | ".join(str(cell) for cell in row) for table in tables for row in table.df.values.tolist()]
+            yield {
+                "page_number": page_number,
+                "text": "\n".join(rows),
+                "tables": self.extract_tables_from_page(tables)
+            }
+
     def parse_pdf(self, pdf_path: str, flavor: str = 'lattice', pages: Union[str, List[int]] = 'all') -> Dict[str, Any]:
         """Parse a PDF file and extract tables with layout information.
         
@@ -251,8 +279,8 @@ def main():
         output_dir = Path(output_json).parent
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        # Binary formats (.msgpack, .msgpack.zst) are picked by the extension
+        write_output(results, output_json)
             
         logger.info(f"Results saved to: {output_json}")
         
@@ -0,0 +1,89 @@
+# parsers/docling_benchmark.py
+
+import os
+import sys
+import time
+import argparse
+from docling.datamodel.base_models import InputFormat
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .docling_parser import PIPELINE_PROFILES, build_converter, collect_pdfs
+
+def table_cells(json_data):
+    """Return one set of (row, col, text) cells per table, in document order."""
+    tables = []
+    for table in json_data.get("tables", []):
+        cells = table.get("data", {}).get("table_cells", [])
+        tables.append({
+            (c["start_row_offset_idx"], c["start_col_offset_idx"], c.get("text", "").strip())
+            for c in cells
+        })
+    return tables
+
+def cell_agreement(tables, reference):
+    """Jaccard agreement of table cells against a reference profile's tables."""
+    matched, total = 0, 0
+    for i in range(max(len(tables), len(reference))):
+        cells = tables[i] if i < len(tables) else set()
+        ref_cells = reference[i] if i < len(reference) else set()
+        matched += len(cells & ref_cells)
+        total += len(cells | ref_cells)
+    return matched / total if total else 1.0
+
+def run_profile(profile, pdfs, num_threads=None):
+    """Convert every PDF with one profile and collect timings and table cells."""
+    start = time.perf_counter()
+    converter = build_converter(profile, num_threads)
+    # Force the PDF pipeline's model loading so it is reported apart from conversion throughput
+    converter.initialize_pipeline(InputFormat.PDF)
+    load_seconds = time.perf_counter() - start
+
+    pages, tables = 0, {}
+    start = time.perf_counter()
+    for pdf in pdfs:
+        result = converter.convert(str(pdf))
+        pages += len(result.pages)
+        tables[str(pdf)] = table_cells(result.document.export_to_dict())
+    convert_seconds = time.perf_counter() - start
+
+    return {
+        "profile": profile,
+        "load_seconds": load_seconds,
+        "convert_seconds": convert_seconds,
+        "pages": pages,
+        "pages_per_sec": pages / convert_seconds if convert_seconds else 0.0,
+        "tables": tables,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Docling pipeline profiles")
+    parser.add_argument("paths", nargs="+", help="PDF files or directories to convert")
+    parser.add_argument("--profiles", nargs="+", choices=list(PIPELINE_PROFILES), default=list(PIPELINE_PROFILES))
+    parser.add_argument("--reference", choices=list(PIPELINE_PROFILES), default="full",
+                        help="Profile whose tables are treated as ground truth (default: full)")
+    parser.add_argument("--num-threads", type=int, default=None, help="CPU threads for Docling models")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.paths)
+    if not pdfs:
+        print("❌ No PDF files found.")
+        sys.exit(1)
+
+    profiles = list(dict.fromkeys([args.reference] + args.profiles))
+    results = {}
+    for profile in profiles:
+        print(f"⏱️ Running profile '{profile}' on {len(pdfs)} PDFs...")
+        results[profile] = run_profile(profile, pdfs, args.num_threads)
+
+    reference = results[args.reference]["tables"]
+    print(f"\n{'profile':<12} {'load s':>8} {'pages':>6} {'pages/s':>8} {'cell agreement':>15}")
+    for profile in args.profiles:
+        r = results[profile]
+        agreements = [cell_agreement(r["tables"][pdf], reference[pdf]) for pdf in reference]
+        agreement = sum(agreements) / len(agreements)
+        print(f"{profile:<12} {r['load_seconds']:>8.1f} {r['pages']:>6} {r['pages_per_sec']:>8.2f} {agreement:>15.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,110 @@
 # parsers/docling_parser.py
 
 import sys
-import json
 import os
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
 import fitz  # PyMuPDF
-from docling.document_converter import DocumentConverter
+from docling.datamodel.base_models import ConversionStatus, InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+from docling.datamodel.settings import settings
+from docling.document_converter import DocumentConverter, PdfFormatOption
+
+try:
+    from docling.datamodel.accelerator_options import AcceleratorOptions
+except ImportError:  # docling < 2.39 keeps it next to the pipeline options
+    from docling.datamodel.pipeline_options import AcceleratorOptions
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .base import BaseParser
+from .document_io import write_output
+
+# Named pipeline profiles. "full" matches Docling's defaults; picture images are
+# opt-in through build_converter's picture_images, and page images stay off.
+PIPELINE_PROFILES = {
+    "fast": {
+        "do_ocr": False,
+        "do_table_structure": False,
+        "table_mode": TableFormerMode.FAST,
+    },
+    "tables-only": {
+        "do_ocr": False,
+        "do_table_structure": True,
+        "table_mode": TableFormerMode.ACCURATE,
+    },
+    "full": {
+        "do_ocr": True,
+        "do_table_structure": True,
+        "table_mode": TableFormerMode.ACCURATE,
+    },
+}
+
+def build_converter(profile="full", num_threads=None, picture_images=False):
+    """Build a DocumentConverter configured for one of PIPELINE_PROFILES.
+
+    Args:
+        profile: Name of the profile in PIPELINE_PROFILES
+        num_threads: CPU threads for the layout/table/OCR models (default: Docling's)
+        picture_images: Also render an image of every detected picture (slower)
+
+    Returns:
+        DocumentConverter for PDF input
+    """
+    if profile not in PIPELINE_PROFILES:
+        available = ", ".join(PIPELINE_PROFILES)
+        raise ValueError(f"Unknown Docling profile: {profile}. Available profiles: {available}")
+    options = PIPELINE_PROFILES[profile]
+
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = options["do_ocr"]
+    pipeline_options.do_table_structure = options["do_table_structure"]
+    pipeline_options.table_structure_options.mode = options["table_mode"]
+    pipeline_options.table_structure_options.do_cell_matching = True
+    pipeline_options.generate_picture_images = picture_images
+    if num_threads:
+        pipeline_options.accelerator_options = AcceleratorOptions(num_threads=num_threads)
+
+    return DocumentConverter(
+        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+    )
+
+class DoclingParser(BaseParser):
+    """In-process Docling parser; the converter and its models are built on first use."""
+
+    name = "docling"
+
+    def __init__(self, profile="full", num_threads=None, picture_images=False):
+        super().__init__()
+        self.profile = profile
+        self.num_threads = num_threads
+        self.picture_images = picture_images
+        self.converter = None
+
+    def load(self):
+        self.converter = build_converter(self.profile, self.num_threads, self.picture_images)
+
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Convert a PDF and yield each page as Markdown.
+
+        Docling lays out the whole requested page range in one conversion, so the
+        first page is yielded once the range is converted.
+
+        Args:
+            pdf_path: Path to the PDF file
+            pages: 1-based page numbers to parse (default: all)
+
+        Yields:
+            Dictionary with page_number and the page's Markdown as text
+        """
+        self.ensure_loaded()
+        page_numbers = sorted(set(pages)) if pages is not None else None
+        kwargs = {"page_range": (page_numbers[0], page_numbers[-1])} if page_numbers else {}
+        document = self.converter.convert(pdf_path, **kwargs).document
+        for page_number in page_numbers or range(1, document.num_pages() + 1):
+            yield {"page_number": page_number, "text": document.export_to_markdown(page_no=page_number)}
 
 def extract_images_from_pdf(pdf_path, output_dir):
     doc = fitz.open(pdf_path)
@@ -28,41 +128,34 @@ def extract_images_from_pdf(pdf_path, output_dir):
     else:
         print(f"✅ {count} images extracted.")
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python docling_parser.py <input_pdf> <output_json>")
-        sys.exit(1)
-
-    input_pdf = sys.argv[1]
-    output_json = sys.argv[2]
-    output_md = output_json.replace(".json", ".md")
-    image_output_dir = output_json.replace(".json", "_images")
-
-    print(f"🔍 Reading PDF: {input_pdf}")
-    print(f"📄 Saving JSON to: {output_json}")
-    print(f"📝 Saving Markdown to: {output_md}")
-    print(f"🖼️ Extracting images to: {image_output_dir}")
+def collect_pdfs(paths):
+    """Expand input files and directories into a sorted list of PDF paths."""
+    pdfs = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            pdfs.extend(sorted(p for p in path.iterdir() if p.suffix.lower() == ".pdf"))
+        elif path.exists():
+            pdfs.append(path)
+        else:
+            print(f"⚠️ Skipping missing input: {path}")
+    return pdfs
 
-    # 1. Run Docling conversion
-    try:
-        converter = DocumentConverter()
-        result = converter.convert(input_pdf)
-        print("✅ Docling conversion completed.")
-    except Exception as e:
-        print(f"❌ Error running Docling: {e}")
-        sys.exit(1)
+def export_result(result, input_pdf, output_json):
+    """Write the Docling JSON for one converted document and extract its images."""
+    image_output_dir = os.path.splitext(output_json)[0] + "_images"
 
-    # 2. Export to JSON
+    # 2. Export to JSON (or a binary format picked by the extension)
     try:
         json_data = result.document.export_to_dict()
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
-        print("✅ JSON saved successfully.")
+        write_output(json_data, output_json)
+        print(f"✅ JSON saved successfully: {output_json}")
     except Exception as e:
         print(f"❌ Failed to save JSON: {e}")
 
     # 3. Export to Markdown
     '''try:
+        output_md = output_json.replace(".json", ".md")
         markdown_text = result.document.export_to_markdown()
         with open(output_md, "w", encoding="utf-8") as f:
             f.write(markdown_text)
@@ -72,9 +165,99 @@ def main():
 
     # 4. Extract images
     try:
-        extract_images_from_pdf(input_pdf, image_output_dir)
+        extract_images_from_pdf(str(input_pdf), image_output_dir)
     except Exception as e:
         print(f"❌ Image extraction failed: {e}")
 
+def convert_batch(converter, pdfs, output_dir, concurrency=2):
+    """Convert many PDFs with one converter, writing one JSON per document.
+
+    Args:
+        converter: A DocumentConverter whose models are loaded once and reused
+        pdfs: Paths of the PDFs to convert
+        output_dir: Directory that receives ``<stem>.json`` and ``<stem>_images``
+        concurrency: Number of documents Docling processes per batch in parallel
+
+    Returns:
+        Tuple of (converted, failed) document counts
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    settings.perf.doc_batch_size = max(1, concurrency)
+    settings.perf.doc_batch_concurrency = max(1, concurrency)
+
+    stems = [Path(pdf).stem for pdf in pdfs]
+    if len(set(stems)) != len(stems):
+        print("⚠️ Several inputs share a file name; later outputs will overwrite earlier ones.")
+
+    converted, failed = 0, 0
+    for result in converter.convert_all(pdfs, raises_on_error=False):
+        input_pdf = Path(result.input.file)
+        if result.status not in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+            print(f"❌ Docling failed on {input_pdf.name}: {result.status}")
+            failed += 1
+            continue
+        output_json = os.path.join(output_dir, f"{input_pdf.stem}.json")
+        export_result(result, input_pdf, output_json)
+        converted += 1
+    return converted, failed
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse PDFs with Docling",
+        usage=(
+            "python docling_parser.py <input_pdf> <output_json>\n"
+            "       python docling_parser.py <pdf_or_dir> [<pdf_or_dir> ...] --output-dir <dir> [--concurrency N]"
+        ),
+    )
+    parser.add_argument("paths", nargs="+", help="Input PDF and output JSON, or PDFs/directories in batch mode")
+    parser.add_argument("--output-dir", default=None, help="Batch mode: write one JSON per input PDF into this directory")
+    parser.add_argument("--concurrency", type=int, default=2, help="Batch mode: documents converted in parallel (default: 2)")
+    parser.add_argument("--profile", choices=list(PIPELINE_PROFILES), default="full", help="Pipeline profile (default: full)")
+    parser.add_argument("--num-threads", type=int, default=None, help="CPU threads for Docling models (default: Docling's)")
+    parser.add_argument("--picture-images", action="store_true", help="Render an image of every detected picture (off by default, as in Docling)")
+    args = parser.parse_args()
+
+    # Batch mode: one converter for every input document
+    if args.output_dir:
+        pdfs = collect_pdfs(args.paths)
+        if not pdfs:
+            print("❌ No PDF files found.")
+            sys.exit(1)
+        print(f"🔍 Converting {len(pdfs)} PDFs into: {args.output_dir} (profile: {args.profile})")
+        try:
+            converter = build_converter(args.profile, args.num_threads, args.picture_images)
+            converted, failed = convert_batch(converter, pdfs, args.output_dir, args.concurrency)
+        except Exception as e:
+            print(f"❌ Error running Docling: {e}")
+            sys.exit(1)
+        print(f"✅ Docling batch completed: {converted} converted, {failed} failed.")
+        if failed:
+            sys.exit(1)
+        return
+
+    if len(args.paths) != 2:
+        print("Usage: python docling_parser.py <input_pdf> <output_json>")
+        sys.exit(1)
+
+    input_pdf, output_json = args.paths
+    output_md = os.path.splitext(output_json)[0] + ".md"
+    image_output_dir = os.path.splitext(output_json)[0] + "_images"
+
+    print(f"🔍 Reading PDF: {input_pdf} (profile: {args.profile})")
+    print(f"📄 Saving JSON to: {output_json}")
+    print(f"📝 Saving Markdown to: {output_md}")
+    print(f"🖼️ Extracting images to: {image_output_dir}")
+
+    # 1. Run Docling conversion
+    try:
+        converter = build_converter(args.profile, args.num_threads, args.picture_images)
+        result = converter.convert(input_pdf)
+        print("✅ Docling conversion completed.")
+    except Exception as e:
+        print(f"❌ Error running Docling: {e}")
+        sys.exit(1)
+
+    export_result(result, input_pdf, output_json)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,175 @@
+"""Read and write parser output in JSON or a binary format chosen by file extension."""
+
+import json
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+# Suffix -> format name. Multi-part suffixes are checked first.
+FORMATS = {
+    ".msgpack.zst": "msgpack-zstd",
+    ".msgpack": "msgpack",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".parquet": "parquet",
+    ".json": "json",
+}
+
+METADATA_KEY = b"parser_output"
+
+def output_format(path: str) -> str:
+    """Name of the format selected by a path's extension (JSON if unrecognised)."""
+    name = Path(path).name.lower()
+    for suffix, format_name in FORMATS.items():
+        if name.endswith(suffix):
+            return format_name
+    return "json"
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack is not installed. Please install it with 'pip install msgpack'")
+    return msgpack
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is not installed. Please install it with 'pip install zstandard'")
+    return zstandard
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is not installed. Please install it with 'pip install pyarrow'")
+    return pyarrow
+
+def is_page_text_layout(data: Any) -> bool:
+    """True for outputs the columnar formats store as columns: a "pages" list with a text per page."""
+    return (isinstance(data, dict) and isinstance(data.get("pages"), list)
+            and all(isinstance(page, dict) and isinstance(page.get("text"), str) for page in data["pages"]))
+
+def _to_table(data: Any):
+    """
+    Lay parser output out as an Arrow table.
+
+    Outputs with a text per page (the BaseParser layout written by the pipeline
+    and the escalation router) become one row per page with page_number and
+    text columns; the remaining page keys are JSON in an "extra" column and the
+    top-level keys go into the schema metadata.
+
+    Raises:
+        ValueError: For any other layout (PDFMiner text boxes, MuPDF, Docling),
+            which would only be JSON inside the container; use .msgpack or .json
+    """
+    if not is_page_text_layout(data):
+        raise ValueError("Arrow and Parquet only store outputs with a text per page; "
+                         "write this layout as .msgpack, .msgpack.zst or .json")
+    pa = _import_pyarrow()
+    pages = data["pages"]
+    document = {k: v for k, v in data.items() if k != "pages"}
+
+    page_numbers, texts, extras = [], [], []
+    for page in pages:
+        page_numbers.append(page.get("page_number"))
+        texts.append(page["text"])
+        extra = {k: v for k, v in page.items() if k not in ("page_number", "text")}
+        extras.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    schema = pa.schema(
+        [("page_number", pa.int32()), ("text", pa.large_string()), ("extra", pa.large_string())],
+        metadata={METADATA_KEY: json.dumps(document, ensure_ascii=False).encode("utf-8")},
+    )
+    return pa.table([page_numbers, texts, extras], schema=schema)
+
+def _from_table(table) -> Any:
+    document = json.loads(table.schema.metadata[METADATA_KEY])
+    pages = []
+    for page_number, text, extra in zip(*(table.column(name).to_pylist() for name in ("page_number", "text", "extra"))):
+        page = {} if page_number is None else {"page_number": page_number}
+        page["text"] = text
+        if extra is not None:
+            page.update(json.loads(extra))
+        pages.append(page)
+    return {**document, "pages": pages}
+
+def _read_arrow_table(path: str, columns: Optional[List[str]] = None):
+    pa = _import_pyarrow()
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+def write_output(data: Any, path: str, compression: Optional[str] = "zstd", indent: Optional[int] = 2) -> str:
+    """
+    Write parser output in the format selected by the path's extension.
+
+    Args:
+        data: JSON-serialisable parser output
+        path (str): Output path (.json, .msgpack, .msgpack.zst, .arrow/.feather, .parquet);
+            Arrow and Parquet take only outputs with a text per page
+        compression (str, optional): Codec for Arrow and Parquet ("zstd", "lz4" or None).
+            Uncompressed Arrow files are read back without copying.
+        indent (int, optional): Indentation for JSON output
+
+    Returns:
+        str: Name of the format written
+
+    Raises:
+        ValueError: When a columnar format is given another layout
+    """
+    format_name = output_format(path)
+    if format_name == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+    elif format_name in ("msgpack", "msgpack-zstd"):
+        packed = _import_msgpack().packb(data, use_bin_type=True)
+        if format_name == "msgpack-zstd":
+            packed = _import_zstandard().ZstdCompressor(level=3).compress(packed)
+        with open(path, "wb") as f:
+            f.write(packed)
+    elif format_name == "arrow":
+        pa = _import_pyarrow()
+        table = _to_table(data)
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    else:
+        pa = _import_pyarrow()
+        pa.parquet.write_table(_to_table(data), str(path), compression=compression or "none")
+    return format_name
+
+def read_output(path: str) -> Any:
+    """Load parser output written by write_output (or a plain parser JSON file)."""
+    format_name = output_format(path)
+    if format_name == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if format_name in ("msgpack", "msgpack-zstd"):
+        with open(path, "rb") as f:
+            packed = f.read()
+        if format_name == "msgpack-zstd":
+            packed = _import_zstandard().ZstdDecompressor().decompress(packed)
+        return _import_msgpack().unpackb(packed, raw=False)
+    if format_name == "arrow":
+        return _from_table(_read_arrow_table(path))
+    pa = _import_pyarrow()
+    return _from_table(pa.parquet.read_table(str(path), memory_map=True))
+
+def iter_page_texts(path: str) -> Optional[Iterator[str]]:
+    """
+    Stream the page texts of a columnar file without decoding the other columns.
+
+    Returns:
+        Iterator over the non-empty page texts, or None when the file is not columnar
+    """
+    format_name = output_format(path)
+    if format_name not in ("arrow", "parquet"):
+        return None
+    if format_name == "arrow":
+        table = _read_arrow_table(path, ["text"])
+    else:
+        table = _import_pyarrow().parquet.read_table(str(path), columns=["text"], memory_map=True)
+    return (text.as_py() for chunk in table.column("text").chunks for text in chunk if text.is_valid and text.as_py())
@@ -0,0 +1,318 @@
+"""Compact, array-backed intermediate representation of a parsed PDF."""
+
+import sys
+import json
+import base64
+import argparse
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+COMPACT_FORMAT = "document-v1"
+
+class Span:
+    """View of one text span of a Document; holds no data of its own."""
+
+    __slots__ = ("document", "index")
+
+    def __init__(self, document: "Document", index: int):
+        self.document = document
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        d = self.document
+        return d.text[d.offsets[self.index]:d.offsets[self.index + 1]]
+
+    @property
+    def bbox(self) -> Sequence[float]:
+        return self.document.bboxes[4 * self.index:4 * self.index + 4]
+
+    @property
+    def font_size(self) -> float:
+        return self.document.font_sizes[self.index]
+
+    @property
+    def font(self) -> str:
+        return self.document.fonts[self.document.font_ids[self.index]]
+
+class Page:
+    """View of one page of a Document: a contiguous range of its spans."""
+
+    __slots__ = ("document", "index")
+
+    def __init__(self, document: "Document", index: int):
+        self.document = document
+        self.index = index
+
+    @property
+    def number(self) -> int:
+        return self.document.page_numbers[self.index]
+
+    @property
+    def size(self) -> Sequence[float]:
+        return self.document.page_sizes[2 * self.index:2 * self.index + 2]
+
+    @property
+    def span_range(self) -> range:
+        return range(self.document.page_starts[self.index], self.document.page_starts[self.index + 1])
+
+    def __len__(self) -> int:
+        return len(self.span_range)
+
+    def spans(self) -> Iterator[Span]:
+        for i in self.span_range:
+            yield Span(self.document, i)
+
+    @property
+    def text(self) -> str:
+        if self.document.page_texts is not None:
+            return self.document.page_texts[self.index]
+        return "\n".join(span.text for span in self.spans())
+
+class Document:
+    """
+    Text spans of a PDF stored column-wise.
+
+    All span texts live in one string addressed by ``offsets`` (span ``i`` is
+    ``text[offsets[i]:offsets[i + 1]]``). Bounding boxes, font sizes and font ids
+    are flat ``array.array`` columns, and the spans of page ``p`` are the
+    contiguous range ``page_starts[p]:page_starts[p + 1]``. Pages and spans are
+    lightweight views created on access.
+
+    Boxes are in PDF points with a top-left origin (y grows downwards), as MuPDF
+    and PaddleOCR report them. A document whose boxes could not be brought to
+    that origin says so in ``metadata["bbox_origin"]``.
+
+    Build one with DocumentBuilder or one of the from_* constructors.
+    """
+
+    def __init__(self, filename: str, text: str, offsets: array, bboxes: array, font_sizes: array,
+                 font_ids: array, fonts: List[str], page_numbers: array, page_sizes: array,
+                 page_starts: array, metadata: Optional[Dict[str, Any]] = None,
+                 page_texts: Optional[List[str]] = None):
+        self.filename = filename
+        self.text = text
+        self.offsets = offsets            # 'Q', n_spans + 1
+        self.bboxes = bboxes              # 'd', 4 * n_spans (x0, y0, x1, y1)
+        self.font_sizes = font_sizes      # 'd', n_spans
+        self.font_ids = font_ids          # 'I', n_spans, indexes into fonts
+        self.fonts = fonts
+        self.page_numbers = page_numbers  # 'I', n_pages (1-based)
+        self.page_sizes = page_sizes      # 'd', 2 * n_pages (width, height)
+        self.page_starts = page_starts    # 'Q', n_pages + 1
+        self.metadata = metadata or {}
+        self.page_texts = page_texts      # extractor's own page text, when it differs from the joined spans
+
+    @property
+    def num_spans(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def pages(self) -> List[Page]:
+        return [Page(self, i) for i in range(len(self.page_numbers))]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the document's columns and text buffers."""
+        columns = (self.offsets, self.bboxes, self.font_sizes, self.font_ids,
+                   self.page_numbers, self.page_sizes, self.page_starts)
+        strings = [self.text, *self.fonts, *(self.page_texts or ())]
+        return sum(c.itemsize * len(c) for c in columns) + sum(map(sys.getsizeof, strings))
+
+    def page_dicts(self) -> List[Dict[str, Any]]:
+        """Pages in the BaseParser layout: {"page_number", "text"}."""
+        return [{"page_number": page.number, "text": page.text} for page in self.pages]
+
+    # Compact JSON: columns as base64 of their raw little-endian bytes
+
+    _COLUMNS = {
+        "offsets": "Q", "bboxes": "d", "font_sizes": "d", "font_ids": "I",
+        "page_numbers": "I", "page_sizes": "d", "page_starts": "Q",
+    }
+
+    def to_compact_dict(self) -> Dict[str, Any]:
+        data = {"format": COMPACT_FORMAT, "filename": self.filename, "metadata": self.metadata,
+                "fonts": self.fonts, "text": self.text, "page_texts": self.page_texts}
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            if sys.byteorder != "little":
+                column = array(column.typecode, column)
+                column.byteswap()
+            data[name] = base64.b64encode(column.tobytes()).decode("ascii")
+        return data
+
+    @classmethod
+    def from_compact_dict(cls, data: Dict[str, Any]) -> "Document":
+        if data.get("format") != COMPACT_FORMAT:
+            raise ValueError(f"Not a compact document: format={data.get('format')!r}")
+        columns = {}
+        for name, typecode in cls._COLUMNS.items():
+            column = array(typecode)
+            column.frombytes(base64.b64decode(data[name]))
+            if sys.byteorder != "little":
+                column.byteswap()
+            columns[name] = column
+        return cls(data["filename"], data["text"], fonts=data["fonts"], metadata=data.get("metadata"),
+                   page_texts=data.get("page_texts"), **columns)
+
+    # Existing parser JSON layouts
+
+    @classmethod
+    def from_pdfminer_json(cls, data: Dict[str, Any]) -> "Document":
+        """
+        Build from the output of PDFMinerParser.parse_pdf.
+
+        PDFMiner boxes have a bottom-left origin; they are flipped to the top-left
+        origin using each page's "height". Output written without page sizes
+        keeps its boxes and gets metadata["bbox_origin"] = "bottom-left".
+        """
+        pages = data.get("pages", [])
+        flip = all(page.get("height") for page in pages)
+        builder = DocumentBuilder(data.get("filename", ""), metadata=None if flip else {"bbox_origin": "bottom-left"})
+        for page in pages:
+            height = page.get("height", 0.0)
+            builder.add_page(page["page_number"], page.get("width", 0.0), height)
+            for item in page.get("texts", []):
+                box = item["bbox"]
+                if flip:
+                    builder.add_span(item["text"], (box["x0"], height - box["y1"], box["x1"], height - box["y0"]))
+                else:
+                    builder.add_span(item["text"], (box["x0"], box["y0"], box["x1"], box["y1"]))
+        return builder.build()
+
+    def to_pdfminer_json(self) -> Dict[str, Any]:
+        flip = self.metadata.get("bbox_origin") != "bottom-left"
+        pages = []
+        for page in self.pages:
+            width, height = page.size
+            texts = []
+            for span in page.spans():
+                x0, y0, x1, y1 = span.bbox
+                if flip and height:
+                    y0, y1 = height - y1, height - y0
+                texts.append({
+                    "text": span.text,
+                    "bbox": {"x0": round(x0, 2), "y0": round(y0, 2), "x1": round(x1, 2), "y1": round(y1, 2)}
+                })
+            entry = {"page_number": page.number, "texts": texts}
+            if height:
+                entry.update(width=width, height=height)
+            pages.append(entry)
+        return {"filename": self.filename, "total_pages": len(pages), "pages": pages}
+
+    @classmethod
+    def from_mupdf_json(cls, data: Dict[str, Any], filename: str = "") -> "Document":
+        """Build from the output of MuPDFParser.parse_pdf (0-based page keys)."""
+        builder = DocumentBuilder(filename, metadata=data.get("metadata") or {})
+        page_text = data.get("text_by_page", {})
+        spans_by_page = data.get("text_with_coordinates", {})
+        page_count = data.get("page_count", len(spans_by_page))
+        for index in range(page_count):
+            builder.add_page(index + 1)
+            for span in spans_by_page.get(str(index), spans_by_page.get(index, [])):
+                builder.add_span(span["text"], span["bbox"], span.get("size", 0.0), span.get("font", ""))
+        document = builder.build()
+        # get_text() output does not follow from the spans, so keep it verbatim
+        if page_text:
+            document.page_texts = [page_text.get(str(i), page_text.get(i, "")) for i in range(page_count)]
+        return document
+
+    def to_mupdf_json(self) -> Dict[str, Any]:
+        text_by_page, coordinates = {}, {}
+        for page in self.pages:
+            key = str(page.number - 1)
+            text_by_page[key] = page.text
+            coordinates[key] = [
+                {"text": span.text, "bbox": list(span.bbox), "font": span.font, "size": span.font_size}
+                for span in page.spans()
+            ]
+        return {
+            "metadata": self.metadata,
+            "page_count": len(self.page_numbers),
+            "text_by_page": text_by_page,
+            "text_with_coordinates": coordinates,
+        }
+
+    @classmethod
+    def from_paddleocr_json(cls, pages: List[Dict[str, Any]], filename: str = "") -> "Document":
+        """
+        Build from PaddleOCR output: [{"page" or "page_number", "results": [{"box", "text", "score"}], "dpi"}].
+
+        Boxes are four pixel corners of the rendered page; they become PDF points
+        (x0, y0, x1, y1, top-down) when the page records the dpi it was rendered at.
+        """
+        builder = DocumentBuilder(filename)
+        for index, page in enumerate(pages):
+            builder.add_page(page.get("page_number", page.get("page", index + 1)))
+            scale = 72.0 / page["dpi"] if page.get("dpi") else 1.0
+            for result in page.get("results") or []:
+                xs = [point[0] for point in result["box"]]
+                ys = [point[1] for point in result["box"]]
+                builder.add_span(str(result["text"]), (min(xs) * scale, min(ys) * scale, max(xs) * scale, max(ys) * scale),
+                                 font_size=(max(ys) - min(ys)) * scale)
+        return builder.build()
+
+class DocumentBuilder:
+    """Accumulate pages and spans in order, then freeze them into a Document."""
+
+    def __init__(self, filename: str = "", metadata: Optional[Dict[str, Any]] = None):
+        self.filename = filename
+        self.page_texts: Optional[List[str]] = None
+        self.metadata = metadata or {}
+        self._pieces: List[str] = []
+        self._offsets = array("Q", [0])
+        self._bboxes = array("d")
+        self._font_sizes = array("d")
+        self._font_ids = array("I")
+        self._fonts: Dict[str, int] = {}
+        self._page_numbers = array("I")
+        self._page_sizes = array("d")
+        self._page_starts = array("Q", [0])
+
+    def add_page(self, number: int, width: float = 0.0, height: float = 0.0) -> None:
+        """Start a new page; later spans belong to it."""
+        if len(self._page_numbers):
+            self._page_starts.append(len(self._font_ids))
+        self._page_numbers.append(number)
+        self._page_sizes.extend((width, height))
+
+    def add_span(self, text: str, bbox: Sequence[float], font_size: float = 0.0, font: str = "") -> None:
+        if not len(self._page_numbers):
+            raise ValueError("add_page() must be called before add_span()")
+        self._pieces.append(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._bboxes.extend(bbox)
+        self._font_sizes.append(font_size)
+        self._font_ids.append(self._fonts.setdefault(font, len(self._fonts)))
+
+    def build(self) -> Document:
+        page_starts = array("Q", self._page_starts)
+        if len(self._page_numbers):
+            page_starts.append(len(self._font_ids))
+        return Document(
+            self.filename, "".join(self._pieces), self._offsets, self._bboxes, self._font_sizes,
+            self._font_ids, list(self._fonts), self._page_numbers, self._page_sizes, page_starts,
+            self.metadata, self.page_texts,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pdfminer/mupdf parser JSON to the compact document format")
+    parser.add_argument("input_json", help="Output of pdfminer_parser.py or mupdf_parser.py")
+    parser.add_argument("output_json", help="Path for the compact document JSON")
+    args = parser.parse_args()
+
+    with open(args.input_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "text_with_coordinates" in data:
+        document = Document.from_mupdf_json(data)
+    elif "pages" in data:
+        document = Document.from_pdfminer_json(data)
+    else:
+        print("❌ Unrecognised parser JSON; expected pdfminer or mupdf output.")
+        sys.exit(1)
+
+    with open(args.output_json, "w", encoding="utf-8") as f:
+        json.dump(document.to_compact_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    print(f"✅ {document.num_spans} spans on {len(document.page_numbers)} pages written to: {args.output_json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from pdf2image import convert_from_path
+from pdf2image import pdfinfo_from_path
 from transformers import DonutProcessor, VisionEncoderDecoderModel
 from PIL import Image
 import torch
@@ -7,26 +7,49 @@ import json
 import os
 import sys
 import logging
-from typing import List, Dict, Any, Optional
-import tempfile
-
-class DonutParser:
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .page_checkpoint import PageCheckpoint
+from .base import BaseParser
+from .page_cache import PageRasterCache
+from .adaptive_dpi import DpiChooser
+
+class DonutParser(BaseParser):
     """Parser using the Donut (Document Understanding Transformer) model."""
+
+    name = "donut"
     
-    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-cord-v2"):
+    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-cord-v2", dpi: Optional[int] = None,
+                 dpi_floor: Optional[int] = None, dpi_ceiling: Optional[int] = None):
     
         """
-        Initialize the Donut parser.
+        Initialize the Donut parser. The model is loaded on first use.
         
         Args:
             model_name (str): Name or path of the pre-trained model
+            dpi (int, optional): Fixed render resolution (default: chosen per page)
+            dpi_floor (int, optional): Lowest resolution the per-page choice may use
+            dpi_ceiling (int, optional): Highest resolution the per-page choice may use
         """
+        super().__init__()
         self.logger = logging.getLogger(__name__)
-        
+        self.model_name = model_name
+        self.processor = None
+        self.model = None
+        self.device = None
+        self.page_cache = PageRasterCache()
+        self.dpi = dpi
+        self.dpi_chooser = DpiChooser(dpi_floor, dpi_ceiling, page_cache=self.page_cache)
+
+    def load(self):
+        """Load the processor and model onto the best available device."""
         try:
-            self.logger.info(f"Loading model: {model_name}")
-            self.processor = DonutProcessor.from_pretrained(model_name)
-            self.model = VisionEncoderDecoderModel.from_pretrained(model_name)
+            self.logger.info(f"Loading model: {self.model_name}")
+            self.processor = DonutProcessor.from_pretrained(self.model_name)
+            self.model = VisionEncoderDecoderModel.from_pretrained(self.model_name)
             
             # Set up device
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -50,6 +73,7 @@ class DonutParser:
         Returns:
             Dict[str, Any]: Extracted information from the image
         """
+        self.ensure_loaded()
         try:
             # Convert image to RGB if needed
             if image.mode != 'RGB':
@@ -99,42 +123,80 @@ class DonutParser:
             self.logger.error(f"Error processing image: {str(e)}")
             return {"error": str(e)}
 
-    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    def page_dpi(self, pdf_path: str, page_number: int) -> int:
+        """Render resolution of one page: the fixed dpi if set, else chosen from its text size."""
+        return self.dpi or self.dpi_chooser.choose(pdf_path, page_number)
+
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the extracted information of each page as soon as it is processed.
+        
+        Args:
+            pdf_path (str): Path to the input PDF file
+            pages (Iterable[int], optional): 1-based page numbers to parse (default: all)
+            
+        Yields:
+            Dict[str, Any]: Page number, the result serialised as text, and the raw result
+        """
+        if pages is None:
+            pages = range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1)
+        for page_number in sorted(set(pages)):
+            dpi = self.page_dpi(pdf_path, page_number)
+            image = self.page_cache.render(pdf_path, page_number, dpi=dpi).image()
+            result = self.process_image(image)
+            yield {
+                "page_number": page_number,
+                "text": json.dumps(result, ensure_ascii=False),
+                "content": result,
+                "dpi": dpi
+            }
+
+    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None, resume: bool = True, checkpoint_dir: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Parse a PDF file and extract structured information.
         
+        Pages are rendered and processed one at a time, and each finished page is
+        checkpointed so an interrupted run resumes from the last completed page.
+        
         Args:
             pdf_path (str): Path to the input PDF file
             output_path (str, optional): Path to save the JSON output
+            resume (bool): Reuse pages checkpointed by a previous run of this PDF
+            checkpoint_dir (str, optional): Directory for checkpoint files
             
         Returns:
             List[Dict[str, Any]]: Extracted information by page
         """
         try:
-            # Convert PDF to images
-            self.logger.info(f"Converting PDF to images: {pdf_path}")
-            with tempfile.TemporaryDirectory() as temp_dir:
-                images = convert_from_path(
-                    pdf_path,
-                    output_folder=temp_dir,
-                    fmt="png",
-                    dpi=300
-                )
-            
+            checkpoint = PageCheckpoint(pdf_path, f"donut-{self.model_name}", checkpoint_dir)
+            if not resume:
+                checkpoint.clear()
+
+            total_pages = pdfinfo_from_path(pdf_path)["Pages"]
             all_results = []
-            total_pages = len(images)
             
-            for i, image in enumerate(images):
-                self.logger.info(f"Processing page {i+1}/{total_pages}")
+            for page_number in range(1, total_pages + 1):
+                if page_number in checkpoint:
+                    all_results.append(checkpoint.get(page_number))
+                    continue
+
+                self.logger.info(f"Processing page {page_number}/{total_pages}")
+                
+                # Render the page, or reuse a render from the shared page cache
+                dpi = self.page_dpi(pdf_path, page_number)
+                image = self.page_cache.render(pdf_path, page_number, dpi=dpi).image()
                 
                 # Process the page
                 result = self.process_image(image)
                 
                 # Add page information
                 page_result = {
-                    "page": i + 1,
-                    "content": result
+                    "page": page_number,
+                    "content": result,
+                    "dpi": dpi
                 }
+                if "error" not in result:
+                    checkpoint.save(page_number, page_result)
                 all_results.append(page_result)
 
             # Save results if output path is provided
@@ -143,6 +205,7 @@ class DonutParser:
                 with open(output_path, "w", encoding="utf-8") as f:
                     json.dump(all_results, f, indent=2, ensure_ascii=False)
                 self.logger.info(f"Results saved to: {output_path}")
+            checkpoint.clear()
 
             return all_results
             
@@ -1,4 +1,4 @@
-from pdf2image import convert_from_path
+from pdf2image import pdfinfo_from_path
 from transformers import LayoutLMv3Processor, LayoutLMv3ForTokenClassification
 from PIL import Image
 import pytesseract
@@ -7,24 +7,47 @@ import json
 import sys
 import os
 import logging
-from typing import List, Dict, Any, Optional
-import tempfile
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .page_checkpoint import PageCheckpoint
+from .base import BaseParser
+from .page_cache import PageRasterCache
+from .adaptive_dpi import DpiChooser
 
-class LayoutLMv3Parser:
-    def __init__(self, model_name: str = "microsoft/layoutlmv3-base"):
+class LayoutLMv3Parser(BaseParser):
+    name = "layoutlmv3"
+
+    def __init__(self, model_name: str = "microsoft/layoutlmv3-base", dpi: Optional[int] = None,
+                 dpi_floor: Optional[int] = None, dpi_ceiling: Optional[int] = None):
         """
-        Initialize the LayoutLMv3 parser.
+        Initialize the LayoutLMv3 parser. The model is loaded on first use.
         
         Args:
             model_name (str): Name or path of the pre-trained model
+            dpi (int, optional): Fixed render resolution (default: chosen per page)
+            dpi_floor (int, optional): Lowest resolution the per-page choice may use
+            dpi_ceiling (int, optional): Highest resolution the per-page choice may use
         """
+        super().__init__()
         self.logger = logging.getLogger(__name__)
-        
+        self.model_name = model_name
+        self.processor = None
+        self.model = None
+        self.device = None
+        self.page_cache = PageRasterCache()
+        self.dpi = dpi
+        self.dpi_chooser = DpiChooser(dpi_floor, dpi_ceiling, page_cache=self.page_cache)
+
+    def load(self):
+        """Load the processor and model onto the best available device."""
         try:
             # Important: apply_ocr=False because we provide our own OCR tokens & boxes
-            self.logger.info(f"Loading model: {model_name}")
-            self.processor = LayoutLMv3Processor.from_pretrained(model_name, apply_ocr=False)
-            self.model = LayoutLMv3ForTokenClassification.from_pretrained(model_name)
+            self.logger.info(f"Loading model: {self.model_name}")
+            self.processor = LayoutLMv3Processor.from_pretrained(self.model_name, apply_ocr=False)
+            self.model = LayoutLMv3ForTokenClassification.from_pretrained(self.model_name)
             self.model.eval()
             
             # Check if CUDA is available
@@ -100,91 +123,140 @@ class LayoutLMv3Parser:
             self.logger.error(f"Error in OCR processing: {str(e)}")
             raise
 
-    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    def process_page(self, image: Image, page_number: int) -> Dict[str, Any]:
+        """
+        OCR one page image and classify its tokens.
+        
+        Args:
+            image (PIL.Image): Rendered page
+            page_number (int): 1-based page number
+            
+        Returns:
+            Dict[str, Any]: Page number and labelled tokens, with "error" set if the model failed
+        """
+        self.ensure_loaded()
+        tokens, boxes = self.ocr_and_preprocess(image)
+        
+        if not tokens:
+            self.logger.warning(f"No text found on page {page_number}")
+            return {
+                "page": page_number,
+                "tokens": []
+            }
+        
+        try:
+            # Prepare input for the model
+            encoding = self.processor(
+                image,
+                text=tokens,  # Changed from 'words' to 'text'
+                boxes=boxes,
+                truncation=True,
+                return_tensors="pt"
+            )
+            
+            # Move input to the same device as model
+            encoding = {k: v.to(self.device) for k, v in encoding.items()}
+
+            # Get model predictions
+            with torch.no_grad():
+                outputs = self.model(**encoding)
+
+            logits = outputs.logits
+            predicted_ids = torch.argmax(logits, dim=-1).squeeze().tolist()
+            
+            # Handle single-token case
+            if not isinstance(predicted_ids, list):
+                predicted_ids = [predicted_ids]
+
+            # Combine results
+            page_results = []
+            for token, box, pred_id in zip(tokens, boxes, predicted_ids):
+                page_results.append({
+                    "text": token,
+                    "bbox": box,
+                    "label_id": pred_id,
+                    "label": self.model.config.id2label.get(pred_id, "UNKNOWN")
+                })
+
+            return {
+                "page": page_number,
+                "tokens": page_results
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error processing page {page_number}: {str(e)}")
+            return {
+                "page": page_number,
+                "tokens": [],
+                "error": str(e)
+            }
+
+    def page_dpi(self, pdf_path: str, page_number: int) -> int:
+        """Render resolution of one page: the fixed dpi if set, else chosen from its text size."""
+        return self.dpi or self.dpi_chooser.choose(pdf_path, page_number)
+
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the labelled tokens of each page as soon as it is processed.
+        
+        Args:
+            pdf_path (str): Path to the input PDF file
+            pages (Iterable[int], optional): 1-based page numbers to parse (default: all)
+            
+        Yields:
+            Dict[str, Any]: Page number, the page's words as text, and the labelled tokens
+        """
+        if pages is None:
+            pages = range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1)
+        for page_number in sorted(set(pages)):
+            dpi = self.page_dpi(pdf_path, page_number)
+            image = self.page_cache.render(pdf_path, page_number, dpi=dpi).image()
+            page_result = {**self.process_page(image, page_number), "dpi": dpi}
+            yield {
+                "page_number": page_number,
+                "text": " ".join(token["text"] for token in page_result["tokens"]),
+                **{k: v for k, v in page_result.items() if k != "page"}
+            }
+
+    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None, resume: bool = True, checkpoint_dir: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Parse a PDF file and extract structured information.
         
+        Pages are rendered and processed one at a time, and each finished page is
+        checkpointed so an interrupted run resumes from the last completed page.
+        
         Args:
             pdf_path (str): Path to the input PDF file
             output_path (str, optional): Path to save the JSON output
+            resume (bool): Reuse pages checkpointed by a previous run of this PDF
+            checkpoint_dir (str, optional): Directory for checkpoint files
             
         Returns:
             List[Dict[str, Any]]: Extracted information by page
         """
         try:
-            # Convert PDF to images
-            self.logger.info(f"Converting PDF to images: {pdf_path}")
-            with tempfile.TemporaryDirectory() as temp_dir:
-                images = convert_from_path(
-                    pdf_path,
-                    output_folder=temp_dir,
-                    fmt="png",
-                    dpi=300
-                )
-            
+            checkpoint = PageCheckpoint(pdf_path, f"layoutlmv3-{self.model_name}", checkpoint_dir)
+            if not resume:
+                checkpoint.clear()
+
+            total_pages = pdfinfo_from_path(pdf_path)["Pages"]
             all_results = []
-            total_pages = len(images)
             
-            for i, image in enumerate(images):
+            for i in range(total_pages):
+                if i + 1 in checkpoint:
+                    all_results.append(checkpoint.get(i + 1))
+                    continue
+
                 self.logger.info(f"Processing page {i+1}/{total_pages}")
                 
-                # Get OCR results
-                tokens, boxes = self.ocr_and_preprocess(image)
-                
-                if not tokens:
-                    self.logger.warning(f"No text found on page {i+1}")
-                    all_results.append({
-                        "page": i + 1,
-                        "tokens": []
-                    })
-                    continue
+                # Render the page, or reuse a render from the shared page cache
+                dpi = self.page_dpi(pdf_path, i + 1)
+                image = self.page_cache.render(pdf_path, i + 1, dpi=dpi).image()
                 
-                try:
-                    # Prepare input for the model
-                    encoding = self.processor(
-                        image,
-                        text=tokens,  # Changed from 'words' to 'text'
-                        boxes=boxes,
-                        truncation=True,
-                        return_tensors="pt"
-                    )
-                    
-                    # Move input to the same device as model
-                    encoding = {k: v.to(self.device) for k, v in encoding.items()}
-
-                    # Get model predictions
-                    with torch.no_grad():
-                        outputs = self.model(**encoding)
-
-                    logits = outputs.logits
-                    predicted_ids = torch.argmax(logits, dim=-1).squeeze().tolist()
-                    
-                    # Handle single-token case
-                    if not isinstance(predicted_ids, list):
-                        predicted_ids = [predicted_ids]
-
-                    # Combine results
-                    page_results = []
-                    for token, box, pred_id in zip(tokens, boxes, predicted_ids):
-                        page_results.append({
-                            "text": token,
-                            "bbox": box,
-                            "label_id": pred_id,
-                            "label": self.model.config.id2label.get(pred_id, "UNKNOWN")
-                        })
-
-                    all_results.append({
-                        "page": i + 1,
-                        "tokens": page_results
-                    })
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing page {i+1}: {str(e)}")
-                    all_results.append({
-                        "page": i + 1,
-                        "tokens": [],
-                        "error": str(e)
-                    })
+                page_result = {**self.process_page(image, i + 1), "dpi": dpi}
+                if "error" not in page_result:
+                    checkpoint.save(i + 1, page_result)
+                all_results.append(page_result)
 
             # Save results if output path is provided
             if output_path:
@@ -192,6 +264,7 @@ class LayoutLMv3Parser:
                 with open(output_path, "w", encoding="utf-8") as f:
                     json.dump(all_results, f, indent=2, ensure_ascii=False)
                 self.logger.info(f"Results saved to: {output_path}")
+            checkpoint.clear()
 
             return all_results
             
@@ -1,7 +1,13 @@
 import os
 import sys
 import json
+import time
 from llama_cloud_services import LlamaParse
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .result_cache import ResultCache
 
 def serialize_page_content(content):
     """Helper function to ensure content is JSON serializable."""
@@ -36,7 +42,17 @@ def main():
         print("❌ Error: LLAMA_CLOUD_API_KEY is not set in environment variables.")
         sys.exit(1)
 
+    cache = ResultCache("llamaparse", {"premium_mode": True, "language": "en", "structured_output": True})
+
     try:
+        cached = cache.get(input_pdf)
+        if cached is not None:
+            with open(output_json, 'w', encoding='utf-8') as f:
+                json.dump(cached, f, ensure_ascii=False, indent=2)
+            print(f"✅ Reused cached LlamaParse result, saved JSON to: {output_json}")
+            return
+
+        start_time = time.time()
         parser = LlamaParse(
             api_key=api_key,
             premium_mode=True,
@@ -64,6 +80,7 @@ def main():
         with open(output_json, 'w', encoding='utf-8') as f:
             json.dump(output_data, f, ensure_ascii=False, indent=2)
 
+        cache.put(input_pdf, output_data, time.time() - start_time, pages=len(output_data))
         print(f"✅ Successfully parsed PDF and saved JSON to: {output_json}")
 
     except Exception as e:
@@ -5,6 +5,11 @@ import logging
 import os
 from unstract.llmwhisperer import LLMWhispererClientV2
 from unstract.llmwhisperer.client_v2 import LLMWhispererClientException
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .result_cache import ResultCache
 
 # Configure logging
 logging.basicConfig(
@@ -14,9 +19,12 @@ logging.basicConfig(
 
 API_KEY = os.environ.get("LLMWHISPERER_API_KEY", "YOUR_API_KEY_HERE")  # Set your API key in env or here
 
-# Timeout and retry settings
-MAX_POLLING_ATTEMPTS = 60  # 5 minutes at 5-second intervals
-POLLING_INTERVAL = 5  # seconds
+# Polling settings: the interval grows from POLL_INITIAL by POLL_FACTOR up to POLL_MAX seconds,
+# and a job is given up on after $LLMWHISPERER_TIMEOUT seconds (0 waits indefinitely)
+POLL_INITIAL = 2.0
+POLL_FACTOR = 1.5
+POLL_MAX = 30.0
+DEFAULT_TIMEOUT = 3600.0
 
 
 def submit_pdf(client, pdf_path: str) -> str:
@@ -40,27 +48,43 @@ def submit_pdf(client, pdf_path: str) -> str:
         logging.error(f"Error submitting PDF: {e.error_message()}")
         raise
 
-def poll_for_status(client, whisper_hash: str) -> None:
+def poll_for_status(client, whisper_hash: str, timeout: float = None) -> None:
+    """
+    Poll a job until it is processed, backing off between status requests.
+
+    Args:
+        client: LLMWhispererClientV2
+        whisper_hash: Job to wait for
+        timeout: Seconds before giving up (default: $LLMWHISPERER_TIMEOUT or 3600; 0 waits indefinitely)
+    """
+    if timeout is None:
+        timeout = float(os.environ.get("LLMWHISPERER_TIMEOUT", DEFAULT_TIMEOUT))
     logging.info(f"Polling for job status. Hash: {whisper_hash}")
+    start = time.monotonic()
+    interval = POLL_INITIAL
     last_status = None
-    for attempt in range(MAX_POLLING_ATTEMPTS):
+    attempt = 0
+    while True:
+        attempt += 1
         try:
             status = client.whisper_status(whisper_hash=whisper_hash)
             current_status = status.get("status")
             if current_status != last_status:
                 logging.info(f"Job status: {current_status}")
                 last_status = current_status
-            if current_status == "completed":
-                logging.info(f"Job completed after {attempt+1} polling attempts")
+            if current_status in ("processed", "completed"):
+                logging.info(f"Job completed after {attempt} polling attempts")
                 return
-            elif current_status == "failed":
+            elif current_status in ("failed", "error", "unknown"):
                 error_msg = status.get("error_message", "No error details provided")
                 logging.error(f"Job failed. Error: {error_msg}")
                 raise RuntimeError(f"Job failed during processing: {error_msg}")
         except LLMWhispererClientException as e:
-            logging.warning(f"Attempt {attempt+1}: Error during polling: {e.error_message()}")
-        time.sleep(POLLING_INTERVAL)
-    raise TimeoutError(f"Timed out waiting for job to complete after {MAX_POLLING_ATTEMPTS * POLLING_INTERVAL} seconds")
+            logging.warning(f"Attempt {attempt}: Error during polling: {e.error_message()}")
+        if timeout and time.monotonic() - start > timeout:
+            raise TimeoutError(f"Timed out waiting for job to complete after {timeout:.0f} seconds")
+        time.sleep(interval)
+        interval = min(interval * POLL_FACTOR, POLL_MAX)
 
 def retrieve_result(client, whisper_hash: str) -> dict:
     logging.info(f"Retrieving result for hash: {whisper_hash}")
@@ -76,24 +100,24 @@ def retrieve_result(client, whisper_hash: str) -> dict:
 def main(input_pdf: str, output_json: str) -> None:
     start_time = time.time()
     logging.info(f"Starting PDF processing job for {input_pdf}")
+    cache = ResultCache("llmwhisperer", {"mode": "form", "output_mode": "layout_preserving", "client": "sdk"})
     client = LLMWhispererClientV2(api_key=API_KEY)
     try:
+        cached = cache.get(input_pdf)
+        if cached is not None:
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(cached, f, indent=2, ensure_ascii=False)
+            logging.info(f"Reused cached result, saved to {output_json}")
+            return
         whisper_hash = submit_pdf(client, input_pdf)
-        while True:
-            status = client.whisper_status(whisper_hash=whisper_hash)
-            if status["status"] == "processed":
-                final_result = client.whisper_retrieve(whisper_hash=whisper_hash)
-                with open(output_json, "w", encoding="utf-8") as f:
-                    json.dump(final_result, f, indent=2, ensure_ascii=False)
-                elapsed_time = time.time() - start_time
-                logging.info(f"Job completed successfully in {elapsed_time:.2f} seconds")
-                logging.info(f"Results saved to {output_json}")
-                break
-            elif status["status"] in ["unknown", "failed"]:
-                error_msg = status.get("error_message", "Unknown or failed status")
-                logging.error(f"Processing failed or unknown status. Error: {error_msg}")
-                sys.exit(1)
-            time.sleep(5)
+        poll_for_status(client, whisper_hash)
+        final_result = retrieve_result(client, whisper_hash)
+        with open(output_json, "w", encoding="utf-8") as f:
+            json.dump(final_result, f, indent=2, ensure_ascii=False)
+        elapsed_time = time.time() - start_time
+        cache.put(input_pdf, final_result, elapsed_time)
+        logging.info(f"Job completed successfully in {elapsed_time:.2f} seconds")
+        logging.info(f"Results saved to {output_json}")
     except FileNotFoundError as e:
         logging.error(f"Error: {e}")
         sys.exit(1)
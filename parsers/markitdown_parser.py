@@ -2,20 +2,157 @@
 
 import sys
 import os
+import csv
 import json
-from markitdown import MarkItDown
+import argparse
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-def main(input_path, output_path):
+# Spreadsheets read row by row instead of through MarkItDown
+STREAMED_EXTENSIONS = {".xlsx", ".xlsm", ".csv", ".tsv"}
+
+# Blocks are sized to fit one chunk of the chunker (512 tokens at ~4 characters each);
+# the chunker counts their tokens and splits dense blocks between rows
+DEFAULT_MAX_CHARS = 1800
+
+def format_cell(value: Any) -> str:
+    """Render one cell for a Markdown table row."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, (datetime, date, time)):
+        value = value.isoformat()
+    return str(value).replace("|", "\\|").replace("\r\n", "<br>").replace("\n", "<br>").strip()
+
+def iter_sheet_rows(input_path: str) -> Iterator[Tuple[str, Iterator[Tuple[int, Sequence[Any]]]]]:
+    """
+    Yield each sheet's name and a lazy iterator over its (1-based row number, values).
+
+    Workbooks are opened in openpyxl's read-only mode, which streams rows from
+    the file instead of loading the whole workbook.
+    """
+    extension = os.path.splitext(input_path)[1].lower()
+    if extension in (".csv", ".tsv"):
+        with open(input_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f, delimiter="\t" if extension == ".tsv" else ",")
+            yield os.path.splitext(os.path.basename(input_path))[0], enumerate(reader, start=1)
+        return
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("openpyxl is not installed. Please install it with 'pip install openpyxl'")
+    workbook = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, enumerate(sheet.iter_rows(values_only=True), start=1)
+    finally:
+        workbook.close()
+
+def _table_block(sheet: str, header: List[str], rows: List[List[str]]) -> str:
+    width = max([len(header)] + [len(row) for row in rows])
+    lines = [f"## {sheet}", ""]
+    for row in [header + [""] * (width - len(header)), ["---"] * width]:
+        lines.append("| " + " | ".join(row) + " |")
+    for row in rows:
+        lines.append("| " + " | ".join(row + [""] * (width - len(row))) + " |")
+    return "\n".join(lines)
+
+def iter_markdown_blocks(input_path: str, max_chars: int = DEFAULT_MAX_CHARS,
+                         max_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Convert a spreadsheet into Markdown tables of a few rows each, one sheet at a time.
+
+    The first non-empty row of each sheet is its header and is repeated at the
+    top of every block, so each block reads as a table on its own. A block is
+    closed before it would exceed ``max_chars`` (or ``max_rows`` rows); a single
+    longer row gets a block of its own.
+
+    Args:
+        input_path (str): .xlsx, .xlsm, .csv or .tsv file
+        max_chars (int): Target size of a block in characters
+        max_rows (int, optional): Maximum data rows per block
+
+    Yields:
+        Dict[str, Any]: sheet, first_row and last_row (spreadsheet row numbers) and markdown
+    """
+    for sheet, rows in iter_sheet_rows(input_path):
+        header: Optional[List[str]] = None
+        block: List[List[str]] = []
+        block_chars = first_row = last_row = 0
+        for row_number, values in rows:
+            cells = [format_cell(value) for value in values]
+            while cells and not cells[-1]:
+                cells.pop()
+            if not cells:
+                continue
+            if header is None:
+                header, header_row = cells, row_number
+                base_chars = len(_table_block(sheet, header, []))
+                continue
+            row_chars = sum(len(cell) + 3 for cell in cells) + 2
+            if block and (block_chars + row_chars > max_chars or (max_rows and len(block) >= max_rows)):
+                yield {"sheet": sheet, "first_row": first_row, "last_row": last_row,
+                       "markdown": _table_block(sheet, header, block)}
+                block = []
+            if not block:
+                block_chars, first_row = base_chars, row_number
+            block.append(cells)
+            block_chars += row_chars
+            last_row = row_number
+        if block:
+            yield {"sheet": sheet, "first_row": first_row, "last_row": last_row,
+                   "markdown": _table_block(sheet, header, block)}
+        elif header is not None:
+            # A sheet with a header only still gets its (empty) table
+            yield {"sheet": sheet, "first_row": header_row, "last_row": header_row,
+                   "markdown": _table_block(sheet, header, [])}
+
+def write_markdown_blocks(input_path: str, output_path: str, max_chars: int = DEFAULT_MAX_CHARS,
+                          max_rows: Optional[int] = None) -> int:
+    """
+    Stream a spreadsheet's Markdown blocks into a JSON file as they are produced.
+
+    The file is {"source": ..., "markdown_blocks": [...]}; blocks are appended one
+    at a time so memory use does not grow with the size of the spreadsheet, and
+    the file only replaces output_path once it is complete.
+
+    Returns:
+        int: Number of blocks written
+    """
+    partial_path = f"{output_path}.{os.getpid()}.tmp"
+    count = 0
+    with open(partial_path, "w", encoding="utf-8") as f:
+        f.write('{"source": ' + json.dumps(os.path.basename(input_path), ensure_ascii=False) + ', "markdown_blocks": [')
+        for block in iter_markdown_blocks(input_path, max_chars, max_rows):
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(block, ensure_ascii=False))
+            count += 1
+        f.write("\n]}\n")
+    os.replace(partial_path, output_path)
+    return count
+
+def main(input_path, output_path, max_chars=DEFAULT_MAX_CHARS, max_rows=None):
     print(f"📥 Converting spreadsheet to Markdown: {input_path}")
     print(f"📤 Output will be saved to: {output_path}")
 
     try:
+        # Ensure output folder exists
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if os.path.splitext(input_path)[1].lower() in STREAMED_EXTENSIONS:
+            count = write_markdown_blocks(input_path, output_path, max_chars, max_rows)
+            print(f"✅ Streamed {count} Markdown table blocks.")
+            return
+
+        # Imported here so the streaming path works without MarkItDown's converters
+        from markitdown import MarkItDown
         md = MarkItDown()
         result = md.convert(input_path)
 
-        # Ensure output folder exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
         # Save as Markdown in a JSON structure
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump({"markdown": result.text_content}, f, indent=2, ensure_ascii=False)
@@ -27,10 +164,10 @@ def main(input_path, output_path):
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python parsers/markitdown_parser.py <input_xlsx_path> <output_json_path>")
-        sys.exit(1)
-
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    main(input_path, output_path)
+    parser = argparse.ArgumentParser(description="Convert documents and spreadsheets to Markdown with MarkItDown")
+    parser.add_argument("input_path", help="Input file (.xlsx/.xlsm/.csv/.tsv are streamed row by row)")
+    parser.add_argument("output_path", help="Path for the output JSON")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Spreadsheets: target characters per Markdown block")
+    parser.add_argument("--max-rows", type=int, default=None, help="Spreadsheets: maximum rows per Markdown block")
+    args = parser.parse_args()
+    main(args.input_path, args.output_path, args.max_chars, args.max_rows)
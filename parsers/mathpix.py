@@ -1,99 +1,305 @@
-import sys
-print("PYTHONPATH:", sys.path)
-import requests
-import time
+"""Mathpix PDF conversion: batch upload, concurrent adaptive polling and streamed downloads."""
+
 import os
+import sys
 import json
+import time
+import base64
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    raise ImportError("requests is not installed. Please install it with 'pip install requests'")
+
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://api.mathpix.com/v3/pdf"
+DEFAULT_OUTPUT_DIR = "shared/output_json"
+DEFAULT_FORMATS = ("lines.json", "lines.mmd.json")
+
+DEFAULT_OPTIONS = {
+    "conversion_formats": {
+        "docx": False,
+        "tex.zip": False
+    },
+    "math_inline_delimiters": ["$", "$"],
+    "rm_spaces": True
+}
+
+# Result formats that are not text; they are stored base64-encoded in the result cache
+BINARY_FORMAT_SUFFIXES = ("docx", "pptx", "pdf", "zip")
+
+class MathpixError(Exception):
+    """Raised when Mathpix reports an error for a conversion."""
+
+class UploadRetry(Retry):
+    """
+    Retry policy that only re-sends a POST after a 429 or a failed connect.
+
+    A 5xx, read error or timeout on an upload may come after Mathpix accepted the
+    file, so retrying it could start a second (billed) conversion. Connection
+    errors are retried for every method; GETs are also retried on read errors and 5xx.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == "POST" and status_code != 429:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if error is not None and method and method.upper() == "POST" and not self._is_connection_error(error):
+            # The request may have reached Mathpix before the error
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def is_binary_format(extension: str) -> bool:
+    return extension.rsplit(".", 1)[-1].lower() in BINARY_FORMAT_SUFFIXES
+
+def next_poll_interval(status: Dict[str, Any], elapsed: float, previous: float,
+                       min_interval: float, max_interval: float) -> float:
+    """
+    Pick the delay before the next status request.
+
+    When Mathpix reports progress, the remaining time is extrapolated from the
+    time spent so far and the next poll lands halfway to the estimated finish.
+    Without progress the previous interval grows by half.
+    """
+    percent = status.get("percent_done")
+    if percent is None and status.get("num_pages"):
+        percent = 100.0 * status.get("num_pages_completed", 0) / status["num_pages"]
+    if percent and 0 < percent < 100:
+        remaining = elapsed * (100 - percent) / percent
+        interval = remaining / 2
+    else:
+        interval = previous * 1.5
+    return min(max(interval, min_interval), max_interval)
 
-APP_ID = 'your_app_id'      # Replace with your Mathpix APP ID
-APP_KEY = 'your_app_key'    # Replace with your Mathpix APP KEY
-
-PDF_FILE = '/Users/santhosh/Desktop/Intern/pdf_parser_accelerator/pdf_parser_project/fundamental_quantum_equations.pdf'  # Local PDF path
-BASE_URL = 'https://api.mathpix.com/v3/pdf'
-OUTPUT_DIR = 'mathpix_outputs'
-POLL_INTERVAL = 10  # seconds
-
-def upload_pdf(file_path):
-    headers = {
-        'app_id': APP_ID,
-        'app_key': APP_KEY,
-    }
-
-    options_json = {
-        "conversion_formats": {
-            "docx": False,
-            "tex.zip": False
-        },
-        "math_inline_delimiters": ["$", "$"],
-        "rm_spaces": True
-    }
-
-    files = {
-        'file': open(file_path, 'rb'),
-        'options_json': (None, str(options_json), 'application/json')
-    }
-
-    print("Uploading PDF to Mathpix...")
-    response = requests.post(BASE_URL, headers=headers, files=files)
-    response.raise_for_status()
-
-    pdf_id = response.json().get('pdf_id')
-    print(f"Uploaded. PDF ID: {pdf_id}")
-    return pdf_id
-
-def poll_status(pdf_id):
-    status_url = f'{BASE_URL}/{pdf_id}'
-    headers = {
-        'app_id': APP_ID,
-        'app_key': APP_KEY
-    }
-
-    print("Polling for processing status...")
-    while True:
-        response = requests.get(status_url, headers=headers)
+class MathpixParser:
+    """
+    Client for the Mathpix /v3/pdf API.
+
+    One pooled HTTP session is shared by all worker threads. Each document is
+    uploaded, polled with an interval adapted to its reported progress, and its
+    result formats are streamed to ``output_dir`` as soon as it completes.
+    """
+
+    def __init__(self, app_id: Optional[str] = None, app_key: Optional[str] = None,
+                 base_url: str = BASE_URL, options: Optional[Dict[str, Any]] = None,
+                 formats: Sequence[str] = DEFAULT_FORMATS, max_workers: int = 8,
+                 min_poll_interval: float = 1.0, max_poll_interval: float = 30.0,
+                 job_timeout: float = 1800.0, timeout: float = 120.0, use_cache: bool = True):
+        """
+        Args:
+            app_id: Mathpix app id (default: $MATHPIX_APP_ID)
+            app_key: Mathpix app key (default: $MATHPIX_APP_KEY)
+            base_url: PDF endpoint of the API
+            options: Conversion options sent with every upload
+            formats: Result extensions to download, e.g. "lines.json", "mmd"
+            max_workers: Documents uploaded and polled at the same time
+            min_poll_interval: Shortest delay between status requests, in seconds
+            max_poll_interval: Longest delay between status requests, in seconds
+            job_timeout: Seconds to wait for one conversion before giving up
+            timeout: Per-request timeout in seconds
+            use_cache: Reuse earlier results for unchanged PDFs and options
+        """
+        self.app_id = app_id or os.getenv("MATHPIX_APP_ID")
+        self.app_key = app_key or os.getenv("MATHPIX_APP_KEY")
+        if not self.app_id or not self.app_key:
+            raise ValueError("MATHPIX_APP_ID and MATHPIX_APP_KEY must be set in environment variables.")
+        self.base_url = base_url.rstrip("/")
+        self.options = options if options is not None else DEFAULT_OPTIONS
+        self.formats = list(formats)
+        self.max_workers = max(1, max_workers)
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.job_timeout = job_timeout
+        self.timeout = timeout
+        self.session = self._build_session()
+        self.cache = ResultCache("mathpix", {"options": self.options, "formats": self.formats}) if use_cache else None
+
+    def _build_session(self) -> requests.Session:
+        """Session with a connection pool sized for the worker threads and retries on transient errors."""
+        session = requests.Session()
+        session.headers.update({"app_id": self.app_id, "app_key": self.app_key})
+        retry = UploadRetry(
+            total=5,
+            backoff_factor=1.0,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def upload(self, pdf_path: str) -> str:
+        """Upload one PDF and return its Mathpix pdf_id."""
+        with open(pdf_path, "rb") as f:
+            files = {
+                "file": (os.path.basename(pdf_path), f, "application/pdf"),
+                "options_json": (None, json.dumps(self.options), "application/json"),
+            }
+            response = self.session.post(self.base_url, files=files, timeout=self.timeout)
         response.raise_for_status()
-        status = response.json().get('status')
-
-        print(f"Status: {status}")
-        if status == 'completed':
-            break
-        elif status == 'error':
-            raise Exception("Mathpix returned an error during processing.")
-        time.sleep(POLL_INTERVAL)
-
-def download_json(pdf_id, extension):
-    url = f"{BASE_URL}/{pdf_id}.{extension}"
-    headers = {
-        'app_id': APP_ID,
-        'app_key': APP_KEY
-    }
-
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    out_path = os.path.join(OUTPUT_DIR, f"{pdf_id}.{extension}")
-    
-    print(f"Downloading {extension} to {out_path}...")
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    with open(out_path, 'wb') as f:
-        f.write(response.content)
-    print(f"Saved JSON: {out_path}")
+        body = response.json()
+        if "pdf_id" not in body:
+            raise MathpixError(f"Upload of {pdf_path} failed: {body.get('error', body)}")
+        return body["pdf_id"]
+
+    def status(self, pdf_id: str) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/{pdf_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def wait(self, pdf_id: str) -> Dict[str, Any]:
+        """Poll a conversion until it completes, adapting the interval to its progress."""
+        start = time.monotonic()
+        interval = self.min_poll_interval
+        while True:
+            status = self.status(pdf_id)
+            state = status.get("status")
+            if state == "completed":
+                return status
+            if state == "error":
+                raise MathpixError(f"Mathpix returned an error for {pdf_id}: {status.get('error', 'unknown error')}")
+            elapsed = time.monotonic() - start
+            if elapsed > self.job_timeout:
+                raise TimeoutError(f"Conversion {pdf_id} did not finish within {self.job_timeout}s")
+            interval = next_poll_interval(status, elapsed, interval, self.min_poll_interval, self.max_poll_interval)
+            time.sleep(interval)
+
+    def download(self, pdf_id: str, extension: str, output_path: str) -> str:
+        """Stream one result format to disk, replacing the file only once it is complete."""
+        partial_path = f"{output_path}.part"
+        with self.session.get(f"{self.base_url}/{pdf_id}.{extension}", stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(partial_path, "wb") as f:
+                for block in response.iter_content(chunk_size=1 << 16):
+                    f.write(block)
+        os.replace(partial_path, output_path)
+        return output_path
+
+    def parse_pdf(self, pdf_path: str, output_dir: str) -> List[str]:
+        """
+        Convert one PDF and write every requested format as ``<stem>.<format>``.
+
+        Returns:
+            Paths of the written files
+        """
+        stem = Path(pdf_path).stem
+        output_paths = {extension: os.path.join(output_dir, f"{stem}.{extension}") for extension in self.formats}
+        cached = self.cache.get(pdf_path) if self.cache else None
+        if cached is not None:
+            for extension, path in output_paths.items():
+                if is_binary_format(extension):
+                    with open(path, "wb") as f:
+                        f.write(base64.b64decode(cached[extension]))
+                else:
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(cached[extension])
+            return list(output_paths.values())
+
+        start = time.monotonic()
+        pdf_id = self.upload(pdf_path)
+        logger.info(f"Uploaded {pdf_path} as {pdf_id}")
+        status = self.wait(pdf_id)
+        written = [self.download(pdf_id, extension, path) for extension, path in output_paths.items()]
+        elapsed = time.monotonic() - start
+        logger.info(f"{pdf_path} converted in {elapsed:.1f}s")
+        if self.cache:
+            contents = {}
+            for extension, path in output_paths.items():
+                if is_binary_format(extension):
+                    with open(path, "rb") as f:
+                        contents[extension] = base64.b64encode(f.read()).decode("ascii")
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        contents[extension] = f.read()
+            self.cache.put(pdf_path, contents, elapsed, pages=status.get("num_pages"))
+        return written
+
+    def parse_batch(self, pdf_paths: Sequence[str], output_dir: str = DEFAULT_OUTPUT_DIR) -> Dict[str, Any]:
+        """
+        Convert many PDFs concurrently.
+
+        Returns:
+            Dict mapping each input path to its written files, or to the exception
+            that stopped its conversion
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {str(pdf): executor.submit(self.parse_pdf, str(pdf), output_dir) for pdf in pdf_paths}
+            for pdf, future in futures.items():
+                try:
+                    results[pdf] = future.result()
+                except (requests.RequestException, MathpixError, TimeoutError, OSError) as e:
+                    logger.error(f"{pdf} failed: {e}")
+                    results[pdf] = e
+        return results
+
+    def close(self) -> None:
+        self.session.close()
+
+def collect_pdfs(paths: List[str]) -> List[str]:
+    """Expand input files and directories into a sorted list of PDF paths."""
+    pdfs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(str(p) for p in sorted(path.iterdir()) if p.suffix.lower() == ".pdf")
+        elif path.exists():
+            pdfs.append(str(path))
+        else:
+            logger.warning(f"Skipping missing input: {path}")
+    return pdfs
 
 def main():
-    pdf_id = upload_pdf(PDF_FILE)
-    poll_status(pdf_id)
-
-    # Only download JSON formats
-    json_formats = [
-        'lines.json',
-        'lines.mmd.json'
-    ]
-
-    for fmt in json_formats:
-        try:
-            download_json(pdf_id, fmt)
-        except Exception as e:
-            print(f"Failed to download {fmt}: {e}")
-
-if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] - %(message)s")
+    parser = argparse.ArgumentParser(description="Convert PDFs with the Mathpix API")
+    parser.add_argument("inputs", nargs="+", help="PDF files or directories")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory for the downloaded results")
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), help="Result formats to download")
+    parser.add_argument("--max-workers", type=int, default=8, help="Documents converted concurrently")
+    parser.add_argument("--max-poll-interval", type=float, default=30.0, help="Longest wait between status checks")
+    parser.add_argument("--base-url", default=BASE_URL, help="Override the API URL (e.g. a local stub)")
+    parser.add_argument("--no-cache", action="store_true", help="Always convert, ignoring cached results")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        print("❌ No PDF files found.")
+        sys.exit(1)
+    try:
+        client = MathpixParser(base_url=args.base_url, formats=args.formats, max_workers=args.max_workers,
+                               max_poll_interval=args.max_poll_interval, use_cache=not args.no_cache)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print(f"📥 Converting {len(pdfs)} PDF(s) with Mathpix")
+    print(f"📤 Output will be saved to: {args.output_dir}")
+    try:
+        results = client.parse_batch(pdfs, args.output_dir)
+    finally:
+        client.close()
+    failed = [pdf for pdf, result in results.items() if isinstance(result, Exception)]
+    print(f"✅ {len(pdfs) - len(failed)} of {len(pdfs)} PDFs converted with Mathpix.")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
     main()
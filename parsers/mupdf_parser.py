@@ -1,16 +1,41 @@
 import fitz
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 import argparse
-import json
 import os
 import sys
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .base import BaseParser
+from .document_model import Document, DocumentBuilder
+from .document_io import write_output
 
-class MuPDFParser:
+class MuPDFParser(BaseParser):
     """A PDF parser using PyMuPDF (fitz) library."""
+
+    name = "mupdf"
     
     def __init__(self):
+        super().__init__()
         self.logger = logging.getLogger(__name__)
+
+    def parse(self, file_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the text of each page, reading one page at a time.
+        
+        Args:
+            file_path (str): Path to the PDF file
+            pages (Iterable[int], optional): 1-based page numbers to parse (default: all)
+            
+        Yields:
+            Dict[str, Any]: Page number and extracted text
+        """
+        with fitz.open(file_path) as doc:
+            page_numbers = sorted(set(pages)) if pages is not None else range(1, len(doc) + 1)
+            for page_number in page_numbers:
+                yield {"page_number": page_number, "text": doc[page_number - 1].get_text()}
     
     def extract_text_from_pdf(self, file_path: str) -> Dict[int, str]:
         """
@@ -155,6 +180,31 @@ class MuPDFParser:
             self.logger.error(f"Error extracting text with coordinates: {str(e)}")
             raise
 
+    def extract_document(self, file_path: str) -> Document:
+        """
+        Extract every text span into the compact array-backed Document model.
+        
+        Same spans as extract_text_with_coordinates, without building a dict per span.
+        
+        Args:
+            file_path (str): Path to the PDF file
+            
+        Returns:
+            Document: Spans with bbox, font and size, plus each page's get_text() output
+        """
+        with fitz.open(file_path) as doc:
+            builder = DocumentBuilder(os.path.basename(file_path), metadata=doc.metadata)
+            page_texts = []
+            for page in doc:
+                builder.add_page(page.number + 1, page.rect.width, page.rect.height)
+                for block in page.get_text("dict")["blocks"]:
+                    for line in block.get("lines", ()):
+                        for span in line["spans"]:
+                            builder.add_span(span["text"], span["bbox"], span["size"], span["font"])
+                page_texts.append(page.get_text())
+            builder.page_texts = page_texts
+        return builder.build()
+
     def parse_pdf(self, input_path: str, output_path: str) -> None:
         """
         Parse PDF and save results to output file.
@@ -185,9 +235,8 @@ class MuPDFParser:
                 self.logger.warning(f"Could not extract images: {str(e)}")
                 result["images"] = []
             
-            # Save results to JSON file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            # Save results; binary formats (.msgpack, .msgpack.zst) are picked by the extension
+            write_output(result, output_path)
                 
             self.logger.info(f"Successfully parsed PDF and saved results to {output_path}")
             
@@ -199,7 +248,7 @@ def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description="Parse PDF files using PyMuPDF")
     parser.add_argument("input_path", help="Path to the input PDF file")
-    parser.add_argument("output_path", help="Path to save the output JSON file")
+    parser.add_argument("output_path", help="Output file: .json, or .msgpack/.msgpack.zst for a smaller binary file")
     parser.add_argument("--log-level", default="INFO", 
                       choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                       help="Set the logging level")
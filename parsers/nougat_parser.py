@@ -3,10 +3,17 @@ import os
 import json
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
 from functools import partial
 import torch
+import torch.utils.data
 from tqdm import tqdm
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .page_checkpoint import PageCheckpoint
+from .base import BaseParser
 
 try:
     from nougat import NougatModel
@@ -14,6 +21,8 @@ try:
     from nougat.utils.checkpoint import get_checkpoint
     from nougat.postprocessing import markdown_compatible
     import pypdf
+    import transformers
+    from transformers import StoppingCriteria, StoppingCriteriaList
 except ImportError as e:
     print("Nougat package is not installed. Please install nougat-ocr.")
     raise e
@@ -21,50 +30,216 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class NougatParser:
-    def __init__(self, checkpoint: Optional[str] = None, model_tag: str = "0.1.0-base", batchsize: Optional[int] = None, full_precision: bool = False):
-        self.batchsize = batchsize if batchsize is not None else default_batch_size()
-        self.checkpoint = checkpoint or get_checkpoint(None, model_tag=model_tag)
+# Characters and font-name fragments that mark a page as math-heavy
+MATH_CHARS = set("∑∫∮∏√∞∂∇≤≥≠≈≡∝±∓×÷∈∉∋⊂⊃⊆⊇∪∩∧∨¬→←↔⇒⇔↦∀∃∅ℝℕℤℚℂαβγδεζηθικλμνξπρστυφχψωΓΔΘΛΞΠΣΦΨΩ")
+MATH_FONT_HINTS = ("cmmi", "cmsy", "cmex", "msam", "msbm", "math", "symbol", "stix", "euler")
+
+class IndexedPages(torch.utils.data.Dataset):
+    """
+    Wrap a LazyDataset so every rendered image carries its 0-based page index.
+
+    LazyDataset.ignore_none_collate drops pages that fail to render, which shifts
+    every later page if results are matched to the requested pages by position.
+    """
+
+    def __init__(self, dataset, pages: List[int]):
+        self.dataset = dataset
+        self.pages = pages
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def __getitem__(self, i: int) -> Tuple[Optional[torch.Tensor], int]:
+        image, _ = self.dataset[i]
+        return image, self.pages[i]
+
+    @staticmethod
+    def collate(batch: List[Tuple[Optional[torch.Tensor], int]]) -> Tuple[Optional[torch.Tensor], List[int]]:
+        """Stack the images that rendered and return them with their page indices."""
+        batch = [(image, page) for image, page in batch if image is not None]
+        if not batch:
+            return None, []
+        images, page_indices = zip(*batch)
+        return torch.stack(images), list(page_indices)
+
+def split_native_pages(pdf_path: Path, pages: Optional[list] = None, min_chars: int = 200, max_math_ratio: float = 0.02) -> Tuple[List[int], Dict[int, str]]:
+    """
+    Decide per page whether the native text layer is good enough to skip Nougat.
+
+    A page keeps its native text when it has at least ``min_chars`` characters and
+    less than ``max_math_ratio`` of them are math symbols or set in math fonts.
+
+    Returns:
+        (model_pages, native_texts): 0-based pages that still need the model, and
+        the native text of every other page keyed by its 0-based index
+    """
+    import fitz  # PyMuPDF, only needed for hybrid mode
+
+    model_pages, native_texts = [], {}
+    with fitz.open(str(pdf_path)) as doc:
+        for page_index in (pages if pages is not None else range(len(doc))):
+            page = doc[page_index]
+            total_chars, math_chars = 0, 0
+            for block in page.get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    for span in line["spans"]:
+                        text = "".join(span["text"].split())
+                        total_chars += len(text)
+                        if any(hint in span["font"].lower() for hint in MATH_FONT_HINTS):
+                            math_chars += len(text)
+                        else:
+                            math_chars += sum(1 for ch in text if ch in MATH_CHARS)
+            if total_chars >= min_chars and math_chars / total_chars < max_math_ratio:
+                native_texts[page_index] = page.get_text().strip()
+            else:
+                model_pages.append(page_index)
+    return model_pages, native_texts
+
+# Generation settings for the second attempt at a page that fell into a loop
+RETRY_GENERATE_KWARGS = {"repetition_penalty": 1.2, "no_repeat_ngram_size": 16}
+
+# transformers >= 4.39 lets a stopping criterion finish single sequences of a batch
+PER_SEQUENCE_STOPPING = tuple(int(x) for x in transformers.__version__.split(".")[:2]) >= (4, 39)
+
+def ngram_repeat_ratio(tokens: List[int], n: int = 8) -> float:
+    """Share of the n-grams in ``tokens`` that already occurred earlier in the same window."""
+    total = len(tokens) - n + 1
+    if total <= 0:
+        return 0.0
+    unique = len({tuple(tokens[i:i + n]) for i in range(total)})
+    return 1.0 - unique / total
+
+class RepetitionStoppingCriteria(StoppingCriteria):
+    """
+    Stop decoding a sequence once its most recent tokens are mostly repeated n-grams.
+
+    Every ``check_every`` steps the last ``window`` tokens of each unfinished sequence
+    are scored with ngram_repeat_ratio; sequences at or above ``threshold`` are
+    recorded in ``flagged`` (batch indices) and stopped.
+    """
+
+    def __init__(self, eos_token_id: int, window: int = 256, ngram: int = 8, threshold: float = 0.5, check_every: int = 16):
+        self.eos_token_id = eos_token_id
+        self.window = window
+        self.ngram = ngram
+        self.threshold = threshold
+        self.check_every = check_every
+        self.flagged = set()
+
+    def reset(self):
+        self.flagged = set()
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        length = input_ids.shape[1]
+        finished = (input_ids == self.eos_token_id).any(dim=1)
+        if length >= self.window and length % self.check_every == 0:
+            for b, window in enumerate(input_ids[:, -self.window:].tolist()):
+                if b not in self.flagged and not finished[b]:
+                    if ngram_repeat_ratio(window, self.ngram) >= self.threshold:
+                        self.flagged.add(b)
+        looping = torch.tensor([b in self.flagged for b in range(input_ids.shape[0])], device=input_ids.device)
+        if PER_SEQUENCE_STOPPING:
+            return looping
+        # Older transformers stop the whole batch at once: wait until every
+        # sequence has either looped or emitted its end-of-sequence token
+        return bool((looping | finished).all())
+
+class NougatParser(BaseParser):
+    name = "nougat"
+
+    def __init__(self, checkpoint: Optional[str] = None, model_tag: str = "0.1.0-base", batchsize: Optional[int] = None, full_precision: bool = False, detect_repetition: bool = True, retry_repetitions: bool = False):
+        # The checkpoint is resolved (and downloaded if needed) with the model, on first use
+        super().__init__()
+        self.checkpoint = checkpoint
+        self.model_tag = model_tag
+        self.batchsize = batchsize
+        self.full_precision = full_precision
+        self.detect_repetition = detect_repetition
+        self.retry_repetitions = retry_repetitions
+        self.model = None
+        self.repetition_guard = None
+        self._generate_overrides = {}
+
+    def load(self):
+        self.batchsize = self.batchsize if self.batchsize is not None else default_batch_size()
+        self.checkpoint = self.checkpoint or get_checkpoint(None, model_tag=self.model_tag)
         if self.checkpoint is None:
             raise RuntimeError("Could not find Nougat checkpoint. Please set NOUGAT_CHECKPOINT or download the model.")
         logger.info(f"Loading Nougat model from {self.checkpoint}")
         self.model = NougatModel.from_pretrained(self.checkpoint)
-        self.model = move_to_device(self.model, bf16=not full_precision, cuda=self.batchsize > 0)
+        self.model = move_to_device(self.model, bf16=not self.full_precision, cuda=self.batchsize > 0)
         if self.batchsize <= 0:
             self.batchsize = 1
         self.model.eval()
 
-    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None, markdown: bool = True, recompute: bool = False, pages: Optional[list] = None) -> Dict[str, Any]:
+        # NougatModel.inference builds its own stopping criteria, so the repetition
+        # guard (and retry overrides) are injected around the decoder's generate()
+        self.repetition_guard = RepetitionStoppingCriteria(self.model.decoder.tokenizer.eos_token_id) if self.detect_repetition else None
+        generate = self.model.decoder.model.generate
+
+        def guarded_generate(*args, **kwargs):
+            criteria = StoppingCriteriaList(kwargs.pop("stopping_criteria", None) or [])
+            if self.repetition_guard is not None:
+                criteria.append(self.repetition_guard)
+            kwargs.update(self._generate_overrides)
+            return generate(*args, stopping_criteria=criteria, **kwargs)
+
+        self.model.decoder.model.generate = guarded_generate
+
+    def _checkpoint_namespace(self, markdown: bool) -> str:
+        return f"nougat-{Path(str(self.checkpoint)).name}-{'md' if markdown else 'raw'}"
+
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None, markdown: bool = True) -> Iterator[Dict[str, Any]]:
+        """Yield each page's prediction once its batch has been decoded (pages are 1-based)."""
+        self.ensure_loaded()
+        pdf_path = Path(pdf_path)
+        if pages is None:
+            indices = list(range(len(pypdf.PdfReader(pdf_path).pages)))
+        else:
+            indices = [p - 1 for p in sorted(set(pages))]
+        checkpoint = PageCheckpoint(pdf_path, self._checkpoint_namespace(markdown))
+        for start in range(0, len(indices), self.batchsize):
+            batch = indices[start:start + self.batchsize]
+            pending = [i for i in batch if i not in checkpoint]
+            if pending:
+                self._predict(pdf_path, pending, markdown, checkpoint)
+            for i in batch:
+                if i not in checkpoint:
+                    continue
+                record = checkpoint.get(i)
+                yield {"page_number": i + 1, "text": record["text"], "repetition": record["repetition"]}
+        checkpoint.clear()
+
+    def parse_pdf(self, pdf_path: str, output_path: Optional[str] = None, markdown: bool = True, recompute: bool = False, pages: Optional[list] = None, hybrid: bool = False, checkpoint_dir: Optional[str] = None) -> Dict[str, Any]:
         pdf_path = Path(pdf_path)
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        self.ensure_loaded()
         # Output path logic
         if output_path:
             output_path = Path(output_path)
             if output_path.suffix.lower() not in {".json", ".mmd", ".md"}:
                 raise ValueError("Output path must end with .json, .mmd, or .md")
-        # Prepare dataset
-        from nougat.utils.dataset import LazyDataset  # Only import if available
-        dataset = LazyDataset(
-            pdf_path,
-            partial(self.model.encoder.prepare_input, random_padding=False),
-            pages,
-        )
-        import torch.utils.data
-        dataloader = torch.utils.data.DataLoader(
-            dataset,
-            batch_size=self.batchsize,
-            shuffle=False,
-            collate_fn=LazyDataset.ignore_none_collate,
-        )
-        predictions = []
-        for i, (sample, is_last_page) in enumerate(tqdm(dataloader, desc=f"Parsing {pdf_path.name}")):
-            model_output = self.model.inference(image_tensors=sample)
-            for j, output in enumerate(model_output["predictions"]):
-                if markdown:
-                    output = markdown_compatible(output)
-                predictions.append(output)
-        # Join predictions
+        # Hybrid mode: keep the native text layer where it is usable
+        page_texts = {}
+        model_pages = pages if pages is not None else list(range(len(pypdf.PdfReader(pdf_path).pages)))
+        if hybrid:
+            model_pages, native_texts = split_native_pages(pdf_path, model_pages)
+            page_texts.update(native_texts)
+            logger.info(f"Hybrid mode: {len(native_texts)} pages use native text, {len(model_pages)} pages go through Nougat")
+        # Model pages finished by an interrupted run are taken from the checkpoint
+        checkpoint = PageCheckpoint(pdf_path, self._checkpoint_namespace(markdown), checkpoint_dir)
+        if recompute:
+            checkpoint.clear()
+        pending = [i for i in model_pages if i not in checkpoint]
+        if pending:
+            self._predict(pdf_path, pending, markdown, checkpoint)
+        page_texts.update((i, checkpoint.get(i)["text"]) for i in model_pages if i in checkpoint)
+        looping_pages = [i + 1 for i in model_pages if i in checkpoint and checkpoint.get(i)["repetition"]]
+        if looping_pages:
+            logger.warning(f"Generation stopped early on repeating output for pages: {looping_pages}")
+        # Join predictions in page order
+        predictions = [page_texts[i] for i in sorted(page_texts)]
         full_text = "\n\n".join(predictions).strip()
         # Save output
         if output_path:
@@ -75,14 +250,64 @@ class NougatParser:
                     "model": str(self.checkpoint),
                     "num_pages": len(predictions),
                     "text": full_text,
+                    "repetition_flagged_pages": looping_pages,
                 }
+                if hybrid:
+                    result["model_pages"] = [i + 1 for i in model_pages]
+                    result["native_pages"] = sorted(i + 1 for i in page_texts if i not in model_pages)
                 with open(output_path, "w", encoding="utf-8") as f:
                     json.dump(result, f, ensure_ascii=False, indent=2)
             else:
                 with open(output_path, "w", encoding="utf-8") as f:
                     f.write(full_text)
+        checkpoint.clear()
         return {"text": full_text, "num_pages": len(predictions)}
 
+    def _predict(self, pdf_path: Path, pages: List[int], markdown: bool, checkpoint: PageCheckpoint) -> None:
+        """Run the Nougat model over ``pages`` (0-based) and checkpoint each page's text as it finishes."""
+        from nougat.utils.dataset import LazyDataset  # Only import if available
+        dataset = LazyDataset(
+            pdf_path,
+            partial(self.model.encoder.prepare_input, random_padding=False),
+            pages,
+        )
+        dataloader = torch.utils.data.DataLoader(
+            IndexedPages(dataset, pages),
+            batch_size=self.batchsize,
+            shuffle=False,
+            collate_fn=IndexedPages.collate,
+        )
+        for sample, page_indices in tqdm(dataloader, desc=f"Parsing {pdf_path.name}"):
+            if sample is None:
+                continue
+            looping = set()
+            if self.repetition_guard is not None:
+                self.repetition_guard.reset()
+            model_output = self.model.inference(image_tensors=sample)
+            if self.repetition_guard is not None:
+                looping = set(self.repetition_guard.flagged)
+            for j, output in enumerate(model_output["predictions"]):
+                if j in looping and self.retry_repetitions:
+                    output, repeated = self._retry_page(sample[j:j + 1])
+                    if not repeated:
+                        looping.discard(j)
+                if markdown:
+                    output = markdown_compatible(output)
+                checkpoint.save(page_indices[j], {"text": output, "repetition": j in looping})
+        missing = [i + 1 for i in pages if i not in checkpoint]
+        if missing:
+            logger.warning(f"Could not render pages {missing} of {pdf_path.name}; they are left out")
+
+    def _retry_page(self, image_tensor: torch.Tensor) -> Tuple[str, bool]:
+        """Decode one looping page again with RETRY_GENERATE_KWARGS; return its text and whether it looped again."""
+        self._generate_overrides = RETRY_GENERATE_KWARGS
+        self.repetition_guard.reset()
+        try:
+            model_output = self.model.inference(image_tensors=image_tensor)
+        finally:
+            self._generate_overrides = {}
+        return model_output["predictions"][0], bool(self.repetition_guard.flagged)
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Nougat PDF Parser (latest)")
@@ -93,17 +318,25 @@ def main():
     parser.add_argument("--batchsize", type=int, default=None, help="Batch size (default: auto)")
     parser.add_argument("--full-precision", action="store_true", help="Use float32 instead of bfloat16")
     parser.add_argument("--no-markdown", action="store_true", help="Do not postprocess as markdown")
+    parser.add_argument("--recompute", action="store_true", help="Ignore pages checkpointed by an earlier, interrupted run")
+    parser.add_argument("--no-repetition-guard", action="store_true", help="Do not stop generation on repetitive output")
+    parser.add_argument("--retry-repetitions", action="store_true", help="Decode looping pages again with a repetition penalty")
+    parser.add_argument("--hybrid", action="store_true", help="Use the native text layer for pages that have one; run Nougat only on scanned or math-heavy pages")
     args = parser.parse_args()
     parser_obj = NougatParser(
         checkpoint=args.checkpoint,
         model_tag=args.model_tag,
         batchsize=args.batchsize,
         full_precision=args.full_precision,
+        detect_repetition=not args.no_repetition_guard,
+        retry_repetitions=args.retry_repetitions,
     )
     result = parser_obj.parse_pdf(
         args.input_pdf,
         args.output_path,
         markdown=not args.no_markdown,
+        recompute=args.recompute,
+        hybrid=args.hybrid,
     )
     print(f"Parsed {result['num_pages']} pages. Output saved to {args.output_path}")
 
@@ -0,0 +1,106 @@
+"""Bounded-concurrency dispatch of rendered PDF pages to an Ollama vision model."""
+
+import json
+import base64
+import asyncio
+import logging
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+
+class OllamaPageDispatcher:
+    """
+    Send page images to Ollama's /api/generate with at most ``max_in_flight``
+    requests open at once, retrying failed pages and returning the Markdown of
+    every page in its original order.
+    """
+
+    def __init__(self, model_name: str, prompt: str, host: str = DEFAULT_OLLAMA_HOST,
+                 max_in_flight: int = 4, timeout: float = 300.0, retries: int = 2,
+                 retry_backoff: float = 2.0, options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            model_name: Ollama model tag, e.g. "llava:13b"
+            prompt: Instruction sent with every page image
+            host: Base URL of the Ollama server
+            max_in_flight: Maximum number of concurrent requests
+            timeout: Per-request timeout in seconds
+            retries: Extra attempts for a page after a failed request
+            retry_backoff: Base delay in seconds, doubled on every retry
+            options: Ollama model options (default: temperature 0)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.prompt = prompt
+        self.host = (host if "://" in host else f"http://{host}").rstrip("/")
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.options = options if options is not None else {"temperature": 0}
+        self.failed_pages: Dict[int, str] = {}
+
+    def available_models(self) -> List[str]:
+        """Return the model tags the server has pulled (GET /api/tags)."""
+        with urllib.request.urlopen(f"{self.host}/api/tags", timeout=10) as response:
+            return [m["name"] for m in json.load(response).get("models", [])]
+
+    def _generate(self, image: bytes) -> str:
+        """Blocking, non-streaming /api/generate call for one page image."""
+        payload = json.dumps({
+            "model": self.model_name,
+            "prompt": self.prompt,
+            "images": [base64.b64encode(image).decode("ascii")],
+            "stream": False,
+            "options": self.options,
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.host}/api/generate",
+            data=payload,
+            headers={"Content-Type": "application/json"},
+        )
+        # Ollama sends nothing until the whole answer is ready, so the socket
+        # timeout bounds the total time of the request
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)["response"]
+
+    async def _dispatch_page(self, index: int, image: bytes, semaphore: asyncio.Semaphore,
+                             executor: ThreadPoolExecutor) -> str:
+        loop = asyncio.get_running_loop()
+        last_error = None
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(executor, self._generate, image)
+                except (urllib.error.URLError, OSError, KeyError, ValueError) as e:
+                    last_error = e
+                    self.logger.warning(f"Page {index + 1}: attempt {attempt + 1} failed: {e}")
+            if attempt < self.retries:
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        self.failed_pages[index] = str(last_error)
+        return ""
+
+    async def dispatch(self, images: Sequence[bytes]) -> List[str]:
+        """
+        Convert all page images concurrently.
+
+        Args:
+            images: Encoded page images (PNG/JPEG bytes), in page order
+
+        Returns:
+            Markdown per page, in page order; pages that failed every attempt are
+            empty strings and listed in ``failed_pages``
+        """
+        self.failed_pages = {}
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            tasks = [self._dispatch_page(i, image, semaphore, executor) for i, image in enumerate(images)]
+            # gather() returns results in task order, whatever order they finish in
+            return list(await asyncio.gather(*tasks))
+
+    def run(self, images: Sequence[bytes]) -> List[str]:
+        """Synchronous wrapper around dispatch()."""
+        return asyncio.run(self.dispatch(images))
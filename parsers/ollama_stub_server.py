@@ -0,0 +1,128 @@
+"""Local stand-in for the Ollama HTTP API, for testing page dispatch without a model."""
+
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def stub_markdown(image: bytes) -> str:
+    """The answer the stub gives for an image, so callers can check ordering."""
+    return f"stub page {hashlib.sha256(image).hexdigest()[:16]}"
+
+class OllamaStubServer:
+    """
+    Threaded HTTP server answering /api/generate and /api/tags like Ollama.
+
+    Each generate request sleeps for a random time up to ``max_delay`` so answers
+    complete out of order. The first ``fail_first`` generate requests get an HTTP
+    500. Request counts and the peak number of concurrent requests are recorded.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_delay: float = 0.05,
+                 fail_first: int = 0, models=("llava:13b",)):
+        self.max_delay = max_delay
+        self.fail_first = fail_first
+        self.models = list(models)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": m, "model": m} for m in stub.models]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self._send_json(404, {"error": "not found"})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.requests <= stub.fail_first
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(random.uniform(0, stub.max_delay))
+                    if fail:
+                        self._send_json(500, {"error": "stub failure"})
+                        return
+                    if request.get("model") not in stub.models:
+                        self._send_json(404, {"error": f"model '{request.get('model')}' not found"})
+                        return
+                    image = base64.b64decode(request["images"][0])
+                    self._send_json(200, {
+                        "model": request["model"],
+                        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                        "response": stub_markdown(image),
+                        "done": True,
+                    })
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Ollama server for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--max-delay", type=float, default=1.0, help="Maximum simulated seconds per page")
+    parser.add_argument("--model", action="append", dest="models", help="Model tag to advertise (repeatable)")
+    args = parser.parse_args()
+
+    server = OllamaStubServer(args.host, args.port, args.max_delay, models=args.models or ["llava:13b"])
+    print(f"🧪 Stub Ollama server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,113 @@
 import sys
 import os
 import json
-import fitz  # PyMuPDF
+import numpy as np
 from paddleocr import PaddleOCR
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .base import BaseParser
+from .cache_utils import count_pdf_pages
+from .page_cache import PageRasterCache
+from .adaptive_dpi import DpiChooser
 
-# Initialize OCR model
-ocr = PaddleOCR(use_textline_orientation=True, lang='en', ocr_version='PP-OCRv4')
+_ocr = None
 
-def convert_pdf_to_images(pdf_path, output_dir):
+def get_ocr():
+    """Create the OCR model on first use, so importing this module stays cheap."""
+    global _ocr
+    if _ocr is None:
+        _ocr = PaddleOCR(use_textline_orientation=True, lang='en', ocr_version='PP-OCRv4')
+    return _ocr
+
+def to_bgr(image):
+    """BGR copy of a rendered RGB page, the channel order PaddleOCR expects from arrays."""
+    if image.ndim == 3 and image.shape[2] == 3:
+        return np.ascontiguousarray(image[..., ::-1])
+    return image
+
+def convert_pdf_to_images(pdf_path, output_dir, dpi=300):
     os.makedirs(output_dir, exist_ok=True)
-    doc = fitz.open(pdf_path)
+    page_cache = PageRasterCache()
     image_paths = []
     
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(dpi=300)
+    for page_num in range(count_pdf_pages(pdf_path)):
         image_path = os.path.join(output_dir, f"page_{page_num + 1}.png")
-        pix.save(image_path)
+        page_cache.render(pdf_path, page_num + 1, dpi=dpi).image().save(image_path)
         image_paths.append(image_path)
         print(f"✅ Saved image: {image_path}")
     
     return image_paths
 
-def run_ocr_on_images(image_paths):
-    all_results = []
+def ocr_page_results(result):
+    page_results = []
+    if result and isinstance(result, list):
+        for line in result:
+            if len(line) == 2:
+                box, (text, score) = line
+            elif len(line) == 3:
+                box, (text, score), _ = line  # Sometimes extra info is present
+            else:
+                continue
+            page_results.append({
+                "box": box,
+                "text": text,
+                "score": score
+            })
+    return page_results
 
-    for i, image_path in enumerate(image_paths):
-        print(f"🔍 Running OCR on: {image_path}")
-        try:
-            result = ocr.predict(image_path)
-            page_results = []
+class PaddleOCRParser(BaseParser):
+    """In-process PaddleOCR parser that renders and recognises one page at a time."""
 
-            if result and isinstance(result, list):
-                for line in result:
-                    if len(line) == 2:
-                        box, (text, score) = line
-                    elif len(line) == 3:
-                        box, (text, score), _ = line  # Sometimes extra info is present
-                    else:
-                        continue
-                    page_results.append({
-                        "box": box,
-                        "text": text,
-                        "score": score
-                    })
+    name = "paddleocr"
 
-            all_results.append({
-                "page": i + 1,
-                "results": page_results
-            })
+    def __init__(self, dpi=None, dpi_floor=None, dpi_ceiling=None):
+        """
+        Args:
+            dpi (int, optional): Fixed render resolution (default: chosen per page from its text size)
+            dpi_floor (int, optional): Lowest resolution the per-page choice may use
+            dpi_ceiling (int, optional): Highest resolution the per-page choice may use
+        """
+        super().__init__()
+        self.dpi = dpi
+        self.ocr = None
+        self.page_cache = PageRasterCache()
+        self.dpi_chooser = DpiChooser(dpi_floor, dpi_ceiling, page_cache=self.page_cache)
 
-        except Exception as e:
-            print(f"❌ Error processing {image_path}: {e}")
+    def load(self):
+        self.ocr = get_ocr()
 
-    return all_results
+    def parse(self, pdf_path, pages=None):
+        """Yield the recognised lines of each page (1-based page numbers)."""
+        self.ensure_loaded()
+        page_numbers = sorted(set(pages)) if pages is not None else range(1, count_pdf_pages(pdf_path) + 1)
+        for page_number in page_numbers:
+            # PaddleOCR takes HWC uint8 BGR arrays as well as file paths
+            dpi = self.dpi or self.dpi_chooser.choose(pdf_path, page_number)
+            image = to_bgr(self.page_cache.render(pdf_path, page_number, dpi=dpi).array())
+            results = ocr_page_results(self.ocr.predict(image))
+            yield {
+                "page_number": page_number,
+                "text": "\n".join(str(r["text"]) for r in results),
+                "results": results,
+                "dpi": dpi
+            }
 
 def main(pdf_path, output_json_path):
     print(f"📄 Starting PaddleOCR on: {pdf_path}")
     os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
-    image_dir = os.path.join("temp_images", os.path.splitext(os.path.basename(pdf_path))[0])
 
-    image_paths = convert_pdf_to_images(pdf_path, image_dir)
-    results = run_ocr_on_images(image_paths)
+    # Pages are rendered and recognised one at a time, so memory does not grow with the PDF
+    parser = PaddleOCRParser()
+    results = []
+    for page_number in range(1, count_pdf_pages(pdf_path) + 1):
+        print(f"🔍 Running OCR on: page {page_number}")
+        try:
+            for page in parser.parse(pdf_path, pages=[page_number]):
+                results.append({"page": page["page_number"], "results": page["results"], "dpi": page["dpi"]})
+        except Exception as e:
+            print(f"❌ Error processing page {page_number}: {e}")
 
     with open(output_json_path, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,174 @@
+"""Disk cache of rendered PDF pages shared by the OCR-based parsers."""
+
+import os
+import mmap
+import struct
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from .cache_utils import evict_lru, file_sha256
+
+DEFAULT_CACHE_DIR = os.path.join("shared", "page_cache")
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+SUFFIX = ".raster"
+
+# Every entry starts with a fixed header followed by the raw HWC uint8 pixels
+HEADER = struct.Struct("<4sIII")
+MAGIC = b"RST1"
+
+CHANNELS = {"RGB": 3, "L": 1}
+
+# (pdf_path, page_number, dpi, colorspace) -> (pixels, height, width, channels)
+Renderer = Callable[[str, int, int, str], Tuple[bytes, int, int, int]]
+
+def render_page(pdf_path: str, page_number: int, dpi: int, colorspace: str) -> Tuple[bytes, int, int, int]:
+    """
+    Rasterize one page with PyMuPDF, or with pdf2image where PyMuPDF is not installed.
+
+    Args:
+        pdf_path (str): Path to the PDF
+        page_number (int): 1-based page number
+        dpi (int): Render resolution
+        colorspace (str): "RGB" or "L" (grayscale)
+
+    Returns:
+        tuple: Raw pixel bytes, height, width and number of channels
+    """
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+    if fitz is not None:
+        with fitz.open(pdf_path) as doc:
+            pix = doc.load_page(page_number - 1).get_pixmap(
+                dpi=dpi, colorspace=fitz.csGRAY if colorspace == "L" else fitz.csRGB, alpha=False
+            )
+            return pix.samples, pix.height, pix.width, pix.n
+
+    try:
+        from pdf2image import convert_from_path
+    except ImportError:
+        raise ImportError("Rendering pages needs PyMuPDF or pdf2image. Please install one with 'pip install pymupdf'")
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0].convert(colorspace)
+    return image.tobytes(), image.height, image.width, CHANNELS[colorspace]
+
+class PageRaster:
+    """A rendered page backed by a read-only memory map of its cache entry."""
+
+    __slots__ = ("height", "width", "channels", "buffer")
+
+    def __init__(self, height: int, width: int, channels: int, buffer):
+        self.height = height
+        self.width = width
+        self.channels = channels
+        self.buffer = buffer  # memoryview over the HWC uint8 pixels
+
+    @property
+    def nbytes(self) -> int:
+        return self.height * self.width * self.channels
+
+    def array(self):
+        """Pixels as an (H, W, C) numpy array sharing the memory map (no copy)."""
+        import numpy as np
+        return np.frombuffer(self.buffer, dtype=np.uint8).reshape(self.height, self.width, self.channels)
+
+    def image(self):
+        """Pixels as a PIL image sharing the memory map (no copy)."""
+        from PIL import Image
+        mode = "L" if self.channels == 1 else "RGB"
+        return Image.frombuffer(mode, (self.width, self.height), self.buffer, "raw", mode, 0, 1)
+
+class PageRasterCache:
+    """
+    Rendered pages keyed by PDF content, page number, dpi and colorspace.
+
+    Entries are raw uint8 pixel files that are memory-mapped on read, so every
+    parser that asks for the same page at the same resolution (in this process,
+    another environment, or a re-run after a crash) gets it without rendering
+    again. The least recently used entries are evicted once the cache grows past
+    ``max_bytes``.
+
+    Setting PAGE_CACHE=0 in the environment renders every page afresh.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 renderer: Optional[Renderer] = None):
+        """
+        Args:
+            cache_dir (str, optional): Cache directory
+                (default: $PAGE_CACHE_DIR or shared/page_cache)
+            max_bytes (int, optional): Cache size budget (default: $PAGE_CACHE_MAX_BYTES or 4 GiB)
+            renderer (callable, optional): Page rasterizer (default: render_page)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir or os.environ.get("PAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("PAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.renderer = renderer or render_page
+        self.enabled = os.environ.get("PAGE_CACHE", "1") != "0"
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._pdf_hashes: Dict[str, str] = {}
+
+    def _entry_path(self, pdf_path: str, page_number: int, dpi: int, colorspace: str) -> str:
+        pdf_path = os.path.abspath(pdf_path)
+        if pdf_path not in self._pdf_hashes:
+            self._pdf_hashes[pdf_path] = file_sha256(pdf_path)
+        name = f"{self._pdf_hashes[pdf_path]}.p{page_number}.{dpi}dpi.{colorspace}{SUFFIX}"
+        return os.path.join(self.cache_dir, name)
+
+    def render(self, pdf_path: str, page_number: int, dpi: int = 300, colorspace: str = "RGB") -> PageRaster:
+        """
+        Return a page's pixels, rendering and storing them only on a cache miss.
+
+        Args:
+            pdf_path (str): Path to the PDF
+            page_number (int): 1-based page number
+            dpi (int): Render resolution
+            colorspace (str): "RGB" or "L" (grayscale)
+
+        Returns:
+            PageRaster: The rendered page
+        """
+        if colorspace not in CHANNELS:
+            raise ValueError(f"Unsupported colorspace: {colorspace!r} (expected one of {sorted(CHANNELS)})")
+        if not self.enabled:
+            pixels, height, width, channels = self.renderer(pdf_path, page_number, dpi, colorspace)
+            return PageRaster(height, width, channels, memoryview(pixels))
+
+        path = self._entry_path(pdf_path, page_number, dpi, colorspace)
+        raster = self._load(path)
+        if raster is not None:
+            os.utime(path)  # refresh recency for LRU eviction
+            return raster
+
+        pixels, height, width, channels = self.renderer(pdf_path, page_number, dpi, colorspace)
+        if len(pixels) != height * width * channels:
+            raise ValueError(f"Renderer returned {len(pixels)} bytes for a {height}x{width}x{channels} page")
+        partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, height, width, channels))
+            f.write(pixels)
+        os.replace(partial_path, path)
+        # The new entry is never evicted, so the others share what is left of the budget
+        evicted = evict_lru(self.cache_dir, self.max_bytes - HEADER.size - len(pixels),
+                            suffix=SUFFIX, keep=(os.path.basename(path),))
+        if evicted:
+            self.logger.info(f"Evicted {evicted} least recently used page rasters")
+        return self._load(path)
+
+    def _load(self, path: str) -> Optional[PageRaster]:
+        """Memory-map a cache entry, or return None if it is absent or damaged."""
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None  # ValueError: empty file
+        if len(mapped) >= HEADER.size:
+            magic, height, width, channels = HEADER.unpack_from(mapped)
+            if magic == MAGIC and len(mapped) == HEADER.size + height * width * channels:
+                return PageRaster(height, width, channels, memoryview(mapped)[HEADER.size:])
+        mapped.close()
+        self.logger.warning(f"Ignoring damaged page raster {path}")
+        return None
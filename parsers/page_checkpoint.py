@@ -0,0 +1,93 @@
+"""Per-page checkpoints so long-running model parsers can resume after a crash."""
+
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from .cache_utils import file_sha256
+
+DEFAULT_CHECKPOINT_DIR = os.path.join("shared", "checkpoints")
+
+class PageCheckpoint:
+    """
+    Append-only sidecar file holding the finished pages of one PDF.
+
+    The file is keyed by the PDF's content hash and a namespace naming the parser
+    and its settings, so a re-run on the same document resumes where the last one
+    stopped. Each page is one JSON line written and fsynced as soon as it is done;
+    a line cut short by a crash is dropped from the file on load.
+    """
+
+    def __init__(self, pdf_path: str, namespace: str, checkpoint_dir: Optional[str] = None):
+        """
+        Open (or start) the checkpoint for a PDF.
+
+        Args:
+            pdf_path (str): Path to the PDF being parsed
+            namespace (str): Parser name and settings, e.g. "donut-<model>"
+            checkpoint_dir (str, optional): Directory for sidecar files
+                (default: $PARSER_CHECKPOINT_DIR or shared/checkpoints)
+        """
+        self.logger = logging.getLogger(__name__)
+        checkpoint_dir = checkpoint_dir or os.environ.get("PARSER_CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        self.pdf_hash = file_sha256(pdf_path)
+        safe_namespace = re.sub(r"[^A-Za-z0-9_.-]+", "_", namespace)
+        self.path = os.path.join(checkpoint_dir, f"{self.pdf_hash}.{safe_namespace}.jsonl")
+        self.pages = self._load()
+
+    def _load(self) -> Dict[int, Any]:
+        """Read completed pages from the sidecar file, truncating it after the last complete line."""
+        pages = {}
+        if not os.path.exists(self.path):
+            return pages
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                # A crash mid-write left a torn last line; later appends must not continue it
+                self.logger.warning(f"Dropping incomplete last checkpoint line in {self.path}")
+                f.truncate(complete)
+            for line in data[:complete].decode("utf-8", errors="replace").splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Ignoring unreadable checkpoint line in {self.path}")
+                    continue
+                pages[record["page"]] = record["result"]
+        if pages:
+            self.logger.info(f"Resuming from checkpoint {self.path}: {len(pages)} pages already done")
+        return pages
+
+    def __contains__(self, page: int) -> bool:
+        return page in self.pages
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def get(self, page: int) -> Any:
+        """Return the stored result of a completed page."""
+        return self.pages[page]
+
+    def save(self, page: int, result: Any) -> None:
+        """
+        Durably record the result of one page.
+
+        Args:
+            page (int): Page index as used by the caller
+            result: JSON-serialisable page result
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"page": page, "result": result}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pages[page] = result
+
+    def clear(self) -> None:
+        """Delete the checkpoint, e.g. once the full output has been written."""
+        self.pages = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,10 +1,17 @@
+import os
 import sys
-import json
 import logging
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextContainer, LTChar, LTTextBox
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .base import BaseParser
+from .document_model import Document, DocumentBuilder
+from .document_io import write_output
 
 # Configure logging
 logging.basicConfig(
@@ -13,10 +20,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class PDFMinerParser:
+class PDFMinerParser(BaseParser):
+    name = "pdfminer"
+
     def __init__(self):
         """Initialize the PDFMiner parser."""
-        pass
+        super().__init__()
 
     def extract_text_from_page(self, page) -> List[Dict[str, Any]]:
         """Extract text and its properties from a single page.
@@ -49,6 +58,52 @@ class PDFMinerParser:
         
         return texts
 
+    def parse(self, pdf_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the text boxes of each page as soon as PDFMiner has laid it out.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            pages: 1-based page numbers to parse (default: all)
+            
+        Yields:
+            Dictionary with page_number, text and the page's text boxes
+        """
+        page_numbers = sorted(set(pages)) if pages is not None else None
+        layouts = extract_pages(str(pdf_path), page_numbers=[p - 1 for p in page_numbers] if page_numbers else None)
+        for index, page_layout in enumerate(layouts):
+            page_num = page_numbers[index] if page_numbers else index + 1
+            page_texts = self.extract_text_from_page(page_layout)
+            yield {
+                "page_number": page_num,
+                "width": page_layout.width,
+                "height": page_layout.height,
+                "text": "\n\n".join(t["text"] for t in page_texts),
+                "texts": page_texts
+            }
+
+    def parse_document(self, pdf_path: str) -> Document:
+        """Parse a PDF straight into the compact array-backed Document model.
+        
+        Same text boxes as parse_pdf, without building a dict per box.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Document holding every text box with its bbox (top-left origin)
+        """
+        builder = DocumentBuilder(Path(pdf_path).name)
+        for page_num, page_layout in enumerate(extract_pages(str(pdf_path)), 1):
+            builder.add_page(page_num, page_layout.width, page_layout.height)
+            for element in page_layout:
+                if isinstance(element, LTTextBox):
+                    text_content = element.get_text().strip()
+                    if text_content:
+                        # Flip PDFMiner's bottom-left origin to the Document's top-left one
+                        x0, y0, x1, y1 = element.bbox
+                        builder.add_span(text_content, (x0, page_layout.height - y1, x1, page_layout.height - y0))
+        return builder.build()
+
     def parse_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """Parse a PDF file and extract text with layout information.
         
@@ -75,6 +130,8 @@ class PDFMinerParser:
                 if page_texts:
                     pages.append({
                         "page_number": page_num,
+                        "width": page_layout.width,
+                        "height": page_layout.height,
                         "texts": page_texts
                     })
                 else:
@@ -111,8 +168,8 @@ def main():
         output_dir = Path(output_json).parent
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        # Binary formats (.msgpack, .msgpack.zst) are picked by the extension
+        write_output(results, output_json)
             
         logger.info(f"Results saved to: {output_json}")
         
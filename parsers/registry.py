@@ -0,0 +1,74 @@
+"""Registry of parsers that implement BaseParser, imported lazily by name."""
+
+import os
+import importlib
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .base import BaseParser
+
+PARSERS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class ParserSpec(NamedTuple):
+    module: str       # module in this package
+    class_name: str   # BaseParser subclass in that module
+    env: Optional[str]     # conda environment with the parser's dependencies (None: in-process only)
+    script: Optional[str]  # script run by the subprocess fallback
+
+PARSERS: Dict[str, ParserSpec] = {
+    "pdfminer": ParserSpec("pdfminer_parser", "PDFMinerParser", "pdfminer_env", "pdfminer_parser.py"),
+    "mupdf": ParserSpec("mupdf_parser", "MuPDFParser", "pymupdf_env", "mupdf_parser.py"),
+    "docling": ParserSpec("docling_parser", "DoclingParser", "docling_env", "docling_parser.py"),
+    "camelot": ParserSpec("camelot_parser", "CamelotParser", "camelot_env", "camelot_parser.py"),
+    "paddleocr": ParserSpec("paddleocr_parser", "PaddleOCRParser", "paddleocr_env", "paddleocr_parser.py"),
+    "donut": ParserSpec("donut_parser", "DonutParser", "donut_env", "donut_parser.py"),
+    "layoutlmv3": ParserSpec("layoutlmv3_parser", "LayoutLMv3Parser", "layoutlm_env", "layoutlmv3_parser.py"),
+    # No conda environment is defined for Nougat; it only runs where nougat-ocr is installed
+    "nougat": ParserSpec("nougat_parser", "NougatParser", None, None),
+}
+
+class ParserUnavailable(ImportError):
+    """Raised when a parser's dependencies are not installed in the current environment."""
+
+def get_parser_class(name: str) -> type:
+    """
+    Import a parser's module and return its BaseParser subclass.
+
+    Raises:
+        ValueError: If the parser name is unknown
+        ParserUnavailable: If the parser's dependencies cannot be imported here
+    """
+    if name not in PARSERS:
+        available = ", ".join(PARSERS)
+        raise ValueError(f"Unknown parser: {name}. Available parsers: {available}")
+    spec = PARSERS[name]
+    try:
+        module = importlib.import_module(f".{spec.module}", __package__)
+    except ImportError as e:
+        where = f"it runs in {spec.env}" if spec.env else "it has no conda environment and only runs in-process"
+        raise ParserUnavailable(f"Parser '{name}' is not available in this environment ({e}); {where}") from e
+    return getattr(module, spec.class_name)
+
+def get_parser(name: str, **options: Any) -> BaseParser:
+    """
+    Create a parser by name. Its models are loaded on the first parse() call.
+
+    Args:
+        name (str): Key of PARSERS
+        **options: Keyword arguments for the parser's constructor
+
+    Returns:
+        BaseParser: The parser instance
+    """
+    return get_parser_class(name)(**options)
+
+def is_available(name: str) -> bool:
+    """Whether the parser can run in-process in the current environment."""
+    try:
+        get_parser_class(name)
+        return True
+    except ParserUnavailable:
+        return False
+
+def available_parsers() -> List[str]:
+    """Names of the parsers whose dependencies are importable here."""
+    return [name for name in PARSERS if is_available(name)]
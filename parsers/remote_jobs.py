@@ -0,0 +1,370 @@
+"""Concurrent submission and polling of remote parsing jobs (LlamaParse, LLMWhisperer)."""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import argparse
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+class RateLimited(Exception):
+    """Raised when a provider answers HTTP 429."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+class JobFailed(Exception):
+    """Raised when a provider reports that a job failed."""
+
+class RateLimiter:
+    """Async token bucket allowing ``rate`` requests per second with bursts of ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def encode_multipart(fields: Dict[str, str], file_field: str, filename: str, content: bytes) -> Tuple[bytes, str]:
+    """Build a multipart/form-data body with plain fields and one file."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'.encode("utf-8") + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+class RemoteProvider:
+    """
+    Blocking client for one remote parsing API.
+
+    Subclasses implement submit(), status() and fetch(); RemoteJobManager runs
+    them in worker threads. status() returns "pending", "done" or "failed".
+    """
+
+    name = "remote"
+    requests_per_second = 2.0
+    max_concurrent_jobs = 4
+
+    def __init__(self, api_key: str, base_url: str, timeout: float = 120.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _headers(self) -> Dict[str, str]:
+        return {}
+
+    def _request(self, method: str, path: str, data: Optional[bytes] = None,
+                 content_type: Optional[str] = None) -> Dict[str, Any]:
+        headers = self._headers()
+        if content_type:
+            headers["Content-Type"] = content_type
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After")
+                raise RateLimited(float(retry_after) if retry_after else None)
+            raise
+
+    def options(self) -> Dict[str, Any]:
+        """Parsing options sent with each job."""
+        return {}
+
+    def cache_options(self) -> Dict[str, Any]:
+        """Result cache options: the request options plus anything that changes the stored result's shape."""
+        return self.options()
+
+    def submit(self, pdf_path: str) -> str:
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        raise NotImplementedError
+
+    def fetch(self, job_id: str) -> Any:
+        raise NotImplementedError
+
+class LlamaParseProvider(RemoteProvider):
+    """LlamaParse REST API (upload, job status, JSON result)."""
+
+    name = "llamaparse"
+    requests_per_second = 5.0
+    max_concurrent_jobs = 16
+
+    def __init__(self, api_key: str, base_url: str = "https://api.cloud.llamaindex.ai/api/parsing",
+                 premium_mode: bool = True, language: str = "en", timeout: float = 120.0):
+        super().__init__(api_key, base_url, timeout)
+        self.premium_mode = premium_mode
+        self.language = language
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Accept": "application/json"}
+
+    def options(self) -> Dict[str, Any]:
+        return {"premium_mode": self.premium_mode, "language": self.language}
+
+    def submit(self, pdf_path: str) -> str:
+        with open(pdf_path, "rb") as f:
+            content = f.read()
+        fields = {"premium_mode": str(self.premium_mode).lower(), "language": self.language}
+        body, content_type = encode_multipart(fields, "file", os.path.basename(pdf_path), content)
+        return self._request("POST", "/upload", body, content_type)["id"]
+
+    def status(self, job_id: str) -> str:
+        state = self._request("GET", f"/job/{job_id}")["status"]
+        if state == "SUCCESS":
+            return "done"
+        if state in ("ERROR", "CANCELED"):
+            return "failed"
+        return "pending"
+
+    def fetch(self, job_id: str) -> Any:
+        result = self._request("GET", f"/job/{job_id}/result/json")
+        # Same page layout as parsers/llama_parser.py
+        return [
+            {"page_number": page.get("page"), "content": page.get("md") or page.get("text")}
+            for page in result.get("pages", [])
+        ]
+
+class LLMWhispererProvider(RemoteProvider):
+    """LLMWhisperer v2 REST API (whisper, whisper-status, whisper-retrieve)."""
+
+    name = "llmwhisperer"
+    requests_per_second = 2.0
+    max_concurrent_jobs = 4
+
+    def __init__(self, api_key: str, base_url: str = "https://llmwhisperer-api.us-central.unstract.com/api/v2",
+                 mode: str = "form", output_mode: str = "layout_preserving", timeout: float = 120.0):
+        super().__init__(api_key, base_url, timeout)
+        self.mode = mode
+        self.output_mode = output_mode
+
+    def _headers(self) -> Dict[str, str]:
+        return {"unstract-key": self.api_key}
+
+    def options(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "output_mode": self.output_mode}
+
+    def cache_options(self) -> Dict[str, Any]:
+        # The REST body differs from the SDK's {"status_code", "extraction"} wrapper
+        # stored by llmwhisperer_parser.py, so the two never share cache entries
+        return {**self.options(), "client": "rest"}
+
+    def submit(self, pdf_path: str) -> str:
+        with open(pdf_path, "rb") as f:
+            content = f.read()
+        query = urllib.parse.urlencode(self.options())
+        result = self._request("POST", f"/whisper?{query}", content, "application/octet-stream")
+        return result["whisper_hash"]
+
+    def status(self, job_id: str) -> str:
+        query = urllib.parse.urlencode({"whisper_hash": job_id})
+        state = self._request("GET", f"/whisper-status?{query}")["status"]
+        if state == "processed":
+            return "done"
+        if state in ("error", "failed", "unknown"):
+            return "failed"
+        return "pending"
+
+    def fetch(self, job_id: str) -> Any:
+        query = urllib.parse.urlencode({"whisper_hash": job_id})
+        return self._request("GET", f"/whisper-retrieve?{query}")
+
+class RemoteJobManager:
+    """
+    Submit many PDFs to one provider concurrently and poll all jobs from a single
+    event loop.
+
+    At most ``max_concurrent_jobs`` jobs are outstanding and every HTTP call goes
+    through a per-provider rate limiter. Each job is polled with exponential
+    backoff plus jitter, and its result is written to ``output_dir`` as soon as it
+    is retrieved. With ``use_cache`` set, PDFs parsed earlier with the same
+    provider options are served from the result cache without any request.
+    """
+
+    def __init__(self, provider: RemoteProvider, output_dir: str,
+                 max_concurrent_jobs: Optional[int] = None, requests_per_second: Optional[float] = None,
+                 poll_initial: float = 2.0, poll_max: float = 60.0, poll_factor: float = 1.5,
+                 jitter: float = 0.25, job_timeout: float = 1800.0, max_rate_retries: int = 5,
+                 use_cache: bool = True):
+        self.provider = provider
+        self.output_dir = output_dir
+        self.max_concurrent_jobs = max_concurrent_jobs or provider.max_concurrent_jobs
+        self.requests_per_second = requests_per_second or provider.requests_per_second
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        self.jitter = jitter
+        self.job_timeout = job_timeout
+        self.max_rate_retries = max_rate_retries
+        self.cache = ResultCache(provider.name, provider.cache_options()) if use_cache else None
+
+    def output_path(self, pdf_path: str) -> str:
+        return os.path.join(self.output_dir, f"{Path(pdf_path).stem}.json")
+
+    async def _call(self, limiter: RateLimiter, fn, *args):
+        """Run one blocking provider call in a thread, honouring the rate limit and 429s."""
+        for attempt in range(self.max_rate_retries + 1):
+            await limiter.acquire()
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except RateLimited as e:
+                if attempt == self.max_rate_retries:
+                    raise
+                delay = e.retry_after or self.poll_initial * (2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(1, 1 + self.jitter))
+
+    def _write(self, path: str, result: Any) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    async def _run_job(self, pdf_path: str, limiter: RateLimiter, slots: asyncio.Semaphore) -> str:
+        output_path = self.output_path(pdf_path)
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, pdf_path)
+            if cached is not None:
+                await asyncio.to_thread(self._write, output_path, cached)
+                logger.info(f"[{self.provider.name}] {pdf_path} served from cache -> {output_path}")
+                return output_path
+
+        async with slots:
+            start = time.monotonic()
+            job_id = await self._call(limiter, self.provider.submit, pdf_path)
+            logger.info(f"[{self.provider.name}] Submitted {pdf_path} as job {job_id}")
+
+            delay = self.poll_initial
+            while True:
+                await asyncio.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+                state = await self._call(limiter, self.provider.status, job_id)
+                if state == "done":
+                    break
+                if state == "failed":
+                    raise JobFailed(f"Job {job_id} for {pdf_path} failed")
+                if time.monotonic() - start > self.job_timeout:
+                    raise TimeoutError(f"Job {job_id} for {pdf_path} did not finish within {self.job_timeout}s")
+                delay = min(delay * self.poll_factor, self.poll_max)
+
+            result = await self._call(limiter, self.provider.fetch, job_id)
+        elapsed = time.monotonic() - start
+        await asyncio.to_thread(self._write, output_path, result)
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, pdf_path, result, elapsed)
+        logger.info(f"[{self.provider.name}] {pdf_path} done in {elapsed:.1f}s -> {output_path}")
+        return output_path
+
+    async def run(self, pdf_paths: List[str]) -> Dict[str, Any]:
+        """
+        Process all PDFs.
+
+        Returns:
+            Dict mapping each input path to its output path, or to the exception
+            that stopped its job
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        limiter = RateLimiter(self.requests_per_second)
+        slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        results = await asyncio.gather(
+            *(self._run_job(str(pdf), limiter, slots) for pdf in pdf_paths),
+            return_exceptions=True,
+        )
+        for pdf, result in zip(pdf_paths, results):
+            if isinstance(result, Exception):
+                logger.error(f"[{self.provider.name}] {pdf} failed: {result}")
+        return dict(zip(map(str, pdf_paths), results))
+
+def collect_pdfs(paths: List[str]) -> List[str]:
+    """Expand input files and directories into a sorted list of PDF paths."""
+    pdfs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(str(p) for p in sorted(path.iterdir()) if p.suffix.lower() == ".pdf")
+        elif path.exists():
+            pdfs.append(str(path))
+        else:
+            logger.warning(f"Skipping missing input: {path}")
+    return pdfs
+
+def build_provider(name: str, base_url: Optional[str] = None) -> RemoteProvider:
+    """Create a provider from its name, reading the API key from the environment."""
+    if name == "llamaparse":
+        api_key = os.getenv("LLAMA_CLOUD_API_KEY")
+        kwargs = {"base_url": base_url} if base_url else {}
+        provider = LlamaParseProvider(api_key, **kwargs)
+    elif name == "llmwhisperer":
+        api_key = os.getenv("LLMWHISPERER_API_KEY")
+        kwargs = {"base_url": base_url} if base_url else {}
+        provider = LLMWhispererProvider(api_key, **kwargs)
+    else:
+        raise ValueError(f"Unknown remote provider: {name}")
+    if not api_key:
+        raise ValueError(f"API key for {name} is not set in environment variables.")
+    return provider
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] - %(message)s")
+    parser = argparse.ArgumentParser(description="Parse many PDFs concurrently with a remote parser")
+    parser.add_argument("provider", choices=["llamaparse", "llmwhisperer"])
+    parser.add_argument("inputs", nargs="+", help="PDF files or directories")
+    parser.add_argument("--output-dir", required=True, help="Directory for one JSON result per PDF")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Maximum outstanding jobs (default: provider limit)")
+    parser.add_argument("--rate", type=float, default=None, help="Maximum requests per second (default: provider limit)")
+    parser.add_argument("--base-url", default=None, help="Override the provider API URL (e.g. a local stub)")
+    parser.add_argument("--no-cache", action="store_true", help="Always submit, ignoring cached results")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        print("❌ No PDF files found.")
+        sys.exit(1)
+    try:
+        provider = build_provider(args.provider, args.base_url)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    manager = RemoteJobManager(provider, args.output_dir, args.max_jobs, args.rate, use_cache=not args.no_cache)
+    results = asyncio.run(manager.run(pdfs))
+    failed = [pdf for pdf, result in results.items() if isinstance(result, Exception)]
+    print(f"✅ {len(pdfs) - len(failed)} of {len(pdfs)} PDFs parsed with {args.provider}.")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Local stand-in for the remote parsing APIs, for testing job submission without network access."""
+
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+import urllib.parse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class RemoteStubServer:
+    """
+    Threaded HTTP server emulating the LlamaParse (/api/parsing/...),
+    LLMWhisperer v2 (/api/v2/...) and Mathpix (/v3/pdf...) job APIs.
+
+    A job reports completion after ``polls_until_done`` status polls; uploads whose
+    content contains ``b"FAIL"`` end in an error state. With ``rate_limit`` set,
+    requests beyond that many per second get HTTP 429. The server records how
+    many jobs were outstanding at once and how many requests it rejected.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, polls_until_done: int = 2,
+                 rate_limit: float = None):
+        self.polls_until_done = polls_until_done
+        self.rate_limit = rate_limit
+        self.jobs = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.active_jobs = 0
+        self.max_active_jobs = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "RemoteStubServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self) -> bool:
+        """Count a request and decide whether it is within the rate limit."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return True
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.rate_limited += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def _create_job(self, name: str, content: bytes) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = {"name": name, "polls": 0, "failed": b"FAIL" in content, "retrieved": False}
+            self.active_jobs += 1
+            self.max_active_jobs = max(self.max_active_jobs, self.active_jobs)
+        return job_id
+
+    def _poll(self, job_id: str) -> str:
+        """Advance a job by one poll and return "pending", "done" or "failed"."""
+        with self._lock:
+            job = self.jobs[job_id]
+            job["polls"] += 1
+            if job["polls"] < self.polls_until_done:
+                return "pending"
+            if job["failed"]:
+                # A failed job is never retrieved, so it stops counting as outstanding here
+                if not job["retrieved"]:
+                    job["retrieved"] = True
+                    self.active_jobs -= 1
+                return "failed"
+            return "done"
+
+    def _progress(self, job_id: str) -> float:
+        with self._lock:
+            return min(100.0, 100.0 * self.jobs[job_id]["polls"] / self.polls_until_done)
+
+    def _retrieve(self, job_id: str) -> dict:
+        with self._lock:
+            job = self.jobs[job_id]
+            if not job["retrieved"]:
+                job["retrieved"] = True
+                self.active_jobs -= 1
+            return job
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_bytes(self, data, content_type="application/octet-stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _route(self, method):
+                url = urllib.parse.urlparse(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                body = self._body() if method == "POST" else b""
+                if not stub._admit():
+                    self._send_json(429, {"detail": "Too many requests"}, {"Retry-After": "0.2"})
+                    return
+
+                # LlamaParse
+                if method == "POST" and url.path == "/api/parsing/upload":
+                    match = re.search(rb'filename="([^"]+)"', body)
+                    name = match.group(1).decode() if match else "upload.pdf"
+                    self._send_json(200, {"id": stub._create_job(name, body), "status": "PENDING"})
+                    return
+                match = re.fullmatch(r"/api/parsing/job/([0-9a-f]+)(/result/json)?", url.path)
+                if method == "GET" and match and match.group(1) in stub.jobs:
+                    job_id = match.group(1)
+                    if match.group(2):
+                        job = stub._retrieve(job_id)
+                        self._send_json(200, {"pages": [{"page": 1, "text": f"stub text for {job['name']}", "md": f"# {job['name']}"}]})
+                    else:
+                        state = {"pending": "PENDING", "done": "SUCCESS", "failed": "ERROR"}[stub._poll(job_id)]
+                        self._send_json(200, {"id": job_id, "status": state})
+                    return
+
+                # LLMWhisperer v2
+                if method == "POST" and url.path == "/api/v2/whisper":
+                    name = hashlib.sha256(body).hexdigest()[:16]
+                    self._send_json(202, {"whisper_hash": stub._create_job(name, body), "status": "processing"})
+                    return
+                job_id = query.get("whisper_hash")
+                if method == "GET" and job_id in stub.jobs:
+                    if url.path == "/api/v2/whisper-status":
+                        state = {"pending": "processing", "done": "processed", "failed": "error"}[stub._poll(job_id)]
+                        self._send_json(200, {"status": state})
+                        return
+                    if url.path == "/api/v2/whisper-retrieve":
+                        job = stub._retrieve(job_id)
+                        self._send_json(200, {"result_text": f"stub text for {job['name']}"})
+                        return
+
+                # Mathpix
+                if url.path.startswith("/v3/pdf"):
+                    if not (self.headers.get("app_id") and self.headers.get("app_key")):
+                        self._send_json(401, {"error": "Missing app_id or app_key"})
+                        return
+                    if method == "POST" and url.path == "/v3/pdf":
+                        match = re.search(rb'filename="([^"]+)"', body)
+                        name = match.group(1).decode() if match else "upload.pdf"
+                        self._send_json(200, {"pdf_id": stub._create_job(name, body)})
+                        return
+                    match = re.fullmatch(r"/v3/pdf/([0-9a-f]+)(?:\.(.+))?", url.path)
+                    if method == "GET" and match and match.group(1) in stub.jobs:
+                        job_id, extension = match.groups()
+                        if extension:
+                            job = stub._retrieve(job_id)
+                            if extension.endswith(("docx", "zip")):
+                                # Zip container signature followed by bytes that are not UTF-8
+                                self._send_bytes(b"PK\x03\x04\xff\xfe" + job["name"].encode("utf-8"))
+                                return
+                            line = {"type": "text", "text": f"stub text for {job['name']} $x^2$"}
+                            self._send_json(200, {"pages": [{"page": 1, "lines": [line]}], "format": extension})
+                        else:
+                            state = {"pending": "split", "done": "completed", "failed": "error"}[stub._poll(job_id)]
+                            self._send_json(200, {"status": state, "num_pages": 1, "percent_done": stub._progress(job_id)})
+                        return
+
+                self._send_json(404, {"detail": "not found"})
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub remote-parser API server for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--polls-until-done", type=int, default=3)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    server = RemoteStubServer(args.host, args.port, args.polls_until_done, args.rate_limit)
+    print(f"🧪 Stub remote parser API listening on {server.url}")
+    print(f"   LlamaParse base URL:   {server.url}/api/parsing")
+    print(f"   LLMWhisperer base URL: {server.url}/api/v2")
+    print(f"   Mathpix base URL:      {server.url}/v3/pdf")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Disk cache for the results of paid or slow remote parsers."""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: statistics are only locked between threads
+    fcntl = None
+
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .cache_utils import count_pdf_pages, evict_lru, file_sha256
+
+DEFAULT_CACHE_DIR = os.path.join("shared", "result_cache")
+DEFAULT_TTL = 30 * 24 * 3600  # seconds
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+STATS_FILE = "stats.json"
+STATS_LOCK_FILE = "stats.json.lock"
+
+# Approximate list prices in USD per page, only used to report what the cache saved
+COST_PER_PAGE = {
+    "llamaparse": 0.045,
+    "llmwhisperer": 0.01,
+    "mathpix": 0.005,
+    "vision": 0.01,
+    "vision-ollama": 0.0,
+}
+
+_stats_lock = threading.Lock()
+
+@contextmanager
+def _locked_stats(cache_dir: str):
+    """Hold the statistics lock of a cache directory, across threads and processes."""
+    with _stats_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(cache_dir, STATS_LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class ResultCache:
+    """
+    Parser results keyed by PDF content, parser name and parser options.
+
+    A hit returns the stored result without any network call. Entries expire
+    after ``ttl`` seconds, and the least recently used ones are evicted once the
+    cache grows past ``max_bytes``. Hits, misses and the estimated cost and
+    latency saved are accumulated per parser in ``stats.json``.
+
+    Setting PARSER_CACHE=0 in the environment turns the cache off.
+    """
+
+    def __init__(self, parser: str, options: Optional[Dict[str, Any]] = None,
+                 cache_dir: Optional[str] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, cost_per_page: Optional[float] = None):
+        """
+        Args:
+            parser (str): Parser name, e.g. "llamaparse"
+            options (dict, optional): Settings that change the result (mode, model, language)
+            cache_dir (str, optional): Cache directory
+                (default: $PARSER_CACHE_DIR or shared/result_cache)
+            ttl (float, optional): Entry lifetime in seconds (default: $PARSER_CACHE_TTL or 30 days)
+            max_bytes (int, optional): Cache size budget (default: $PARSER_CACHE_MAX_BYTES or 2 GiB)
+            cost_per_page (float, optional): USD per page for savings estimates
+                (default: COST_PER_PAGE[parser])
+        """
+        self.logger = logging.getLogger(__name__)
+        self.parser = parser
+        self.options = options or {}
+        self.cache_dir = cache_dir or os.environ.get("PARSER_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.ttl = ttl if ttl is not None else float(os.environ.get("PARSER_CACHE_TTL", DEFAULT_TTL))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("PARSER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.cost_per_page = cost_per_page if cost_per_page is not None else COST_PER_PAGE.get(parser, 0.0)
+        self.enabled = os.environ.get("PARSER_CACHE", "1") != "0"
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._pdf_hashes: Dict[str, str] = {}
+
+    def key(self, pdf_path: str) -> str:
+        """Cache key of a PDF for this parser and options."""
+        pdf_path = os.path.abspath(pdf_path)
+        if pdf_path not in self._pdf_hashes:
+            self._pdf_hashes[pdf_path] = file_sha256(pdf_path)
+        material = json.dumps(
+            {"pdf": self._pdf_hashes[pdf_path], "parser": self.parser, "options": self.options},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, pdf_path: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.key(pdf_path)}.json")
+
+    def get(self, pdf_path: str) -> Optional[Any]:
+        """
+        Return the cached result for a PDF, or None on a miss.
+
+        Args:
+            pdf_path (str): Path to the PDF
+
+        Returns:
+            The stored result, or None if absent, expired or unreadable
+        """
+        if not self.enabled:
+            return None
+        path = self._entry_path(pdf_path)
+        entry = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+
+        if entry is not None and time.time() - entry["created"] > self.ttl:
+            self.logger.info(f"Cache entry for {pdf_path} expired")
+            os.remove(path)
+            entry = None
+
+        if entry is None:
+            self._record(hit=False)
+            return None
+
+        os.utime(path)  # refresh recency for LRU eviction
+        self._record(hit=True, pages=entry.get("pages") or 0, elapsed=entry.get("elapsed") or 0.0)
+        self.logger.info(f"Cache hit for {pdf_path} ({self.parser})")
+        return entry["result"]
+
+    def put(self, pdf_path: str, result: Any, elapsed: float, pages: Optional[int] = None) -> None:
+        """
+        Store a parser result.
+
+        Args:
+            pdf_path (str): Path to the parsed PDF
+            result: JSON-serialisable parser output
+            elapsed (float): Seconds the parse took, reported as saved latency on hits
+            pages (int, optional): Page count for cost estimates (counted from the PDF if omitted)
+        """
+        if not self.enabled:
+            return
+        entry = {
+            "created": time.time(),
+            "parser": self.parser,
+            "options": self.options,
+            "pdf_hash": self._pdf_hashes.get(os.path.abspath(pdf_path)) or file_sha256(pdf_path),
+            "pages": pages if pages is not None else count_pdf_pages(pdf_path),
+            "elapsed": elapsed,
+            "result": result,
+        }
+        path = self._entry_path(pdf_path)
+        partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(partial_path, path)
+        evicted = evict_lru(self.cache_dir, self.max_bytes, keep=(STATS_FILE,))
+        if evicted:
+            self.logger.info(f"Evicted {evicted} least recently used cache entries")
+
+    def _record(self, hit: bool, pages: int = 0, elapsed: float = 0.0) -> None:
+        """Add one lookup to the persistent per-parser statistics."""
+        path = os.path.join(self.cache_dir, STATS_FILE)
+        with _locked_stats(self.cache_dir):
+            stats = load_stats(self.cache_dir)
+            counters = stats.setdefault(self.parser, {
+                "hits": 0, "misses": 0, "saved_cost_usd": 0.0, "saved_seconds": 0.0,
+            })
+            if hit:
+                counters["hits"] += 1
+                counters["saved_cost_usd"] += pages * self.cost_per_page
+                counters["saved_seconds"] += elapsed
+            else:
+                counters["misses"] += 1
+            partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(partial_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+            os.replace(partial_path, path)
+
+def load_stats(cache_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Read the per-parser cache statistics."""
+    cache_dir = cache_dir or os.environ.get("PARSER_CACHE_DIR", DEFAULT_CACHE_DIR)
+    try:
+        with open(os.path.join(cache_dir, STATS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the remote parser result cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--cache-dir", default=None, help="Cache directory (default: shared/result_cache)")
+    args = parser.parse_args()
+    cache_dir = args.cache_dir or os.environ.get("PARSER_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+    if args.command == "clear":
+        if os.path.isdir(cache_dir):
+            removed = evict_lru(cache_dir, 0, keep=(STATS_FILE,))
+            print(f"🧹 Removed {removed} cache entries from {cache_dir}")
+        return
+
+    stats = load_stats(cache_dir)
+    if not stats:
+        print(f"⚠️ No cache statistics in {cache_dir}")
+        sys.exit(0)
+    print(f"\n📊 Result cache statistics ({cache_dir})")
+    for name, counters in sorted(stats.items()):
+        lookups = counters["hits"] + counters["misses"]
+        hit_rate = counters["hits"] / lookups if lookups else 0.0
+        print(f"\n🔹 {name}")
+        print(f"   Hits: {counters['hits']}/{lookups} ({hit_rate:.1%})")
+        print(f"   Saved cost: ${counters['saved_cost_usd']:.2f}")
+        print(f"   Saved time: {counters['saved_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 import sys
 import json
 import os
-import subprocess
-from pathlib import Path
+import argparse
+import time
 from typing import Optional, List
-
-# Try importing vision_parse with helpful error message
-try:
-    from vision_parse import VisionParser
-except ImportError:
-    print("❌ Error: vision_parse module not found. Please install it first.")
-    sys.exit(1)
+import fitz  # PyMuPDF
+if __package__ in (None, ""):
+    # Run as `python parsers/<script>.py`: import the sibling modules through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "parsers"
+from .ollama_dispatch import DEFAULT_OLLAMA_HOST, OllamaPageDispatcher
+from .result_cache import ResultCache
+
+CUSTOM_PROMPT = "- Only use data found directly in the input. Do not add or invent details. If data is missing, leave it as null or \"Not Available\".Do not assume or correct data format unless it's clearly stated."
+
+# Prompt for pages sent straight to Ollama by OllamaPageDispatcher
+PAGE_PROMPT = (
+    "Convert this document page to Markdown. Keep headings, lists and the reading order, "
+    "and render tables as Markdown tables.\n" + CUSTOM_PROMPT
+)
 
 # Available models and their characteristics
 AVAILABLE_MODELS = {
@@ -64,25 +72,26 @@ def list_available_models():
         print(f"   Description: {info['description']}")
         print(f"   Size: {info['size']}")
 
-def check_ollama(model_name: str) -> bool:
-    """Check if Ollama daemon is running and model is available."""
+def is_ollama_model(model_name: str) -> bool:
+    """Models that run locally through Ollama rather than a hosted API."""
+    return AVAILABLE_MODELS[model_name]["size"] != "Requires API key"
+
+def check_ollama(dispatcher: OllamaPageDispatcher) -> bool:
+    """Check if the Ollama server is reachable and the model is available."""
     try:
-        # Check if Ollama process is running
-        result = subprocess.run(['pgrep', 'ollama'], capture_output=True)
-        if result.returncode != 0:
-            print("❌ Error: Ollama daemon is not running. Please start it with 'ollama serve'")
-            return False
-        
-        # Check if model is pulled
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
-        if model_name not in result.stdout:
-            print(f"❌ Error: {model_name} model not found. Please pull it first with 'ollama pull {model_name}'")
-            return False
-        
-        return True
+        models = dispatcher.available_models()
     except Exception as e:
-        print(f"❌ Error checking Ollama status: {e}")
+        print(f"❌ Error: Ollama is not reachable at {dispatcher.host} ({e}). Please start it with 'ollama serve'")
         return False
+    if dispatcher.model_name not in models:
+        print(f"❌ Error: {dispatcher.model_name} model not found. Please pull it first with 'ollama pull {dispatcher.model_name}'")
+        return False
+    return True
+
+def render_pages(pdf_path: str, dpi: int = 150) -> List[bytes]:
+    """Render every page of a PDF to PNG bytes."""
+    with fitz.open(pdf_path) as doc:
+        return [page.get_pixmap(dpi=dpi).tobytes("png") for page in doc]
 
 def validate_paths(pdf_path, output_path):
     """Validate input and output paths."""
@@ -105,7 +114,9 @@ def validate_paths(pdf_path, output_path):
     except IOError as e:
         raise IOError(f"Cannot write to output path: {output_path}. Error: {e}")
 
-def main(pdf_path: str, output_path: str, model_name: Optional[str] = "llava:13b"):
+def main(pdf_path: str, output_path: str, model_name: Optional[str] = "llava:13b",
+         max_in_flight: int = 4, timeout: float = 300.0, retries: int = 2,
+         ollama_host: str = DEFAULT_OLLAMA_HOST, dpi: int = 150):
     """
     Process PDF using specified vision model.
     
@@ -113,6 +124,11 @@ def main(pdf_path: str, output_path: str, model_name: Optional[str] = "llava:13b
         pdf_path: Path to input PDF
         output_path: Path for output JSON
         model_name: Name of the model to use (default: llava:13b)
+        max_in_flight: Maximum pages sent to the model at once
+        timeout: Per-page request timeout in seconds (Ollama models)
+        retries: Extra attempts for a failed page (Ollama models)
+        ollama_host: Base URL of the Ollama server
+        dpi: Resolution pages are rendered at (Ollama models)
     """
     if model_name not in AVAILABLE_MODELS:
         print(f"❌ Error: Unknown model '{model_name}'")
@@ -127,24 +143,61 @@ def main(pdf_path: str, output_path: str, model_name: Optional[str] = "llava:13b
     try:
         # Validate paths first
         validate_paths(pdf_path, output_path)
-        
-        # Check Ollama status
-        if not check_ollama(model_name):
-            sys.exit(1)
-
-        parser = VisionParser(
-            model_name=model_name,
-            temperature=0,
-            custom_prompt="- Only use data found directly in the input. Do not add or invent details. If data is missing, leave it as null or \"Not Available\".Do not assume or correct data format unless it's clearly stated.",
-            image_mode="url",
-            detailed_extraction=True,
-            enable_concurrency=False,
-        )
-
-        markdown_pages = parser.convert_pdf(pdf_path)
-
+        output = {}
+
+        if is_ollama_model(model_name):
+            cache = ResultCache("vision-ollama", {"model": model_name, "prompt": PAGE_PROMPT, "dpi": dpi})
+        else:
+            cache = ResultCache("vision", {"model": model_name, "prompt": CUSTOM_PROMPT})
+        cached = cache.get(pdf_path)
+        if cached is not None:
+            with open(output_path, "w", encoding='utf-8') as f:
+                json.dump(cached, f, indent=2, ensure_ascii=False)
+            print("✅ Reused cached result!")
+            return
+        start_time = time.time()
+
+        if is_ollama_model(model_name):
+            dispatcher = OllamaPageDispatcher(
+                model_name,
+                PAGE_PROMPT,
+                host=ollama_host,
+                max_in_flight=max_in_flight,
+                timeout=timeout,
+                retries=retries,
+            )
+            # Check Ollama status
+            if not check_ollama(dispatcher):
+                sys.exit(1)
+
+            images = render_pages(pdf_path, dpi)
+            print(f"🚀 Dispatching {len(images)} pages, up to {dispatcher.max_in_flight} at a time")
+            markdown_pages = dispatcher.run(images)
+            if dispatcher.failed_pages:
+                output["failed_pages"] = sorted(i + 1 for i in dispatcher.failed_pages)
+                print(f"⚠️ Pages failed after retries: {output['failed_pages']}")
+        else:
+            try:
+                from vision_parse import VisionParser
+            except ImportError:
+                print("❌ Error: vision_parse module not found. Please install it first.")
+                sys.exit(1)
+
+            parser = VisionParser(
+                model_name=model_name,
+                temperature=0,
+                custom_prompt=CUSTOM_PROMPT,
+                image_mode="url",
+                detailed_extraction=True,
+                enable_concurrency=max_in_flight > 1,
+            )
+            markdown_pages = parser.convert_pdf(pdf_path)
+
+        result = {"pages": markdown_pages, **output}
         with open(output_path, "w", encoding='utf-8') as f:
-            json.dump({"pages": markdown_pages}, f, indent=2, ensure_ascii=False)
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        if "failed_pages" not in output:
+            cache.put(pdf_path, result, time.time() - start_time, pages=len(markdown_pages))
 
         print("✅ PDF processed successfully!")
 
@@ -156,18 +209,23 @@ def main(pdf_path: str, output_path: str, model_name: Optional[str] = "llava:13b
             parser.cleanup()
 
 if __name__ == "__main__":
-    if len(sys.argv) not in [3, 4]:
-        print("Usage:")
-        print("  python parsers/vision_parser.py <input_pdf_path> <output_json_path> [model_name]")
-        print("\nTo see available models:")
-        print("  python parsers/vision_parser.py --list-models")
-        sys.exit(1)
-
     if len(sys.argv) == 2 and sys.argv[1] == "--list-models":
         list_available_models()
         sys.exit(0)
 
-    input_pdf = sys.argv[1]
-    output_json = sys.argv[2]
-    model_name = sys.argv[3] if len(sys.argv) == 4 else "llava:13b"
-    main(input_pdf, output_json, model_name)
+    arg_parser = argparse.ArgumentParser(
+        description="Parse a PDF with a vision model",
+        epilog="To see available models: python parsers/vision_parser.py --list-models",
+    )
+    arg_parser.add_argument("input_pdf", help="Path to input PDF file")
+    arg_parser.add_argument("output_json", help="Path for output JSON file")
+    arg_parser.add_argument("model_name", nargs="?", default="llava:13b", help="Model to use (default: llava:13b)")
+    arg_parser.add_argument("--max-in-flight", type=int, default=4, help="Pages sent to the model at once (default: 4)")
+    arg_parser.add_argument("--timeout", type=float, default=300.0, help="Per-page timeout in seconds (default: 300)")
+    arg_parser.add_argument("--retries", type=int, default=2, help="Retries for a failed page (default: 2)")
+    arg_parser.add_argument("--ollama-host", default=os.environ.get("OLLAMA_HOST", DEFAULT_OLLAMA_HOST), help="Ollama server URL")
+    arg_parser.add_argument("--dpi", type=int, default=150, help="Page render resolution (default: 150)")
+    args = arg_parser.parse_args()
+
+    main(args.input_pdf, args.output_json, args.model_name, args.max_in_flight,
+         args.timeout, args.retries, args.ollama_host, args.dpi)
@@ -0,0 +1,64 @@
+"""Shared test setup."""
+
+import sys
+import types
+
+import pytest
+
+class FakeTokenizer:
+    """Whitespace tokenizer standing in for a HuggingFace one."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, text, add_special_tokens=True):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    """A transformers module whose AutoTokenizer loads FakeTokenizers; yields the models loaded."""
+    from database import text_chunker
+
+    loads = []
+
+    def from_pretrained(model_name):
+        loads.append(model_name)
+        return FakeTokenizer(model_name)
+
+    module = types.ModuleType("transformers")
+    module.AutoTokenizer = types.SimpleNamespace(from_pretrained=from_pretrained)
+    monkeypatch.setitem(sys.modules, "transformers", module)
+    text_chunker._load_tokenizer.cache_clear()
+    yield loads
+    text_chunker._load_tokenizer.cache_clear()
+
+@pytest.fixture
+def install_fake_parsers(tmp_path, monkeypatch):
+    """
+    Install parser source as a module of the parsers package and register its classes.
+
+    Returns a function ``install(module_name, source, classes)`` where classes
+    maps registry names to class names in the module; each name gets the
+    environment "<name>_env". Returns the imported module.
+    """
+    import importlib
+    import parsers
+    from parsers import registry
+
+    monkeypatch.setattr(parsers, "__path__", [*parsers.__path__, str(tmp_path)])
+    installed = []
+
+    def install(module_name, source, classes):
+        (tmp_path / f"{module_name}.py").write_text(source)
+        for name, class_name in classes.items():
+            monkeypatch.setitem(registry.PARSERS, name,
+                                registry.ParserSpec(module_name, class_name, f"{name}_env", f"{module_name}.py"))
+        installed.append(module_name)
+        return importlib.import_module(f"parsers.{module_name}")
+
+    yield install
+    for module_name in installed:
+        sys.modules.pop(f"parsers.{module_name}", None)
@@ -0,0 +1,56 @@
+"""Test the per-page render resolution choice."""
+
+import pytest
+
+from parsers import adaptive_dpi
+from parsers.adaptive_dpi import DpiChooser, dpi_for_text_height, line_heights
+from parsers.page_cache import PageRasterCache
+
+def scan(line_height, width=200, height=600, gap=8):
+    """Grayscale page with black text lines of the given height, separated by white gaps."""
+    rows = []
+    while len(rows) + line_height <= height:
+        rows += [b"\x00" * 20 + b"\xff" * (width - 20)] * line_height + [b"\xff" * width] * gap
+    rows += [b"\xff" * width] * (height - len(rows))
+    return b"".join(rows[:height]), width, height
+
+def test_text_height_sets_the_resolution():
+    """Large print renders at the floor, small print at 300 dpi or more, within the ceiling."""
+    assert dpi_for_text_height(18) == 150
+    assert dpi_for_text_height(11) == 200
+    assert dpi_for_text_height(7) == 325
+    assert dpi_for_text_height(3) == 400
+    assert dpi_for_text_height(3, ceiling=600) == 600
+    assert dpi_for_text_height(40, floor=100) == 100
+
+def test_line_heights_come_from_the_projection_profile():
+    samples, width, height = scan(line_height=9)
+    heights = line_heights(samples, width, height)
+    assert heights and set(heights) == {9}
+    assert line_heights(b"\xff" * 100 * 50, 100, 50) == []
+
+@pytest.mark.parametrize("line_height,expected", [(18, 150), (7, 325)])
+def test_scanned_pages_are_measured_on_a_cached_preview(tmp_path, monkeypatch, line_height, expected):
+    """Without a text layer, the chooser reads line heights from a 72 dpi grayscale render."""
+    monkeypatch.setattr(adaptive_dpi.DpiChooser, "_inspect_text_layer", lambda self, pdf, page: (None, None))
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    renders = []
+
+    def renderer(pdf_path, page_number, dpi, colorspace):
+        renders.append((dpi, colorspace))
+        samples, width, height = scan(line_height)
+        return samples, height, width, 1
+
+    chooser = DpiChooser(page_cache=PageRasterCache(cache_dir=str(tmp_path / "cache"), renderer=renderer))
+    assert chooser.choose(str(pdf), 1) == expected
+    assert chooser.choose(str(pdf), 1) == expected
+    assert renders == [(72, "L")]
+
+def test_scans_are_not_rendered_above_their_native_resolution(tmp_path, monkeypatch):
+    monkeypatch.setattr(adaptive_dpi.DpiChooser, "_inspect_text_layer", lambda self, pdf, page: (None, 200))
+    monkeypatch.setattr(adaptive_dpi.DpiChooser, "_measure_scan", lambda self, pdf, page: 5.0)
+    assert DpiChooser(page_cache=PageRasterCache(cache_dir=str(tmp_path))).choose("scan.pdf", 1) == 200
+
+    with pytest.raises(ValueError):
+        DpiChooser(floor=300, ceiling=200, page_cache=PageRasterCache(cache_dir=str(tmp_path)))
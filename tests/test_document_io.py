@@ -0,0 +1,52 @@
+"""Test the JSON and binary parser output formats."""
+
+import pytest
+
+from parsers.document_io import iter_page_texts, output_format, read_output, write_output
+
+PAGES_OUTPUT = {
+    "parser": "pymupdf",
+    "pages": [
+        {"page_number": 1, "text": "First page", "dpi": 200},
+        {"page_number": 2, "text": ""},
+        {"page_number": 3, "text": "Ünïcødé ∑ third page", "tables": [["a", "b"], ["1", "2"]]},
+    ],
+}
+
+PDFMINER_OUTPUT = {
+    "filename": "report.pdf",
+    "total_pages": 1,
+    "pages": [{"page_number": 1, "texts": [{"text": "Title", "bbox": {"x0": 1.0, "y0": 2.0, "x1": 3.0, "y1": 4.0}}]}],
+}
+
+DOCLING_OUTPUT = {"schema_name": "DoclingDocument", "texts": [{"label": "text", "text": "Body"}], "pages": {"1": {}}}
+
+@pytest.mark.parametrize("suffix", [".json", ".msgpack", ".msgpack.zst", ".arrow", ".feather", ".parquet"])
+@pytest.mark.parametrize("data", [PAGES_OUTPUT, PDFMINER_OUTPUT, DOCLING_OUTPUT], ids=["pages", "pdfminer", "docling"])
+def test_every_format_round_trips(tmp_path, suffix, data):
+    """Whatever the extension, read_output returns what write_output was given."""
+    if suffix != ".json":
+        pytest.importorskip("pyarrow" if suffix in (".arrow", ".feather", ".parquet") else "msgpack")
+    if suffix == ".msgpack.zst":
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"out{suffix}")
+    if output_format(path) in ("arrow", "parquet") and data is not PAGES_OUTPUT:
+        # Columnar formats only take a text per page; other layouts would be JSON in a container
+        with pytest.raises(ValueError, match="msgpack"):
+            write_output(data, path)
+        return
+    assert write_output(data, path) == output_format(path)
+    assert read_output(path) == data
+
+def test_page_texts_stream_from_columnar_files(tmp_path):
+    """Arrow and Parquet page texts are read without the other columns; other formats fall back."""
+    pytest.importorskip("pyarrow")
+    for suffix, compression in ((".arrow", None), (".arrow", "zstd"), (".parquet", "zstd")):
+        path = str(tmp_path / f"pages{suffix}")
+        write_output(PAGES_OUTPUT, path, compression=compression)
+        assert list(iter_page_texts(path)) == ["First page", "Ünïcødé ∑ third page"]
+
+    for name, data in (("pdfminer.msgpack", PDFMINER_OUTPUT), ("pages.json", PAGES_OUTPUT)):
+        path = str(tmp_path / name)
+        write_output(data, path)
+        assert iter_page_texts(path) is None
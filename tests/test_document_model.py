@@ -0,0 +1,72 @@
+"""Test the array-backed Document model and its JSON conversions."""
+
+import json
+
+from parsers.document_model import Document, DocumentBuilder
+
+PDFMINER_JSON = {
+    "filename": "report.pdf",
+    "total_pages": 2,
+    "pages": [
+        {"page_number": 1, "texts": [
+            {"text": "Quarterly report", "bbox": {"x0": 72.0, "y0": 700.25, "x1": 300.5, "y1": 720.0}},
+            {"text": "Revenue grew by 12 %", "bbox": {"x0": 72.0, "y0": 650.0, "x1": 412.13, "y1": 664.4}},
+        ]},
+        {"page_number": 3, "texts": [
+            {"text": "Ünïcødé ∑ text", "bbox": {"x0": 10.0, "y0": 20.0, "x1": 30.0, "y1": 40.0}},
+        ]},
+    ],
+}
+
+MUPDF_JSON = {
+    "metadata": {"title": "Report", "author": ""},
+    "page_count": 2,
+    "text_by_page": {"0": "Title\nBody line\n", "1": ""},
+    "text_with_coordinates": {
+        "0": [
+            {"text": "Title", "bbox": [72.0, 60.5, 140.25, 80.0], "font": "Helvetica-Bold", "size": 18.0},
+            {"text": "Body line", "bbox": [72.0, 100.0, 180.0, 112.0], "font": "Helvetica", "size": 11.955},
+        ],
+        "1": [],
+    },
+}
+
+def test_pdfminer_and_mupdf_json_round_trip():
+    """Existing parser JSON converts to a Document and back unchanged."""
+    document = Document.from_pdfminer_json(PDFMINER_JSON)
+    assert document.num_spans == 3
+    assert [page.number for page in document.pages] == [1, 3]
+    assert document.pages[1].text == "Ünïcødé ∑ text"
+    assert document.to_pdfminer_json() == PDFMINER_JSON
+    assert document.metadata == {"bbox_origin": "bottom-left"}
+
+    sized = {**PDFMINER_JSON, "pages": [{**page, "width": 612.0, "height": 792.0} for page in PDFMINER_JSON["pages"]]}
+    document = Document.from_pdfminer_json(sized)
+    assert list(document.pages[0].spans())[0].bbox.tolist() == [72.0, 72.0, 300.5, 91.75]
+    assert document.metadata == {}
+    assert document.to_pdfminer_json() == sized
+
+    document = Document.from_mupdf_json(MUPDF_JSON)
+    first_page = document.pages[0]
+    assert [span.font for span in first_page.spans()] == ["Helvetica-Bold", "Helvetica"]
+    assert list(first_page.spans())[1].font_size == 11.955
+    assert document.to_mupdf_json() == MUPDF_JSON
+
+def test_compact_form_is_lossless_and_smaller():
+    """The compact JSON restores every column and is much smaller than per-span dicts."""
+    builder = DocumentBuilder("big.pdf")
+    for page in range(1, 51):
+        builder.add_page(page, 612.0, 792.0)
+        for i in range(200):
+            builder.add_span(f"span {i} on page {page}", (72.0, 700.0 - i, 300.0, 712.0 - i), 11.0, "Times")
+    document = builder.build()
+
+    compact = json.loads(json.dumps(document.to_compact_dict()))
+    restored = Document.from_compact_dict(compact)
+    assert restored.text == document.text
+    assert restored.bboxes == document.bboxes
+    assert restored.page_starts == document.page_starts
+    assert restored.pages[49].text == document.pages[49].text
+
+    nested = json.dumps(document.to_pdfminer_json(), indent=2)
+    assert len(json.dumps(compact)) < len(nested) / 2
@@ -0,0 +1,159 @@
+"""Test quality scoring and quality-gated parser escalation."""
+
+import os
+import sys
+import time
+import json
+
+import pytest
+
+import parsers.registry
+from analyzer.quality import score_text
+from database.escalation import EscalationRouter, page_texts_from_output
+
+GOOD_TEXT = "The committee approved the annual budget after a long discussion of regional priorities. " * 4
+
+FAKE_PARSERS = '''
+import time
+from parsers.base import BaseParser
+
+GOOD_TEXT = {good!r}
+calls = []
+
+class CheapParser(BaseParser):
+    """Clean text layer on odd pages, unmapped glyphs on even ones."""
+    name = "cheap"
+
+    def parse(self, pdf_path, pages=None):
+        calls.append(("cheap", pages))
+        for page in pages or (1, 2, 3, 4):
+            yield {{"page_number": page, "text": GOOD_TEXT if page % 2 else "(cid:3)(cid:17)(cid:42) " * 20}}
+
+class OcrParser(BaseParser):
+    name = "ocr"
+
+    def parse(self, pdf_path, pages=None):
+        calls.append(("ocr", pages))
+        for page in pages or (1, 2, 3, 4):
+            time.sleep(0.2)
+            yield {{"page_number": page, "text": GOOD_TEXT}}
+'''
+
+@pytest.fixture
+def fake_parsers(install_fake_parsers):
+    return install_fake_parsers("fake_escalation_parsers", FAKE_PARSERS.format(good=GOOD_TEXT),
+                                {"cheap": "CheapParser", "ocr": "OcrParser"})
+
+def test_quality_score_separates_clean_text_from_garbage():
+    assert score_text(GOOD_TEXT) > 0.9
+    assert score_text("") == 0.0
+    assert score_text("(cid:3)(cid:17)(cid:42) " * 20) == 0.0
+    assert score_text("l|I ~~ ii1l rn|n qwrtzpl " * 20) < 0.2
+    assert score_text("Revenue 2023: $4,512 (+12%) " * 10) > 0.9
+
+def test_only_low_quality_pages_are_escalated(tmp_path, fake_parsers):
+    output = tmp_path / "out" / "doc.json"
+    result = EscalationRouter(ladder=["cheap", "ocr"], deadline=30).run("doc.pdf", str(output))
+
+    assert fake_parsers.calls == [("cheap", None), ("ocr", [2, 4])]
+    assert [page["parser"] for page in result["pages"]] == ["cheap", "ocr", "cheap", "ocr"]
+    steps = result["escalation"]["steps"]
+    assert [(s["parser"], s["pages"], s["status"], s["improved"]) for s in steps] == [
+        ("cheap", [1, 2, 3, 4], "ok", [1, 2, 3, 4]),
+        ("ocr", [2, 4], "ok", [2, 4]),
+    ]
+    assert all(s["seconds"] >= 0 for s in steps)
+    assert result["escalation"]["below_threshold"] == []
+    assert json.loads(output.read_text()) == result
+
+def test_deadline_keeps_the_best_result_so_far(tmp_path, fake_parsers):
+    result = EscalationRouter(ladder=["cheap", "ocr"], deadline=0.1).run("doc.pdf", str(tmp_path / "doc.json"))
+
+    # The OCR step starts before the deadline but no new page starts after it
+    assert result["escalation"]["deadline_hit"]
+    assert result["escalation"]["steps"][-1]["status"] == "timeout"
+    assert [page["parser"] for page in result["pages"]] == ["cheap", "ocr", "cheap", "cheap"]
+    assert result["escalation"]["below_threshold"] == [4]
+
+def test_page_texts_from_existing_parser_layouts():
+    assert page_texts_from_output({"text_by_page": {"0": "a", "1": "b"}}) == {1: "a", 2: "b"}
+    assert page_texts_from_output({"pages": [{"page_number": 2, "texts": [{"text": "x"}, {"text": "y"}]}]}) == {2: "x\ny"}
+    assert page_texts_from_output([{"page": 1, "results": [{"text": "ocr"}]}]) == {1: "ocr"}
+    assert page_texts_from_output([{"page_number": None, "content": {"k": "v"}}]) == {1: '{"k": "v"}'}
+    docling = {"texts": [{"text": "Title", "prov": [{"page_no": 3}]}], "pages": {"3": {}}}
+    assert page_texts_from_output(docling) == {3: "Title"}
+
+FAKE_CONDA = '''#!{python}
+"""Stands in for `conda run -n ENV python SCRIPT IN OUT`: logs the call, then behaves per FAKE_CONDA_MODE."""
+import json, os, subprocess, sys, time
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_CONDA_LOG"], "a") as f:
+    f.write(" ".join(args) + "\\n")
+if os.environ["FAKE_CONDA_MODE"] == "hang":
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    with open(os.environ["FAKE_CONDA_LOG"] + ".child", "w") as f:
+        f.write(str(child.pid))
+    time.sleep(60)
+with open(args[-1], "w") as f:
+    json.dump({{"pages": [{{"page_number": 1, "text": {good!r}}}]}}, f)
+'''
+
+@pytest.fixture
+def fake_conda(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    conda = bin_dir / "conda"
+    conda.write_text(FAKE_CONDA.format(python=sys.executable, good=GOOD_TEXT))
+    conda.chmod(0o755)
+    log = tmp_path / "conda.log"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_CONDA_LOG", str(log))
+    monkeypatch.setenv("FAKE_CONDA_MODE", "ok")
+    return log
+
+def test_subprocess_step_runs_in_the_registered_environment(tmp_path, fake_conda):
+    output = tmp_path / "doc.json"
+    result = EscalationRouter(ladder=["mupdf"], in_process=False).run("doc.pdf", str(output))
+
+    assert fake_conda.read_text().split() == [
+        "run", "-n", parsers.registry.PARSERS["mupdf"].env, "python", "parsers/mupdf_parser.py",
+        "doc.pdf", str(tmp_path / "doc.mupdf.json")]
+    assert parsers.registry.PARSERS["mupdf"].env == "pymupdf_env"
+    assert result["escalation"]["steps"][0]["status"] == "ok"
+    assert result["pages"][0]["parser"] == "mupdf"
+
+def test_subprocess_step_is_killed_at_the_deadline(tmp_path, fake_conda, monkeypatch):
+    monkeypatch.setenv("FAKE_CONDA_MODE", "hang")
+    start = time.monotonic()
+    result = EscalationRouter(ladder=["mupdf"], deadline=1.0, in_process=False).run("doc.pdf", str(tmp_path / "doc.json"))
+
+    assert time.monotonic() - start < 10
+    assert result["escalation"]["steps"][0]["status"] == "timeout"
+    child = int((tmp_path / "conda.log.child").read_text())
+    # The parser conda started is killed along with conda itself
+    for _ in range(50):
+        try:
+            os.kill(child, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("the parser process outlived its deadline")
+
+def test_pages_the_first_parser_skips_are_escalated(tmp_path, fake_parsers):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4" + b" /Type /Page" * 5)
+    result = EscalationRouter(ladder=["cheap", "ocr"], deadline=30).run(str(pdf), str(tmp_path / "doc.json"))
+
+    # The cheap parser returns pages 1-4 only; page 5 goes to OCR with the garbage pages
+    assert fake_parsers.calls == [("cheap", None), ("ocr", [2, 4, 5])]
+    assert [page["parser"] for page in result["pages"]] == ["cheap", "ocr", "cheap", "ocr", "ocr"]
+
+def test_docling_runs_as_a_script_under_the_deadline(tmp_path, fake_conda, install_fake_parsers):
+    fake = install_fake_parsers("fake_docling", FAKE_PARSERS.format(good=GOOD_TEXT), {"docling": "OcrParser"})
+    result = EscalationRouter(ladder=["docling"], deadline=30).run("doc.pdf", str(tmp_path / "doc.json"))
+
+    assert fake.calls == []
+    assert fake_conda.read_text().split()[:3] == ["run", "-n", "docling_env"]
+    assert result["pages"][0]["parser"] == "docling"
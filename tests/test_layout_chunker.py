@@ -0,0 +1,113 @@
+"""Test layout-aware chunking of parser output with coordinates."""
+
+import json
+
+from database import layout_chunker, text_chunker
+from tests.conftest import FakeTokenizer
+
+def box(x0, y0, x1, y1):
+    return {"x0": x0, "y0": y0, "x1": x1, "y1": y1}
+
+# PDFMiner coordinates grow upwards; two paragraphs on page 1, one on page 2.
+# No page sizes, as in output written before they were recorded
+PDFMINER_JSON = {
+    "filename": "report.pdf",
+    "pages": [
+        {"page_number": 1, "texts": [
+            {"text": "Quarterly results were strong\n", "bbox": box(72, 700, 400, 712)},
+            {"text": "across every region.\n", "bbox": box(72, 686, 300, 698)},
+            {"text": "Costs fell slightly.\n", "bbox": box(72, 600, 280, 612)},
+        ]},
+        {"page_number": 2, "texts": [
+            {"text": "Outlook remains positive.\n", "bbox": box(72, 720, 350, 732.25)},
+        ]},
+    ],
+}
+
+def test_regions_follow_vertical_gaps():
+    document = layout_chunker.layout_document(PDFMINER_JSON)
+    regions = [(page, layout_chunker.region_text(document, spans))
+               for page, spans in layout_chunker.iter_regions(document)]
+    assert regions == [
+        (1, "Quarterly results were strong\nacross every region."),
+        (1, "Costs fell slightly."),
+        (2, "Outlook remains positive."),
+    ]
+
+def test_chunks_carry_page_range_and_boxes():
+    document = layout_chunker.layout_document(PDFMINER_JSON)
+    chunks = list(layout_chunker.layout_chunks(document, max_tokens=9, tokenizer=FakeTokenizer("slow")))
+
+    assert [(c["page_start"], c["page_end"]) for c in chunks] == [(1, 1), (1, 2)]
+    assert chunks[0]["bboxes"] == "1:72,686,400,712"
+    assert chunks[1]["content"] == "Costs fell slightly.\n\nOutlook remains positive."
+    assert layout_chunker.parse_bboxes(chunks[1]["bboxes"]) == [
+        (1, (72.0, 600.0, 280.0, 612.0)), (2, (72.0, 720.0, 350.0, 732.2))]
+    assert {c["bbox_origin"] for c in chunks} == {"bottom-left"}
+
+def test_pdfminer_boxes_share_the_mupdf_origin():
+    """With the page height recorded, PDFMiner boxes are flipped to MuPDF's top-left origin."""
+    pdfminer = {"pages": [{"page_number": 1, "width": 612, "height": 792, "texts": [
+        {"text": "Quarterly results were strong\n", "bbox": box(72, 700, 400, 712)},
+    ]}]}
+    mupdf = {"page_count": 1, "text_with_coordinates": {"0": [
+        {"text": "Quarterly results were strong", "bbox": [72, 80, 400, 92], "font": "Helvetica", "size": 12.0},
+    ]}}
+    chunks = [list(layout_chunker.layout_chunks(layout_chunker.layout_document(data), max_tokens=50,
+                                                tokenizer=FakeTokenizer("slow")))
+              for data in (pdfminer, mupdf)]
+    assert chunks[0] == chunks[1]
+    assert chunks[0][0]["bboxes"] == "1:72,80,400,92"
+    assert "bbox_origin" not in chunks[0][0]
+
+def test_tables_inside_regions_become_table_chunks():
+    """Cells laid out in columns are tab-separated, so the table is found and chunked on its own."""
+    texts = [{"text": "Prices by part:\n", "bbox": box(72, 700, 300, 712)}]
+    for row, (name, price) in enumerate([("part", "price"), ("bolt", "0.10"), ("nut", "0.05"), ("washer", "0.02")]):
+        y = 686 - 14 * row
+        texts += [{"text": name, "bbox": box(72, y, 120, y + 12)}, {"text": price, "bbox": box(300, y, 330, y + 12)}]
+    document = layout_chunker.layout_document({"pages": [{"page_number": 1, "texts": texts}]})
+    chunks = list(layout_chunker.layout_chunks(document, max_tokens=50, tokenizer=FakeTokenizer("slow")))
+
+    assert [c["type"] for c in chunks] == ["text", "table"]
+    assert chunks[0]["content"] == "Prices by part:"
+    assert chunks[1]["content"] == "part\tprice\nbolt\t0.10\nnut\t0.05\nwasher\t0.02"
+    assert chunks[1]["bboxes"] == "1:72,644,330,698"
+
+def test_paddleocr_boxes_are_scaled_to_points():
+    pages = [{"page": 1, "dpi": 144, "results": [
+        {"box": [[144, 100], [400, 100], [400, 124], [144, 124]], "text": "Invoice", "score": 0.99},
+        {"box": [[144, 130], [300, 130], [300, 154], [144, 154]], "text": "Total 12", "score": 0.97},
+    ]}]
+    document = layout_chunker.layout_document(pages)
+    chunk, = layout_chunker.layout_chunks(document, max_tokens=50, tokenizer=FakeTokenizer("slow"))
+    assert chunk["content"] == "Invoice\nTotal 12"
+    assert chunk["bboxes"] == "1:72,50,200,77"
+    assert layout_chunker.layout_document({"pages": [{"page_number": 1, "text": "no boxes"}]}) is None
+
+def test_pipeline_stores_layout_metadata(tmp_path, monkeypatch, fake_transformers):
+    output = tmp_path / "report.json"
+    output.write_text(json.dumps(PDFMINER_JSON))
+    stored = []
+    store = type("Store", (), {"store_chunks": lambda self, chunks, metadata: stored.extend(metadata) or True})()
+    monkeypatch.setattr(text_chunker.VectorStoreFactory, "create", staticmethod(lambda config: store))
+    monkeypatch.setitem(text_chunker.CHUNK_CONFIG, "min_chunk_size", 0)
+
+    assert text_chunker.process_pdf_json(str(output), "report.pdf", {})
+    assert [(m["page_start"], m["page_end"]) for m in stored] == [(1, 2)]
+    assert stored[0]["bboxes"].count(";") == 2
+
+def test_short_layout_chunks_are_not_dropped(fake_transformers):
+    """Captions and signatures around a table keep their own chunks through the packer."""
+    texts = [{"text": "Prices by part:\n", "bbox": box(72, 700, 300, 712)}]
+    for row, (name, price) in enumerate([("part", "price"), ("bolt", "0.10"), ("nut", "0.05")]):
+        y = 686 - 14 * row
+        texts += [{"text": name, "bbox": box(72, y, 120, y + 12)}, {"text": price, "bbox": box(300, y, 330, y + 12)}]
+    texts.append({"text": "Signed by J. Doe\n", "bbox": box(72, 500, 200, 512)})
+    document = layout_chunker.layout_document({"pages": [{"page_number": 1, "texts": texts}]})
+    packer = text_chunker.ChunkPacker(max_tokens=50, min_tokens=20, tokenizer=FakeTokenizer("slow"))
+    chunks = list(packer.pack(layout_chunker.layout_chunks(document, max_tokens=50, tokenizer=FakeTokenizer("slow"))))
+
+    assert [(c["type"], c["content"].split("\n")[0]) for c in chunks] == [
+        ("text", "Prices by part:"), ("table", "part\tprice"), ("text", "Signed by J. Doe")]
+    assert packer.dropped == 0
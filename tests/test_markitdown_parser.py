@@ -0,0 +1,52 @@
+"""Test the streaming spreadsheet path of the MarkItDown parser."""
+
+import json
+
+import pytest
+
+from parsers.markitdown_parser import iter_markdown_blocks, write_markdown_blocks
+
+def write_csv(path, rows):
+    path.write_text("\n".join(",".join(row) for row in rows) + "\n", encoding="utf-8")
+
+def test_blocks_repeat_the_header_and_stay_within_budget(tmp_path):
+    csv_path = tmp_path / "sales.csv"
+    write_csv(csv_path, [["region", "month", "amount"], [",", ",", ""]] +
+              [[f"region-{i}", "2024-01", str(i * 10)] for i in range(200)])
+
+    blocks = list(iter_markdown_blocks(str(csv_path), max_chars=500))
+    assert len(blocks) > 5
+    assert all(len(block["markdown"]) <= 500 for block in blocks)
+    assert all(block["markdown"].startswith("## sales\n\n| region | month | amount |\n| --- | --- | --- |\n")
+               for block in blocks)
+    # Empty rows are skipped; row numbers refer to the spreadsheet and cover every data row
+    assert blocks[0]["first_row"] == 3
+    assert blocks[-1]["last_row"] == 202
+    assert sum(block["markdown"].count("| region-") for block in blocks) == 200
+    assert [b["first_row"] for b in blocks[1:]] == [a["last_row"] + 1 for a in blocks[:-1]]
+
+    assert len(list(iter_markdown_blocks(str(csv_path), max_rows=50))) == 4
+
+def test_cells_are_escaped_and_output_is_valid_json(tmp_path):
+    csv_path = tmp_path / "notes.csv"
+    csv_path.write_text('name,note\nA,"x | y\nsecond line"\n', encoding="utf-8")
+    output = tmp_path / "notes.json"
+
+    assert write_markdown_blocks(str(csv_path), str(output)) == 1
+    data = json.loads(output.read_text(encoding="utf-8"))
+    assert data["source"] == "notes.csv"
+    assert data["markdown_blocks"][0]["markdown"].endswith("| A | x \\| y<br>second line |")
+
+def test_workbooks_are_streamed_sheet_by_sheet(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Q1"
+    workbook.active.append(["item", "count"])
+    workbook.active.append(["bolts", 12.0])
+    second = workbook.create_sheet("Q2")
+    second.append(["item", "count"])
+    workbook.save(tmp_path / "stock.xlsx")
+
+    blocks = list(iter_markdown_blocks(str(tmp_path / "stock.xlsx")))
+    assert [block["sheet"] for block in blocks] == ["Q1", "Q2"]
+    assert blocks[0]["markdown"].endswith("| bolts | 12 |")
@@ -0,0 +1,81 @@
+"""Test the Mathpix batch client against the stub remote API server."""
+
+import os
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from urllib3.exceptions import ConnectTimeoutError, ProtocolError, ReadTimeoutError
+
+from parsers.mathpix import MathpixParser, MathpixError, UploadRetry, next_poll_interval
+from parsers.remote_stub_server import RemoteStubServer
+
+def test_poll_interval_follows_progress():
+    """The next poll lands halfway to the extrapolated finish, within the bounds."""
+    assert next_poll_interval({"percent_done": 50}, 10.0, 1.0, 1.0, 30.0) == 5.0
+    assert next_poll_interval({"percent_done": 1}, 10.0, 1.0, 1.0, 30.0) == 30.0
+    assert next_poll_interval({"status": "received"}, 10.0, 2.0, 1.0, 30.0) == 3.0
+
+def test_batch_conversion_writes_every_format(tmp_path, monkeypatch):
+    """All documents are converted concurrently and failures are reported per document."""
+    pdfs = []
+    for i in range(6):
+        path = tmp_path / f"paper{i}.pdf"
+        path.write_bytes(b"%PDF-1.4 FAIL" if i == 4 else f"%PDF-1.4 paper {i}".encode())
+        pdfs.append(str(path))
+    output_dir = str(tmp_path / "out")
+    monkeypatch.setenv("PARSER_CACHE_DIR", str(tmp_path / "cache"))
+
+    with RemoteStubServer(polls_until_done=3) as server:
+        client = MathpixParser("id", "key", base_url=f"{server.url}/v3/pdf", max_workers=4,
+                               min_poll_interval=0.01, max_poll_interval=0.05)
+        results = client.parse_batch(pdfs, output_dir)
+        client.close()
+
+    assert isinstance(results[pdfs[4]], MathpixError)
+    assert 1 < server.max_active_jobs <= 4
+    assert len(os.listdir(output_dir)) == 10
+    with open(os.path.join(output_dir, "paper0.lines.json"), encoding="utf-8") as f:
+        result = json.load(f)
+    assert result["pages"][0]["lines"][0]["text"].startswith("stub text for paper0.pdf")
+
+def test_uploads_are_only_retried_when_rate_limited():
+    """A 5xx after an upload may mean Mathpix already accepted it, so only 429 re-sends the POST."""
+    retry = UploadRetry(total=5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET", "POST"}))
+    assert retry.is_retry("POST", 429)
+    assert not retry.is_retry("POST", 503)
+    assert retry.is_retry("GET", 503)
+    assert isinstance(retry.new(total=4), UploadRetry)
+
+def test_uploads_are_not_retried_after_read_errors():
+    """A timeout while reading the upload response is raised; a failed connect is retried."""
+    retry = UploadRetry(total=5, allowed_methods=frozenset({"GET", "POST"}))
+    url = "/v3/pdf"
+    with pytest.raises(ReadTimeoutError):
+        retry.increment("POST", url, error=ReadTimeoutError(None, url, "Read timed out."))
+    with pytest.raises(ProtocolError):
+        retry.increment("POST", url, error=ProtocolError("Connection aborted."))
+    assert retry.increment("GET", url, error=ReadTimeoutError(None, url, "Read timed out.")).total == 4
+    assert retry.increment("POST", url, error=ConnectTimeoutError("Connection timed out.")).total == 4
+
+def test_binary_formats_are_cached(tmp_path, monkeypatch):
+    """Binary results (docx, tex.zip) round-trip through the result cache unchanged."""
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF-1.4 paper")
+    monkeypatch.setenv("PARSER_CACHE_DIR", str(tmp_path / "cache"))
+
+    with RemoteStubServer(polls_until_done=1) as server:
+        client = MathpixParser("id", "key", base_url=f"{server.url}/v3/pdf", formats=("lines.json", "docx"),
+                               min_poll_interval=0.01, max_poll_interval=0.05)
+        first = client.parse_batch([str(pdf)], str(tmp_path / "first"))
+        jobs = len(server.jobs)
+        second = client.parse_batch([str(pdf)], str(tmp_path / "second"))
+        client.close()
+
+    assert not any(isinstance(result, Exception) for result in (first[str(pdf)], second[str(pdf)]))
+    assert len(server.jobs) == jobs == 1
+    docx = (tmp_path / "first" / "paper.docx").read_bytes()
+    assert docx.startswith(b"PK\x03\x04")
+    assert (tmp_path / "second" / "paper.docx").read_bytes() == docx
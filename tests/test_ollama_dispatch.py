@@ -0,0 +1,34 @@
+"""Test bounded-concurrency page dispatch against the stub Ollama server."""
+
+from parsers.ollama_dispatch import OllamaPageDispatcher
+from parsers.ollama_stub_server import OllamaStubServer, stub_markdown
+
+def test_dispatch_keeps_page_order_and_in_flight_limit():
+    """Pages finishing out of order come back in page order, never above the limit."""
+    images = [f"page {i}".encode() for i in range(24)]
+
+    with OllamaStubServer(max_delay=0.05) as server:
+        dispatcher = OllamaPageDispatcher("llava:13b", "to markdown", host=server.url, max_in_flight=4)
+        pages = dispatcher.run(images)
+
+    assert pages == [stub_markdown(image) for image in images]
+    assert not dispatcher.failed_pages
+    assert server.requests == len(images)
+    assert 1 < server.max_in_flight <= 4
+
+def test_dispatch_retries_failed_requests():
+    """Failed requests are retried; a page that keeps failing is reported, not fatal."""
+    images = [f"page {i}".encode() for i in range(3)]
+
+    with OllamaStubServer(max_delay=0.0, fail_first=2) as server:
+        dispatcher = OllamaPageDispatcher("llava:13b", "to markdown", host=server.url,
+                                          max_in_flight=1, retries=2, retry_backoff=0.01)
+        pages = dispatcher.run(images)
+    assert pages == [stub_markdown(image) for image in images]
+    assert server.requests == len(images) + 2
+
+    with OllamaStubServer(max_delay=0.0, fail_first=10) as server:
+        dispatcher = OllamaPageDispatcher("llava:13b", "to markdown", host=server.url,
+                                          max_in_flight=1, retries=1, retry_backoff=0.01)
+        pages = dispatcher.run(images)
+    assert pages[0] == "" and 0 in dispatcher.failed_pages
@@ -0,0 +1,57 @@
+"""Test the shared rendered-page cache."""
+
+import os
+
+from parsers.page_cache import SUFFIX, PageRasterCache
+
+class CountingRenderer:
+    """Fake rasterizer: a solid page whose pixel value encodes page and dpi."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pdf_path, page_number, dpi, colorspace):
+        self.calls.append((page_number, dpi, colorspace))
+        channels = 1 if colorspace == "L" else 3
+        height, width = dpi // 10, dpi // 20
+        return bytes([page_number + dpi % 7]) * (height * width * channels), height, width, channels
+
+def test_pages_are_rendered_once_across_parsers(tmp_path):
+    """A second cache on the same directory (another parser, or a re-run) never re-renders."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    renderer = CountingRenderer()
+    first = PageRasterCache(cache_dir=str(tmp_path / "cache"), renderer=renderer)
+
+    raster = first.render(str(pdf), 2, dpi=300)
+    assert (raster.height, raster.width, raster.channels) == (30, 15, 3)
+    assert bytes(raster.buffer) == bytes([2 + 300 % 7]) * raster.nbytes
+
+    second = PageRasterCache(cache_dir=str(tmp_path / "cache"), renderer=renderer)
+    assert bytes(second.render(str(pdf), 2, dpi=300).buffer) == bytes(raster.buffer)
+    assert renderer.calls == [(2, 300, "RGB")]
+
+    # Any change of page, dpi or colorspace is a different entry
+    second.render(str(pdf), 2, dpi=150)
+    gray = second.render(str(pdf), 2, dpi=300, colorspace="L")
+    assert gray.channels == 1
+    assert len(renderer.calls) == 3
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    """The cache stays within its byte budget, keeping the pages read most recently."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    renderer = CountingRenderer()
+    cache_dir = tmp_path / "cache"
+    cache = PageRasterCache(cache_dir=str(cache_dir), max_bytes=2 * (16 + 30 * 15 * 3), renderer=renderer)
+
+    cache.render(str(pdf), 1)
+    cache.render(str(pdf), 2)
+    os.utime(cache._entry_path(str(pdf), 2, 300, "RGB"), (1, 1))  # page 2 is now the oldest
+    cache.render(str(pdf), 1)
+    cache.render(str(pdf), 3)
+    assert len([name for name in os.listdir(cache_dir) if name.endswith(SUFFIX)]) == 2
+
+    cache.render(str(pdf), 1)
+    cache.render(str(pdf), 2)
+    assert [page for page, _, _ in renderer.calls] == [1, 2, 3, 2]
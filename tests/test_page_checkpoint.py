@@ -0,0 +1,19 @@
+"""Test the per-page checkpoint sidecar files."""
+
+from parsers.page_checkpoint import PageCheckpoint
+
+def test_pages_after_a_torn_line_are_kept(tmp_path):
+    """A crash mid-write must not swallow the pages saved by the next run."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    checkpoint = PageCheckpoint(str(pdf), "nougat-base-md", str(tmp_path / "ckpt"))
+    checkpoint.save(0, {"text": "first"})
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"page": 1, "result": {"te')
+
+    resumed = PageCheckpoint(str(pdf), "nougat-base-md", str(tmp_path / "ckpt"))
+    assert resumed.pages == {0: {"text": "first"}}
+    resumed.save(1, {"text": "second"})
+
+    again = PageCheckpoint(str(pdf), "nougat-base-md", str(tmp_path / "ckpt"))
+    assert again.pages == {0: {"text": "first"}, 1: {"text": "second"}}
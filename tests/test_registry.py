@@ -0,0 +1,71 @@
+"""Test the in-process parser registry."""
+
+import os
+import glob
+
+import pytest
+
+from parsers import registry
+from parsers.base import BaseParser
+
+FAKE_PARSER = '''
+from parsers.base import BaseParser
+
+class FakeParser(BaseParser):
+    name = "fake"
+    loads = 0
+
+    def __init__(self, prefix="page"):
+        super().__init__()
+        self.prefix = prefix
+
+    def load(self):
+        FakeParser.loads += 1
+
+    def parse(self, pdf_path, pages=None):
+        self.ensure_loaded()
+        for page_number in pages or (1, 2, 3):
+            yield {"page_number": page_number, "text": f"{self.prefix} {page_number}"}
+'''
+
+@pytest.fixture
+def fake_registry(install_fake_parsers, monkeypatch):
+    install_fake_parsers("fake_parser", FAKE_PARSER, {"fake": "FakeParser"})
+    monkeypatch.setitem(registry.PARSERS, "broken", registry.ParserSpec("no_such_parser_module", "Nope", "broken_env", "nope.py"))
+
+def test_parsers_load_models_lazily_and_stream_pages(fake_registry):
+    """Creating a parser is cheap; the model loads once, on the first page."""
+    parser = registry.get_parser("fake", prefix="p")
+    assert isinstance(parser, BaseParser)
+    assert type(parser).loads == 0
+
+    pages = parser.parse("doc.pdf", pages=[2, 3])
+    assert type(parser).loads == 0
+    assert next(pages) == {"page_number": 2, "text": "p 2"}
+    assert type(parser).loads == 1
+
+    assert parser.parse_all("doc.pdf") == {
+        "parser": "fake",
+        "pages": [{"page_number": n, "text": f"p {n}"} for n in (1, 2, 3)],
+    }
+    assert type(parser).loads == 1
+
+def test_missing_dependencies_are_reported(fake_registry):
+    """Parsers whose imports fail are unavailable rather than crashing the caller."""
+    assert registry.is_available("fake")
+    assert not registry.is_available("broken")
+    with pytest.raises(registry.ParserUnavailable, match="broken_env"):
+        registry.get_parser("broken")
+    with pytest.raises(ValueError):
+        registry.get_parser("unknown")
+
+def test_subprocess_environments_exist():
+    """Every registered conda environment is created by one of the parsers' environment files."""
+    env_files = glob.glob(os.path.join(registry.PARSERS_DIR, "*_env", "*.yml"))
+    defined = set()
+    for path in env_files:
+        with open(path, encoding="utf-8") as f:
+            defined.update(line.split(":", 1)[1].strip() for line in f if line.startswith("name:"))
+    for name, spec in registry.PARSERS.items():
+        assert (spec.env is None) == (spec.script is None), name
+        assert spec.env is None or spec.env in defined, f"{name}: no environment file creates {spec.env}"
@@ -0,0 +1,54 @@
+"""Test concurrent remote parsing jobs against the stub remote API server."""
+
+import os
+import json
+import asyncio
+
+from parsers.remote_jobs import LlamaParseProvider, LLMWhispererProvider, RemoteJobManager, JobFailed
+from parsers.remote_stub_server import RemoteStubServer
+
+def _write_pdfs(directory, count, failing=()):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 FAIL" if i in failing else f"%PDF-1.4 document {i}".encode())
+        paths.append(path)
+    return paths
+
+def test_llamaparse_jobs_run_concurrently_within_limits(tmp_path, monkeypatch):
+    """All jobs complete, results are written per document and the job limit holds."""
+    pdfs = _write_pdfs(str(tmp_path), 8)
+    output_dir = str(tmp_path / "out")
+    monkeypatch.setenv("PARSER_CACHE_DIR", str(tmp_path / "cache"))
+
+    with RemoteStubServer(polls_until_done=3) as server:
+        provider = LlamaParseProvider("test-key", base_url=f"{server.url}/api/parsing")
+        manager = RemoteJobManager(provider, output_dir, max_concurrent_jobs=3, requests_per_second=200,
+                                   poll_initial=0.01, poll_max=0.05)
+        results = asyncio.run(manager.run(pdfs))
+
+    assert all(not isinstance(r, Exception) for r in results.values())
+    assert 1 < server.max_active_jobs <= 3
+    with open(os.path.join(output_dir, "doc5.json"), encoding="utf-8") as f:
+        pages = json.load(f)
+    assert pages == [{"page_number": 1, "content": "# doc5.pdf"}]
+
+def test_llmwhisperer_rate_limit_and_failures(tmp_path, monkeypatch):
+    """429 answers are retried transparently and a failed job does not stop the others."""
+    pdfs = _write_pdfs(str(tmp_path), 5, failing={2})
+    output_dir = str(tmp_path / "out")
+    monkeypatch.setenv("PARSER_CACHE_DIR", str(tmp_path / "cache"))
+
+    with RemoteStubServer(polls_until_done=2, rate_limit=10) as server:
+        provider = LLMWhispererProvider("test-key", base_url=f"{server.url}/api/v2")
+        # Client deliberately faster than the server allows, to provoke 429s
+        manager = RemoteJobManager(provider, output_dir, max_concurrent_jobs=5, requests_per_second=50,
+                                   poll_initial=0.01, poll_max=0.05)
+        results = asyncio.run(manager.run(pdfs))
+
+    assert server.rate_limited > 0
+    assert isinstance(results[pdfs[2]], JobFailed)
+    done = [pdf for pdf, r in results.items() if not isinstance(r, Exception)]
+    assert len(done) == 4
+    assert sorted(os.listdir(output_dir)) == ["doc0.json", "doc1.json", "doc3.json", "doc4.json"]
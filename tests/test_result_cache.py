@@ -0,0 +1,105 @@
+"""Test the remote parser result cache."""
+
+import os
+import sys
+import time
+import asyncio
+import subprocess
+
+import pytest
+
+from parsers import result_cache
+from parsers.result_cache import ResultCache, load_stats
+from parsers.remote_jobs import LLMWhispererProvider, LlamaParseProvider, RemoteJobManager
+from parsers.remote_stub_server import RemoteStubServer
+
+def _write_pdf(path, text):
+    path.write_bytes(f"%PDF-1.4 /Type /Page {text}".encode())
+    return str(path)
+
+def test_hits_depend_on_content_and_options(tmp_path):
+    """A result is reused for the same content and options only, and savings are tracked."""
+    cache_dir = str(tmp_path / "cache")
+    pdf = _write_pdf(tmp_path / "a.pdf", "alpha")
+    cache = ResultCache("llmwhisperer", {"mode": "form"}, cache_dir=cache_dir, cost_per_page=0.5)
+
+    assert cache.get(pdf) is None
+    cache.put(pdf, {"text": "alpha"}, elapsed=12.0, pages=4)
+    assert cache.get(pdf) == {"text": "alpha"}
+
+    # Same bytes under another name hit; other options miss
+    copy = _write_pdf(tmp_path / "copy.pdf", "alpha")
+    assert cache.get(copy) == {"text": "alpha"}
+    assert ResultCache("llmwhisperer", {"mode": "high_quality"}, cache_dir=cache_dir).get(pdf) is None
+
+    stats = load_stats(cache_dir)["llmwhisperer"]
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["saved_cost_usd"] == 4.0
+    assert stats["saved_seconds"] == 24.0
+
+def test_entries_expire_by_ttl_and_size(tmp_path):
+    """Old entries expire and the least recently used entries are evicted past the size budget."""
+    cache_dir = str(tmp_path / "cache")
+    pdfs = [_write_pdf(tmp_path / f"{i}.pdf", str(i)) for i in range(3)]
+
+    expiring = ResultCache("mathpix", cache_dir=cache_dir, ttl=0.0)
+    expiring.put(pdfs[0], "x", elapsed=1.0, pages=1)
+    time.sleep(0.01)
+    assert expiring.get(pdfs[0]) is None
+
+    cache = ResultCache("mathpix", cache_dir=cache_dir, max_bytes=1500)
+    cache.put(pdfs[0], "a" * 500, elapsed=1.0, pages=1)
+    cache.put(pdfs[1], "b" * 500, elapsed=1.0, pages=1)
+    past = time.time() - 60
+    os.utime(cache._entry_path(pdfs[1]), (past, past))
+    cache.put(pdfs[2], "c" * 500, elapsed=1.0, pages=1)
+    assert cache.get(pdfs[1]) is None
+    assert cache.get(pdfs[0]) == "a" * 500
+    assert cache.get(pdfs[2]) == "c" * 500
+
+def test_job_manager_skips_cached_documents(tmp_path, monkeypatch):
+    """A second batch run over unchanged PDFs sends no requests."""
+    monkeypatch.setenv("PARSER_CACHE_DIR", str(tmp_path / "cache"))
+    pdfs = [_write_pdf(tmp_path / f"doc{i}.pdf", str(i)) for i in range(3)]
+
+    with RemoteStubServer(polls_until_done=1) as server:
+        provider = LlamaParseProvider("test-key", base_url=f"{server.url}/api/parsing")
+        manager = RemoteJobManager(provider, str(tmp_path / "out"), poll_initial=0.01, poll_max=0.05)
+        asyncio.run(manager.run(pdfs))
+        first_run_requests = server.requests
+        asyncio.run(manager.run(pdfs))
+    assert first_run_requests > 0
+    assert server.requests == first_run_requests
+    assert len(os.listdir(tmp_path / "out")) == 3
+
+def test_rest_and_sdk_results_have_separate_entries(tmp_path):
+    """The job manager's raw REST body is never served to the SDK parser, or the other way round."""
+    pdf = _write_pdf(tmp_path / "a.pdf", "alpha")
+    cache_dir = str(tmp_path / "cache")
+    sdk = ResultCache("llmwhisperer", {"mode": "form", "output_mode": "layout_preserving", "client": "sdk"}, cache_dir=cache_dir)
+    rest = ResultCache("llmwhisperer", LLMWhispererProvider("key").cache_options(), cache_dir=cache_dir)
+    assert sdk.key(pdf) != rest.key(pdf)
+
+def test_clear_keeps_statistics(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    pdf = _write_pdf(tmp_path / "a.pdf", "alpha")
+    cache = ResultCache("mathpix", cache_dir=cache_dir)
+    cache.put(pdf, "x", elapsed=1.0, pages=1)
+    assert cache.get(pdf) == "x"
+
+    monkeypatch.setattr(sys, "argv", ["result_cache.py", "clear", "--cache-dir", cache_dir])
+    result_cache.main()
+    assert cache.get(pdf) is None
+    assert load_stats(cache_dir)["mathpix"]["hits"] == 1
+
+@pytest.mark.skipif(result_cache.fcntl is None, reason="statistics are only locked across processes with fcntl")
+def test_statistics_count_lookups_from_every_process(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    pdf = _write_pdf(tmp_path / "a.pdf", "alpha")
+    script = ("import sys; from parsers.result_cache import ResultCache; "
+              "cache = ResultCache('mathpix', cache_dir=sys.argv[1]); "
+              "[cache.get(sys.argv[2]) for _ in range(25)]")
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.dirname(result_cache.__file__))}
+    workers = [subprocess.Popen([sys.executable, "-c", script, cache_dir, pdf], env=env) for _ in range(4)]
+    assert [worker.wait() for worker in workers] == [0] * 4
+    assert load_stats(cache_dir)["mathpix"]["misses"] == 100
@@ -0,0 +1,50 @@
+"""Test semantic chunking and its embedding cache."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from database import semantic_chunker
+
+TOPICS = {"cat": [1.0, 0.0, 0.0], "rain": [0.0, 1.0, 0.0], "bond": [0.0, 0.0, 1.0]}
+
+class FakeModel:
+    """Embeds a sentence as the unit vector of the topic word it contains."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        self.encoded.append(len(sentences))
+        return np.array([next(v for word, v in TOPICS.items() if word in s) for s in sentences], dtype=np.float32)
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(semantic_chunker, "_load_model", lambda model_name: model)
+    return model
+
+def topic_text():
+    sentences = [f"The cat sat {i}." for i in range(6)] + [f"The rain fell {i}." for i in range(6)] + \
+                [f"A bond yield {i}." for i in range(6)]
+    return " ".join(sentences)
+
+def test_distances_peak_where_the_topic_changes():
+    embeddings = np.array([TOPICS["cat"]] * 5 + [TOPICS["rain"]] * 5, dtype=np.float32)
+    distances = semantic_chunker.boundary_distances(embeddings, window=2)
+    assert distances.shape == (9,)
+    assert int(np.argmax(distances)) == 4
+    assert distances[0] == pytest.approx(0.0)
+
+def test_chunks_follow_topics_and_reuse_cached_embeddings(tmp_path, fake_model, fake_transformers):
+    cache = semantic_chunker.EmbeddingCache(str(tmp_path))
+    chunks = semantic_chunker.semantic_chunk_text(topic_text(), max_tokens=100, window=2, percentile=80, cache=cache)
+    assert [chunk.split()[1] for chunk in chunks] == ["cat", "rain", "bond"]
+
+    # The token budget still applies inside a topic
+    small = semantic_chunker.semantic_chunk_text(topic_text(), max_tokens=8, window=2, percentile=80, cache=cache)
+    assert all(len(chunk.split()) <= 8 for chunk in small)
+    assert len(small) == 9
+
+    assert fake_model.encoded == [18]
+    assert (cache.hits, cache.misses) == (1, 1)
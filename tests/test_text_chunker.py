@@ -0,0 +1,300 @@
+"""Test the text chunker."""
+
+import json
+import re
+import sys
+
+import pytest
+
+from database import text_chunker
+from tests.conftest import FakeTokenizer
+
+def test_tokenizers_load_lazily_once_per_model(fake_transformers):
+    """Importing the chunker loads nothing; each model's tokenizer loads on first use only."""
+    assert fake_transformers == []
+    default = text_chunker.get_tokenizer()
+    assert default.model_name == text_chunker.COMMON_CONFIG["embedding_model"]
+    assert text_chunker.get_tokenizer(default.model_name) is default
+    text_chunker.hybrid_chunk_text("one paragraph\n\nanother paragraph", model_name="other/model")
+    text_chunker.hybrid_chunk_text("more text")
+    assert fake_transformers == [default.model_name, "other/model"]
+
+class FakeFastTokenizer(FakeTokenizer):
+    """Whitespace tokenizer with the batched, offset-mapping call of a fast tokenizer."""
+
+    is_fast = True
+
+    def __init__(self):
+        super().__init__("fake-fast")
+        self.batch_calls = 0
+
+    def __call__(self, texts, add_special_tokens=True, return_offsets_mapping=False, **kwargs):
+        self.batch_calls += 1
+        spans = [[m.span() for m in re.finditer(r"\S+", text)] for text in texts]
+        return {
+            "input_ids": [[text[a:b] for a, b in text_spans] for text, text_spans in zip(texts, spans)],
+            "offset_mapping": spans,
+        }
+
+def test_batched_encoding_matches_the_one_by_one_path():
+    """Three batched tokenizer calls cover the document, with the same chunks as per-text encoding."""
+    words = " ".join(f"word{i}" for i in range(120))
+    text = "\n\n".join([
+        "A short opening paragraph.",
+        f"First sentence here. {words}. A closing sentence!",
+        "| item | total |\n| --- | --- |\n| bolts | 12 |",
+        "Another short paragraph.",
+    ])
+    fast = FakeFastTokenizer()
+    batched = text_chunker._hybrid_chunks(text, 50, 10, fast)
+    one_by_one = text_chunker._hybrid_chunks(text, 50, 10, FakeTokenizer("slow"))
+
+    assert batched == one_by_one
+    # Paragraphs, sentences of long paragraphs, and table rows
+    assert fast.batch_calls == 3
+    assert [chunk["type"] for chunk in batched].count("table") == 1
+    windows = [c["content"] for c in batched if c["content"].startswith("word")]
+    assert [len(w.split()) for w in windows] == [50, 50, 40]
+    assert windows[1].split()[0] == "word40"
+
+def test_recursive_splitter_measures_chunks_in_tokens():
+    """Chunks fill the token budget (not a character count) and break at the coarsest separator."""
+    paragraphs = [" ".join(f"p{p}w{i}." for i in range(30)) for p in range(6)]
+    text = "\n\n".join(paragraphs)
+    fast = FakeFastTokenizer()
+    chunks = text_chunker.RecursiveTokenSplitter(70, 10, fast).split_text(text)
+
+    assert all(len(chunk.split()) <= 70 for chunk in chunks)
+    # Two 30-token paragraphs fit a chunk; no paragraph is cut
+    assert chunks[0] == "\n\n".join(paragraphs[:2])
+    assert len(chunks) == 3
+    assert "langchain" not in sys.modules
+
+def test_recursive_splitter_falls_back_to_words_and_token_windows():
+    fast = FakeFastTokenizer()
+    splitter = text_chunker.RecursiveTokenSplitter(20, 5, fast)
+    words = " ".join(f"w{i}" for i in range(50))
+    chunks = splitter.split_text(words)
+    assert all(len(chunk.split()) <= 20 for chunk in chunks)
+    assert chunks[0].split()[0] == "w0" and chunks[-1].split()[-1] == "w49"
+    # Consecutive chunks share at most `overlap` words
+    assert 0 < len(set(chunks[0].split()) & set(chunks[1].split())) <= 5
+
+    # All words are counted in one batch, and only once per splitter
+    assert fast.batch_calls == 1
+    assert splitter.split_text(words) == chunks
+    assert fast.batch_calls == 1
+
+    with pytest.raises(ValueError):
+        text_chunker.RecursiveTokenSplitter(10, 10, fast)
+
+class RecordingStore:
+    def __init__(self):
+        self.batches = []
+
+    def store_chunks(self, chunks, metadata):
+        self.batches.append((chunks, metadata))
+        return True
+
+def test_chunks_are_stored_in_fixed_size_batches(tmp_path, monkeypatch, fake_transformers):
+    """Pages are chunked as a stream; each batch is embedded and stored on its own."""
+    # Paragraphs of 300 tokens: too big for the packer to merge
+    pages = [{"page_number": n, "text": "\n\n".join(f"Page {n} paragraph {i}. " + "word " * 296 for i in range(5))}
+             for n in range(1, 8)]
+    output = tmp_path / "doc.json"
+    output.write_text(json.dumps({"pages": pages}))
+    store = RecordingStore()
+    monkeypatch.setattr(text_chunker.VectorStoreFactory, "create", staticmethod(lambda config: store))
+
+    assert text_chunker.process_pdf_json(str(output), "doc.pdf", {}, batch_size=8)
+    assert [len(chunks) for chunks, _ in store.batches] == [8, 8, 8, 8, 3]
+    stored = [chunk for chunks, _ in store.batches for chunk in chunks]
+    full_text = text_chunker.extract_text_from_json({"pages": pages})
+    assert stored == [c["content"] for c in text_chunker.hybrid_chunk_text(full_text)]
+    assert [m["chunk_index"] for _, metadata in store.batches for m in metadata] == list(range(35))
+
+def test_batches_are_grouped_lazily():
+    consumed = []
+
+    def chunks():
+        for i in range(10):
+            consumed.append(i)
+            yield i
+
+    batches = text_chunker.iter_batches(chunks(), 4)
+    assert next(batches) == [0, 1, 2, 3]
+    assert consumed == [0, 1, 2, 3]
+    assert list(batches) == [[4, 5, 6, 7], [8, 9]]
+
+DOCLING_JSON = {
+    "schema_name": "DoclingDocument",
+    "body": {"self_ref": "#/body", "children": [
+        {"$ref": "#/texts/0"}, {"$ref": "#/groups/0"}, {"$ref": "#/tables/0"}, {"$ref": "#/texts/3"},
+    ]},
+    "groups": [{"self_ref": "#/groups/0", "label": "list", "children": [{"$ref": "#/texts/1"}, {"$ref": "#/texts/2"}]}],
+    "texts": [
+        {"self_ref": "#/texts/0", "label": "section_header", "text": "Results", "prov": [{"page_no": 1}]},
+        {"self_ref": "#/texts/1", "label": "list_item", "text": "first point", "prov": [{"page_no": 1}]},
+        {"self_ref": "#/texts/2", "label": "list_item", "text": "second point", "prov": [{"page_no": 2}]},
+        {"self_ref": "#/texts/3", "label": "text", "text": "Closing remarks.", "prov": [{"page_no": 2}],
+         "children": [{"$ref": "#/texts/1"}]},
+    ],
+    "tables": [{"self_ref": "#/tables/0", "label": "table", "prov": [{"page_no": 2}], "data": {
+        "num_rows": 2, "num_cols": 2, "table_cells": [
+            {"text": "name", "start_row_offset_idx": 0, "end_row_offset_idx": 1, "start_col_offset_idx": 0, "end_col_offset_idx": 1},
+            {"text": "a|b", "start_row_offset_idx": 0, "end_row_offset_idx": 1, "start_col_offset_idx": 1, "end_col_offset_idx": 2},
+            {"text": "total", "start_row_offset_idx": 1, "end_row_offset_idx": 2, "start_col_offset_idx": 0, "end_col_offset_idx": 2},
+        ]}}],
+}
+
+def test_docling_body_is_walked_once_in_reading_order():
+    elements = list(text_chunker.iter_docling_elements(DOCLING_JSON))
+    assert [(e["label"], e["page"]) for e in elements] == [
+        ("section_header", 1), ("list_item", 1), ("list_item", 2), ("table", 2), ("text", 2)]
+    assert elements[3]["type"] == "table"
+    assert elements[3]["text"] == "| name | a\\|b |\n| --- | --- |\n| total | total |"
+    # Each text once, in body order (grouped list items included)
+    assert text_chunker.extract_text_from_json(DOCLING_JSON).split("\n\n") == [
+        "Results", "first point", "second point", elements[3]["text"], "Closing remarks."]
+
+def test_docling_chunks_keep_page_and_label(tmp_path, fake_transformers):
+    output = tmp_path / "docling.json"
+    output.write_text(json.dumps(DOCLING_JSON))
+    chunks = list(text_chunker.iter_chunks(str(output)))
+    assert [(c["type"], c["label"], c["page"]) for c in chunks] == [
+        ("text", "section_header", 1), ("text", "list_item", 1), ("text", "list_item", 2),
+        ("table", "table", 2), ("text", "text", 2)]
+
+def test_long_docling_tables_are_split_between_rows(tmp_path, fake_transformers):
+    cells = [{"text": text, "start_row_offset_idx": row, "end_row_offset_idx": row + 1,
+              "start_col_offset_idx": col, "end_col_offset_idx": col + 1}
+             for row, values in enumerate([("item", "price")] + [(f"part {i}", f"{i}.00") for i in range(6)])
+             for col, text in enumerate(values)]
+    document = {
+        "schema_name": "DoclingDocument",
+        "body": {"self_ref": "#/body", "children": [{"$ref": "#/tables/0"}]},
+        "texts": [],
+        "tables": [{"self_ref": "#/tables/0", "label": "table", "prov": [{"page_no": 3}],
+                    "data": {"num_rows": 7, "num_cols": 2, "table_cells": cells}}],
+    }
+    output = tmp_path / "docling.json"
+    output.write_text(json.dumps(document))
+    chunks = list(text_chunker.iter_chunks(str(output), max_tokens=20))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert (chunk["type"], chunk["page"], chunk["label"]) == ("table", 3, "table")
+        assert chunk["content"].startswith("| item | price |\n| --- | --- |\n| part ")
+    assert sum(chunk["content"].count("| part ") for chunk in chunks) == 6
+
+def test_table_rows_are_grouped_into_one_block():
+    """Consecutive rows form one table; prose that mentions tables or rows stays text."""
+    text = "\n".join([
+        "The table below lists each row of the survey.",
+        "| region | sales |",
+        "| --- | --- |",
+        "| north | 10 |",
+        "| south | 12 |",
+        "",
+        "+------+-----+",
+        "| a    | b   |",
+        "+------+-----+",
+        "| 1    | 2   |",
+        "+------+-----+",
+        "",
+        "name      qty   price",
+        "bolt     12     0.10",
+        "nut      40     0.05",
+        "",
+        "Sentence one.  Sentence two follows a double space.",
+        "Another line.  Also spaced twice after the stop.",
+        "Last line of prose here.  Ends the paragraph now.",
+    ])
+    chunks = text_chunker._hybrid_chunks(text, 100, 10, FakeTokenizer("slow"))
+    assert [c["type"] for c in chunks] == ["text", "table", "table", "table", "text"]
+    assert chunks[1]["content"].count("\n") == 3
+    assert chunks[2]["content"].startswith("+------") and chunks[2]["content"].endswith("+-----+")
+    assert text_chunker.is_table_block("| a | b |\n| 1 | 2 |")
+    assert not text_chunker.is_table_block("Row 3 of the table")
+
+def test_long_tables_are_split_with_the_header_repeated():
+    rows = [f"| item {i} | {i * 3} |" for i in range(40)]
+    text = "\n".join(["| name | amount |", "| --- | --- |"] + rows)
+    chunks = text_chunker._hybrid_chunks(text, 50, 10, FakeTokenizer("slow"))
+
+    assert len(chunks) > 1 and all(c["type"] == "table" for c in chunks)
+    assert all(c["content"].startswith("| name | amount |\n| --- | --- |\n") for c in chunks)
+    assert all(len(c["content"].split()) <= 50 for c in chunks)
+    assert [line for c in chunks for line in c["content"].split("\n")[2:]] == rows
+
+def test_dense_spreadsheet_blocks_are_split_to_the_token_budget(tmp_path, fake_transformers):
+    rows = [f"| part {i} | " + "x " * 12 + "|" for i in range(6)]
+    blocks = [
+        {"sheet": "Parts", "first_row": 2, "last_row": 3, "markdown": "## Parts\n\n| name | note |\n| --- | --- |\n| a | b |"},
+        {"sheet": "Parts", "first_row": 4, "last_row": 9, "markdown": "\n".join(["## Parts", "", "| name | note |", "| --- | --- |"] + rows)},
+    ]
+    output = tmp_path / "parts.json"
+    output.write_text(json.dumps({"source": "parts.xlsx", "markdown_blocks": blocks}))
+    chunks = list(text_chunker.iter_chunks(str(output), max_tokens=50))
+
+    assert chunks[0] == {"type": "table", "content": blocks[0]["markdown"], "sheet": "Parts", "first_row": 2, "last_row": 3}
+    assert len(chunks) > 2
+    for chunk in chunks[1:]:
+        assert chunk["content"].startswith("## Parts\n\n| name | note |\n| --- | --- |\n| part ")
+        assert len(chunk["content"].split()) <= 50
+        assert (chunk["sheet"], chunk["first_row"], chunk["last_row"]) == ("Parts", 4, 9)
+    assert [line for c in chunks[1:] for line in c["content"].split("\n")[4:]] == rows
+
+def test_small_chunks_are_packed_within_sections(fake_transformers):
+    chunks = [
+        {"type": "text", "content": "1. Introduction"},
+        {"type": "text", "content": "first short paragraph " * 3},
+        {"type": "text", "content": "second short paragraph " * 3},
+        {"type": "text", "content": "long paragraph " * 20},
+        {"type": "table", "content": "| a | b |\n| 1 | 2 |"},
+        {"type": "table", "content": "| c | d |\n| 3 | 4 |"},
+        {"type": "text", "content": "2. Methods"},
+        {"type": "text", "content": "method text " * 10},
+        {"type": "text", "content": "42"},
+        {"type": "table", "content": "| x |\n| 5 |"},
+        {"type": "text", "content": "tail"},
+    ]
+    packer = text_chunker.ChunkPacker(max_tokens=40, min_tokens=5)
+    packed = list(packer.pack(chunks))
+
+    assert [(c["type"], len(c["content"].split())) for c in packed] == [
+        ("text", 20), ("text", 40), ("table", 20), ("text", 23), ("table", 6)]
+    assert packed[0]["content"].startswith("1. Introduction\n\nfirst short")
+    assert packed[3]["content"].startswith("2. Methods")
+    # "tail" is under min_tokens on its own and is dropped
+    assert (packer.chunks_in, packer.chunks_out, packer.dropped) == (11, 5, 1)
+
+def test_packed_docling_chunks_record_their_page_range():
+    packer = text_chunker.ChunkPacker(max_tokens=100, min_tokens=0, tokenizer=FakeTokenizer("slow"))
+    chunks = [
+        {"type": "text", "content": "Results", "label": "section_header", "page": 1},
+        {"type": "text", "content": "on page one", "label": "text", "page": 1},
+        {"type": "text", "content": "on page two", "label": "text", "page": 2},
+        {"type": "text", "content": "Discussion", "label": "section_header", "page": 2},
+    ]
+    packed = list(packer.pack(chunks))
+    assert [(c["content"].split("\n\n")[0], c["page"], c.get("page_end")) for c in packed] == [
+        ("Results", 1, 2), ("Discussion", 2, None)]
+
+def test_short_documents_and_leading_headings_are_kept():
+    packer = text_chunker.ChunkPacker(max_tokens=40, min_tokens=20, tokenizer=FakeTokenizer("slow"))
+    only = [{"type": "text", "content": "Invoice 42: total due $1,200 by 2026-11-01."}]
+    assert list(packer.pack(only)) == only
+
+    chunks = [
+        {"type": "text", "content": "# Title"},
+        {"type": "text", "content": "## Overview"},
+        {"type": "text", "content": "body " * 25},
+        {"type": "text", "content": "## Next"},
+        {"type": "text", "content": "more " * 30},
+        {"type": "text", "content": "page 7"},
+    ]
+    packed = list(packer.pack(chunks))
+    assert [c["content"].split("\n\n")[0] for c in packed] == ["# Title", "## Next"]
+    # The trailing page number fits after the last section, so nothing is lost
+    assert packed[1]["content"].endswith("page 7")
+    assert packer.dropped == 0